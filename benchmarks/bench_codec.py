@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark parse and dump throughput of src.utils.codec against the standard library,
+both in the old indented format (json.dump(..., indent=4)) and in compact form.
+
+Works on synthetic in-memory collections, never on data/.
+Usage: python benchmarks/bench_codec.py [record counts...]
+"""
+
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils import codec
+
+
+def build_records(count):
+    """Defended-thesis-like records with Persian text, as produced by bulk grade imports"""
+    rng = random.Random(42)
+    return [{
+        "student_id": f"student_{rng.randint(1, 50000)}",
+        "professor_id": f"prof_{rng.randint(1, 500)}",
+        "internal_judge_id": f"prof_{rng.randint(1, 500)}",
+        "external_judge_id": f"judge_{rng.randint(1, 200)}",
+        "title": f"پایان‌نامه شماره {i}",
+        "keywords": ["یادگیری ماشین", "داده"],
+        "internal_grade": round(rng.uniform(10, 20), 2),
+        "external_grade": round(rng.uniform(10, 20), 2),
+        "grade": "A",
+        "defense_date": "2025-01-01",
+        "version": 1
+    } for i in range(count)]
+
+
+def measure(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    encoders = [
+        ("json indent=4", lambda data: json.dumps(data, ensure_ascii=False, indent=4).encode('utf-8')),
+        ("json compact", lambda data: json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode('utf-8')),
+        (f"codec ({codec.BACKEND})", codec.dumps)
+    ]
+    decoders = {
+        "json indent=4": json.loads,
+        "json compact": json.loads,
+        f"codec ({codec.BACKEND})": codec.loads
+    }
+
+    print(f"{'records':>9} {'format':>16} {'size (MB)':>10} {'dump (s)':>9} {'dump MB/s':>10} "
+          f"{'parse (s)':>10} {'parse MB/s':>11}")
+    for size in sizes:
+        records = build_records(size)
+        for name, encode in encoders:
+            dump_time, payload = measure(encode, records)
+            parse_time, parsed = measure(decoders[name], payload)
+            assert len(parsed) == size, "round trip lost records"
+            megabytes = len(payload) / 1e6
+            print(f"{size:>9} {name:>16} {megabytes:>10.1f} {dump_time:>9.3f} {megabytes / dump_time:>10.0f} "
+                  f"{parse_time:>10.3f} {megabytes / parse_time:>11.0f}")
+            del payload, parsed
+        del records
+
+
+if __name__ == "__main__":
+    main()
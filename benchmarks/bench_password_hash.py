@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark the password hash parameters of src.utils.auth to pick the cost for a login-latency budget.
+For each candidate it measures the latency of one verification (what a login pays) and the
+throughput of the process-pool batch hasher (what a bulk import pays), then recommends the
+most expensive candidate whose p99 latency fits the target.
+
+Only hashes random passwords in memory, never touches data/.
+Usage: python benchmarks/bench_password_hash.py [--target-ms 100] [--samples 30] [--batch 64]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils import auth
+
+CANDIDATES = [
+    ("scrypt", {"SCRYPT_N": 2 ** 12}),
+    ("scrypt", {"SCRYPT_N": 2 ** 13}),
+    ("scrypt", {"SCRYPT_N": 2 ** 14}),
+    ("scrypt", {"SCRYPT_N": 2 ** 15}),
+    ("scrypt", {"SCRYPT_N": 2 ** 16}),
+    ("pbkdf2_sha256", {"PBKDF2_ITERATIONS": 100_000}),
+    ("pbkdf2_sha256", {"PBKDF2_ITERATIONS": 200_000}),
+    ("pbkdf2_sha256", {"PBKDF2_ITERATIONS": 400_000}),
+    ("pbkdf2_sha256", {"PBKDF2_ITERATIONS": 600_000}),
+]
+
+
+def configure(algorithm, settings):
+    """Apply a candidate to the auth module (worker processes inherit it when forked)"""
+    auth.PASSWORD_ALGORITHM = algorithm
+    for name, value in settings.items():
+        setattr(auth, name, value)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--target-ms", type=float, default=100.0, help="p99 login latency budget")
+    parser.add_argument("--samples", type=int, default=30, help="verifications timed per candidate")
+    parser.add_argument("--batch", type=int, default=64, help="passwords hashed per batch throughput run")
+    args = parser.parse_args()
+
+    print(f"{'algorithm':>14} {'parameters':>18} {'p50 (ms)':>9} {'p99 (ms)':>9} {'batch hashes/s':>15}")
+    fitting = None
+    for algorithm, settings in CANDIDATES:
+        configure(algorithm, settings)
+        stored = auth.hash_password("correct horse")
+        latencies = []
+        for _ in range(args.samples):
+            start = time.perf_counter()
+            assert auth.verify_password("correct horse", stored)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        passwords = [f"password-{i}" for i in range(args.batch)]
+        start = time.perf_counter()
+        auth.hash_passwords(passwords)
+        throughput = len(passwords) / (time.perf_counter() - start)
+
+        p99 = percentile(latencies, 0.99)
+        print(f"{algorithm:>14} {auth._parameters(algorithm):>18} {percentile(latencies, 0.5):>9.1f} "
+              f"{p99:>9.1f} {throughput:>15.0f}")
+        if p99 <= args.target_ms and (fitting is None or p99 > fitting[2]):
+            fitting = (algorithm, settings, p99)
+
+    if fitting is None:
+        print(f"\n⚠️ No candidate verifies within {args.target_ms:.0f} ms at p99 on this machine")
+        return
+    algorithm, settings, p99 = fitting
+    print(f"\n✅ Most expensive setting within {args.target_ms:.0f} ms (p99 {p99:.1f} ms):")
+    print(f"   THESIS_PASSWORD_ALGORITHM={algorithm} " +
+          " ".join(f"THESIS_{name}={value}" for name, value in settings.items()))
+
+
+if __name__ == "__main__":
+    main()
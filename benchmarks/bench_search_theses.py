@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark helpers.search_theses against the previous implementation,
+which re-read the user files for every archived thesis.
+
+Runs on synthetic archives in a temporary directory, never on data/.
+Usage: python benchmarks/bench_search_theses.py [archive sizes...]
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils import file_io
+from src.utils.helpers import search_theses
+
+
+def legacy_search_theses(search_query, search_type):
+    """The pre-index implementation, kept here only for comparison"""
+    read_json = file_io._read_json_file
+    theses = read_json("data/theses/defended_theses.json")
+    search_query = search_query.strip().lower()
+    results = []
+
+    for thesis in theses:
+        if search_type == "professor":
+            professors = read_json("data/users/professors.json")
+            professor = next((p for p in professors if p["user_id"] == thesis.get("professor_id", "")), {})
+            if search_query in professor.get("name", "").lower():
+                results.append(thesis)
+        elif search_type == "author":
+            students = read_json("data/users/students.json")
+            student = next((s for s in students if s["user_id"] == thesis.get("student_id", "")), {})
+            if search_query in student.get("name", "").lower():
+                results.append(thesis)
+        elif search_type == "judges":
+            professors = read_json("data/users/professors.json")
+            external_judges = read_json("data/users/external_judges.json")
+            internal_judge = next((p for p in professors if p["user_id"] == thesis.get("internal_judge_id", "")), {})
+            external_judge = next((j for j in external_judges if j["user_id"] == thesis.get("external_judge_id", "")), {})
+            if (search_query in internal_judge.get("name", "").lower() or
+                    search_query in external_judge.get("name", "").lower()):
+                results.append(thesis)
+
+    return results
+
+
+def build_archive(root, theses_count, students_count=2000, professors_count=200, judges_count=100):
+    """Write synthetic user files and an archive of the given size under root/data"""
+    rng = random.Random(42)
+
+    def write(relative_path, data):
+        full_path = os.path.join(root, relative_path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, 'w', encoding='utf-8') as file:
+            json.dump(data, file, ensure_ascii=False, indent=4)
+
+    def users(prefix, role, count):
+        return [{"user_id": f"{prefix}_{i}", "national_id": f"{i:010d}", "name": f"{role.title()} Name {i}",
+                 "password": "", "role": role} for i in range(1, count + 1)]
+
+    write("data/users/students.json", users("student", "student", students_count))
+    write("data/users/professors.json", users("prof", "professor", professors_count))
+    write("data/users/external_judges.json", users("judge", "external_judge", judges_count))
+    write("data/theses/defended_theses.json", [{
+        "student_id": f"student_{rng.randint(1, students_count)}",
+        "professor_id": f"prof_{rng.randint(1, professors_count)}",
+        "internal_judge_id": f"prof_{rng.randint(1, professors_count)}",
+        "external_judge_id": f"judge_{rng.randint(1, judges_count)}",
+        "title": f"Thesis {i}",
+        "keywords": ["synthetic"],
+        "defense_date": "2025-01-01"
+    } for i in range(theses_count)])
+
+
+def measure(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, len(result)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [500, 1000, 2000]
+    queries = [("Name 7", "professor"), ("Name 12", "author"), ("Name 3", "judges")]
+
+    print(f"{'theses':>8} {'type':>10} {'legacy (s)':>12} {'cold (s)':>10} {'warm (s)':>10} {'speedup':>9}")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as root:
+            build_archive(root, size)
+            file_io.PROJECT_ROOT = root
+            file_io.clear_cache()
+
+            for query, search_type in queries:
+                legacy_time, legacy_count = measure(legacy_search_theses, query, search_type)
+                file_io.clear_cache()
+                cold_time, cold_count = measure(search_theses, query, search_type)
+                warm_time, warm_count = measure(search_theses, query, search_type)
+                assert legacy_count == cold_count == warm_count, "result sets differ"
+                print(f"{size:>8} {search_type:>10} {legacy_time:>12.4f} {cold_time:>10.4f} {warm_time:>10.4f} "
+                      f"{legacy_time / max(cold_time, 1e-9):>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
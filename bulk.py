@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Non-interactive bulk import/export of users, thesis courses and defended theses.
+Usage: python bulk.py import|export students|professors|external_judges|courses|theses FILE.csv|FILE.jsonl
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.utils.bulk_io import main
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,4 +1,9 @@
 from src.menus.main_menu import show_main_menu
+from src.utils.unit_of_work import recover_journal
+from src.utils.file_io import STORAGE_BACKEND
+from src.utils.jsonl_log import start_background_compaction
+from src.utils.rate_limit import load_state
+from src.utils.capacity import rebase
 
 
 def main():
@@ -7,6 +12,12 @@ def main():
     print("       Thesis Management System - Welcome")
     print("=" * 60)
 
+    recover_journal()
+    rebase()  # once: capacity fields become totals (see capacity.rebase)
+    if STORAGE_BACKEND == "jsonl":
+        start_background_compaction()
+    load_state()
+
     while True:
         show_main_menu()
 
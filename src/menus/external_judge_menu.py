@@ -1,15 +1,24 @@
 from datetime import datetime, date
-from src.utils.file_io import read_json, write_json
+from src.utils.file_io import read_json
 from src.utils.helpers import display_menu
+from src.utils.archive import append_to_archive
+from src.utils.unit_of_work import UnitOfWork
+from src.utils.sessions import sessions
+from src.utils.request_index import request_index, DEFENSE_REQUESTS_FILE
 
 
-DEFENSE_REQUESTS_FILE = "data/requests/defense_requests.json"
 DEFENDED_THESES_FILE = "data/theses/defended_theses.json"
 
 
-def external_judge_menu(user):
-    """External Judge Main Menu"""
+def external_judge_menu(token):
+    """External Judge Main Menu; every choice is made as the principal of the session token"""
     while True:
+        user = sessions.authenticate(token)
+        if user is None:
+            print("⚠️ Your session has ended (expired or password changed). Please log in again.")
+            input("Press Enter to continue...")
+            break
+
         menu_title = f"Professor Menu - {user.name}"
         options = [
             "Grade defended theses",
@@ -38,12 +47,17 @@ def grade_theses_as_external(user):
     print("\n📊 Grading defended theses")
     print("=" * 50)
 
-    defense_requests = read_json(DEFENSE_REQUESTS_FILE)
+    # All files touched by grading are loaded once and saved together at the end
+    uow = UnitOfWork()
+    defense_requests = uow.load(DEFENSE_REQUESTS_FILE)
     today = date.today()
 
+    # Approved defenses of this judge (from the request index) still waiting for the external grade
     theses_for_judge = [
-        th for th in defense_requests
-        if th.get("external_judge_id") == user.user_id and "external_grade" not in th
+        req for req in request_index.select(DEFENSE_REQUESTS_FILE, defense_requests,
+                                            uow.loaded_version(DEFENSE_REQUESTS_FILE),
+                                            external_judge_id=user.user_id, status="Approved")
+        if "external_grade" not in req
     ]
 
     if not theses_for_judge:
@@ -111,36 +125,22 @@ def grade_theses_as_external(user):
 
                 th["final_grade"] = final_grade
                 th["final_letter_grade"] = final_letter
+                # Closing the thesis frees its course and supervision places (see capacity_ledger)
                 th["status"] = "Closed"
 
-                courses = read_json("data/courses/thesis_courses.json")
-                for course in courses:
-                    if course["professor_id"] == th["professor_id"]:
-                        course["capacity"] = course.get("capacity", 0) + 1
-                        print(f"✅ Course '{course['title']}' capacity increased to {course['capacity']}.")
-                        break
-                write_json("data/courses/thesis_courses.json", courses)
-
                 print(f"🎯 Final grade: {final_grade:.2f} ({final_letter})")
 
-                defended = read_json(DEFENDED_THESES_FILE)
-                defended.append(th.copy())
-                write_json(DEFENDED_THESES_FILE, defended)
+                append_to_archive(th.copy(), uow)
 
                 print("📂 Thesis added to final list.")
 
             break
 
-    write_json(DEFENSE_REQUESTS_FILE, defense_requests)
-
-    external_judges = read_json("data/users/external_judges.json")
-    for judge in external_judges:
-        if judge["user_id"] == user.user_id:
-            judge["judge_capacity"] = judge.get("judge_capacity", 0) + 1
-            print(f"✅ Your judging capacity increased to {judge['judge_capacity']}.")
-            break
+    # Grading frees this judge's place without touching the judge's record (see capacity_ledger)
+    uow.mark_changed(DEFENSE_REQUESTS_FILE)
 
-    write_json("data/users/external_judges.json", external_judges)
+    if not uow.commit():
+        print("❌ Error saving changes!")
 
     input("Press Enter to continue...")
 
@@ -2,6 +2,7 @@ from src.utils.helpers import display_menu
 from src.menus.student_menu import show_student_menu
 from src.menus.professor_menu import show_professor_menu
 from src.menus.external_judge_menu import external_judge_menu
+from src.utils.sessions import sessions
 
 
 def show_main_menu():
@@ -43,18 +44,30 @@ def show_login_menu(role: str):
     password = input("Password: ").strip()
 
     from src.utils.auth import verify_user
+    from src.utils.rate_limit import login_retry_after
+    retry_after = login_retry_after(user_id)
+    if retry_after:
+        print(f"\n⚠️ Too many failed login attempts. Try again in {int(retry_after) + 1} seconds.")
+        input("Press Enter to go back...")
+        return
+
     user = verify_user(user_id, password, role)
 
     if user:
         print(f"\n✅ Login successful! Welcome {user.name}")
         input("Press Enter to continue...")
 
-        if role == "student":
-            show_student_menu(user)
-        elif role == "professor":
-            show_professor_menu(user)
-        else:
-            external_judge_menu(user)
+        # The session lasts until the user leaves their menu (logout); the menus act as its principal
+        token = sessions.issue(user)
+        try:
+            if role == "student":
+                show_student_menu(token)
+            elif role == "professor":
+                show_professor_menu(token)
+            else:
+                external_judge_menu(token)
+        finally:
+            sessions.revoke(token)
     else:
         print("\n❌ Incorrect User ID or Password!")
         input("Press Enter to go back...")
@@ -1,8 +1,16 @@
 import sys
 import os
 import subprocess
-from src.utils.file_io import read_json, write_json, get_full_path
+from src.utils.file_io import read_json, get_full_path
 from src.utils.helpers import display_menu
+from src.utils.user_index import user_index
+from src.utils.capacity import capacity_ledger, capacity_lock
+from src.utils.request_index import request_index, ENROLLMENT_REQUESTS_FILE, DEFENSE_REQUESTS_FILE
+from src.utils.archive import append_to_archive
+from src.utils.unit_of_work import UnitOfWork
+from src.utils.sessions import sessions
+from src.utils.previews import preview_worker, print_preview
+from src.utils.reports import reports, print_report
 from datetime import datetime, date
 
 
@@ -12,7 +20,7 @@ def get_available_internal_judges(exclude_professor_id=None):
 
     available_judges = [
         p for p in professors
-        if p.get("judge_capacity", 0) > 0
+        if capacity_ledger.judgment_remaining(p) > 0
            and p["user_id"] != exclude_professor_id
     ]
     return available_judges
@@ -21,30 +29,14 @@ def get_available_internal_judges(exclude_professor_id=None):
 def get_available_external_judges():
     """دریافت لیست داوران خارجی با ظرفیت موجود"""
     external_judges = read_json("data/users/external_judges.json")
-    available_judges = [j for j in external_judges if j.get("judge_capacity", 0) > 0]
+    available_judges = [j for j in external_judges if capacity_ledger.judgment_remaining(j) > 0]
     return available_judges
 
 
-def decrease_judge_capacity(judge_id, is_external=False):
-    """کاهش ظرفیت داوری یک استاد یا داور خارجی"""
-    try:
-        if is_external:
-            file_path = "data/users/external_judges.json"
-            judges = read_json(file_path)
-        else:
-            file_path = "data/users/professors.json"
-            judges = read_json(file_path)
-
-        for judge in judges:
-            if judge["user_id"] == judge_id and judge.get("judge_capacity", 0) > 0:
-                judge["judge_capacity"] -= 1
-                break
-
-        write_json(file_path, judges)
-        return True
-    except Exception as e:
-        print(f"❌ Error decreasing judge capacity: {e}")
-        return False
+def judges_have_capacity(internal_judge_id, external_judge_id):
+    """آیا هر دو داور هنوز ظرفیت خالی دارند؟ (بار داوری از درخواست‌های دفاع محاسبه می‌شود)"""
+    judges = [user_index.get("professor", internal_judge_id), user_index.get("external_judge", external_judge_id)]
+    return all(judge and capacity_ledger.judgment_remaining(judge) > 0 for judge in judges)
 
 
 def open_file(file_path):
@@ -62,15 +54,22 @@ def open_file(file_path):
         print(f"❌ Error opening file: {e}")
 
 
-def show_professor_menu(professor):
-    """نمایش منوی اصلی استاد"""
+def show_professor_menu(token):
+    """نمایش منوی اصلی استاد (کاربر هر بار از توکن نشست خوانده می‌شود)"""
     while True:
+        professor = sessions.authenticate(token)
+        if professor is None:
+            print("⚠️ Your session has ended (expired or password changed). Please log in again.")
+            input("Press Enter to continue...")
+            break
+
         menu_title = f"Professor Menu - {professor.name}"
         options = [
             "View and review thesis enrollment requests",
             "Manage defense requests",
             "Grade defended sessions",
             "Search in thesis database",
+            "Archive reports",
             "Change password",
             "Logout"
         ]
@@ -88,8 +87,10 @@ def show_professor_menu(professor):
         elif choice == "4":
             search_theses()
         elif choice == "5":
-            change_password(professor)
+            view_archive_reports(professor)
         elif choice == "6":
+            change_password(professor)
+        elif choice == "7":
             print("Logging out...")
             break
         else:
@@ -102,9 +103,11 @@ def review_enrollment_requests(professor):
     print("\n📋 Thesis Enrollment Requests")
     print("-" * 40)
 
-    requests = read_json("data/requests/enrollment_requests.json")
-    professor_requests = [r for r in requests if
-                          r["professor_id"] == professor.user_id and r["status"] == "در انتظار تأیید استاد"]
+    uow = UnitOfWork()
+    requests = uow.load(ENROLLMENT_REQUESTS_FILE)
+    professor_requests = request_index.select(
+        ENROLLMENT_REQUESTS_FILE, requests, uow.loaded_version(ENROLLMENT_REQUESTS_FILE),
+        professor_id=professor.user_id, status="Pending Professor Approval")
 
     if not professor_requests:
         print("❌ No pending requests.")
@@ -116,7 +119,7 @@ def review_enrollment_requests(professor):
     students_dict = {s["user_id"]: s for s in students} if students else {}
 
     # خواندن اطلاعات دروس
-    courses = read_json("data/courses/thesis_courses.json")
+    courses = uow.load("data/courses/thesis_courses.json")
     courses_dict = {c["course_id"]: c for c in courses} if courses else {}
 
     print(f"\n📝 List of thesis enrollment requests for you:")
@@ -155,12 +158,8 @@ def review_enrollment_requests(professor):
             selected_request["status"] = "Rejected"
             selected_request["rejected_date"] = date.today().strftime("%Y-%m-%d")
             print("❌ Request rejected.")
-
-            for course in courses:
-                if course["course_id"] == selected_request["course_id"]:
-                    course["capacity"] += 1
-                    print(f"✅ Course '{course_title}' capacity increased to {course['capacity']}.")
-                    break
+            # The course place held by the request is free again (see capacity_ledger)
+            print(f"✅ A place in course '{course_title}' is available again.")
 
         else:
             print("⚠️Invalid action!")
@@ -173,14 +172,11 @@ def review_enrollment_requests(professor):
                     requests[i] = selected_request
                 break
 
-        if write_json("data/requests/enrollment_requests.json", requests):
-            if action == 'n':  # فقط اگر درخواست رد شده باشد
-                if write_json("data/courses/thesis_courses.json", courses):
-                    print("✅ Course capacity changes saved.")
-                else:
-                    print("❌ Error saving course capacity changes!")
-        else:
-            print("❌ Error saving course capacity changes!")
+        uow.mark_changed("data/requests/enrollment_requests.json")
+
+        # اگر جلسه دیگری همین درخواست را تغییر داده باشد، ذخیره انجام نمی‌شود
+        if not uow.commit():
+            print("❌ Error saving changes!")
 
     except (ValueError, IndexError):
         print("⚠️Invalid action!")
@@ -194,20 +190,22 @@ def manage_defense_requests(professor):
     print("=" * 50)
 
     # خواندن درخواست‌های دفاع
-    defense_requests = read_json("data/requests/defense_requests.json")
+    uow = UnitOfWork()
+    defense_requests = uow.load(DEFENSE_REQUESTS_FILE)
 
-    # فیلتر کردن درخواست‌های مربوط به این استاد و با وضعیت "در انتظار تأیید استاد"
-    professor_defense_requests = [
-        r for r in defense_requests
-        if r["professor_id"] == professor.user_id
-           and r["status"] == "در انتظار تأیید استاد"
-    ]
+    # درخواست‌های این استاد با وضعیت "در انتظار تأیید استاد" (از ایندکس درخواست‌ها)
+    professor_defense_requests = request_index.select(
+        DEFENSE_REQUESTS_FILE, defense_requests, uow.loaded_version(DEFENSE_REQUESTS_FILE),
+        professor_id=professor.user_id, status="Pending Professor Approval")
 
     if not professor_defense_requests:
         print("❌ No defense requests found.")
         input("Press Enter to return...")
         return
 
+    # Page counts and page-image previews are prepared in the background while the list is read
+    preview_worker.prefetch(professor_defense_requests)
+
     # Read students data
     students = read_json("data/users/students.json")
     students_dict = {s["user_id"]: s for s in students} if students else {}
@@ -245,7 +243,8 @@ def manage_defense_requests(professor):
             print("3. 🖼️ Open Last Page Image")
             print("4. ❌ Reject Request")
             print("5. ✅ Approve Request & Set Defense Date")
-            print("6. ↩️ Back to Previous Menu")
+            print("6. 🔍 Quick Preview (page count, page images as text)")
+            print("7. ↩️ Back to Previous Menu")
 
             action = input("\nPlease select an option: ").strip()
 
@@ -286,7 +285,8 @@ def manage_defense_requests(professor):
                             defense_requests[i] = selected_request
                             break
 
-                    if write_json("data/requests/defense_requests.json", defense_requests):
+                    uow.mark_changed("data/requests/defense_requests.json")
+                    if uow.commit():
                         print("✅ Defense request rejected.")
                     else:
                         print("❌ Error saving changes!")
@@ -321,12 +321,13 @@ def manage_defense_requests(professor):
 
                 print("\nAvailable Internal Judges:")
                 for i, judge in enumerate(internal_judges, 1):
-                    print(f"{i}. {judge['name']} - Capacity: {judge.get('judge_capacity', 0)}")
+                    print(f"{i}. {judge['name']} - Capacity: {capacity_ledger.judgment_remaining(judge)}")
 
                 all_judges = get_available_internal_judges()
                 professor_judge = next((j for j in all_judges if j["user_id"] == professor.user_id), None)
                 if professor_judge:
-                    print(f"👑 You (Advisor) - Capacity: {professor_judge.get('judge_capacity', 0)} - Not selectable")
+                    print(f"👑 You (Advisor) - Capacity: {capacity_ledger.judgment_remaining(professor_judge)}"
+                          f" - Not selectable")
 
                 try:
                     choice = int(input("\nSelect internal judge number: ")) - 1
@@ -355,7 +356,7 @@ def manage_defense_requests(professor):
 
                 print("\nAvailable External Judges:")
                 for i, judge in enumerate(external_judges, 1):
-                    print(f"{i}. {judge['name']} - Capacity: {judge.get('judge_capacity', 0)}")
+                    print(f"{i}. {judge['name']} - Capacity: {capacity_ledger.judgment_remaining(judge)}")
 
                 try:
                     choice = int(input("\nSelect external judge number: ")) - 1
@@ -383,20 +384,23 @@ def manage_defense_requests(professor):
                         defense_requests[i] = selected_request
                         break
 
-                if write_json("data/requests/defense_requests.json", defense_requests):
-                    if decrease_judge_capacity(internal_judge, is_external=False) and decrease_judge_capacity(
-                            external_judge, is_external=True):
+                uow.mark_changed(DEFENSE_REQUESTS_FILE)
 
-                        print("✅ Defense request approved and details saved.")
-                        print("✅ Judge capacities updated.")
+                # The approved defense itself takes both judges' places (see capacity_ledger); they are
+                # checked again while no other session can approve a defense
+                with capacity_lock():
+                    full = not judges_have_capacity(internal_judge, external_judge)
+                    committed = not full and uow.commit()
 
-                        print(f"\n📋 Defense Information:")
-                        print(f"   📅 Defense Date: {defense_date}")
-                        print(f"   👨‍🏫 Internal Judge: {internal_judge_name}")
-                        print(f"   👨‍🏫 External Judge: {external_judge_name}")
+                if full:
+                    print("❌ A selected judge has no capacity left anymore!")
+                elif committed:
+                    print("✅ Defense request approved and details saved.")
 
-                    else:
-                        print("⚠️ Approved, but judge capacity update failed!")
+                    print(f"\n📋 Defense Information:")
+                    print(f"   📅 Defense Date: {defense_date}")
+                    print(f"   👨‍🏫 Internal Judge: {internal_judge_name}")
+                    print(f"   👨‍🏫 External Judge: {external_judge_name}")
 
                 else:
                     print("❌ Error saving changes!")
@@ -405,6 +409,14 @@ def manage_defense_requests(professor):
                 break
 
             elif action == "6":
+                # Preview without opening the full-resolution files
+                previews = preview_worker.previews(selected_request)
+                if not previews:
+                    print("❌ No documents found for this request!")
+                for document_path, preview in previews:
+                    print_preview(document_path, preview)
+
+            elif action == "7":
                 # Back
                 print("Returning to main menu...")
                 break
@@ -425,15 +437,16 @@ def grade_defense_sessions(professor):
     print("\n📝 Grade Defended Sessions")
     print("=" * 50)
 
-    defense_requests = read_json("data/requests/defense_requests.json")
+    # All files touched by grading are loaded once and saved together at the end
+    uow = UnitOfWork()
+    defense_requests = uow.load(DEFENSE_REQUESTS_FILE)
     today = date.today()
 
-    professor_defense_requests = [
-        r for r in defense_requests
-        if (r.get("internal_judge_id") == professor.user_id or r.get("external_judge_id") == professor.user_id)
-           and r.get("status") == "تایید شده"
-           and "defense_date" in r
-    ]
+    version = uow.loaded_version(DEFENSE_REQUESTS_FILE)
+    judged = {id(req): req for judge_field in ("internal_judge_id", "external_judge_id")
+              for req in request_index.select(DEFENSE_REQUESTS_FILE, defense_requests, version,
+                                              **{judge_field: professor.user_id}, status="Approved")}
+    professor_defense_requests = [req for req in judged.values() if "defense_date" in req]
 
     graded_defenses = []
     for req in professor_defense_requests:
@@ -561,22 +574,13 @@ def grade_defense_sessions(professor):
 
             selected_defense["final_grade"] = final_grade
             selected_defense["final_letter_grade"] = final_letter_grade
+            # Closing the thesis frees its course and supervision places (see capacity_ledger)
             selected_defense["status"] = "Closed"
 
-            courses = read_json("data/courses/thesis_courses.json")
-            for course in courses:
-                if course["professor_id"] == selected_defense["professor_id"]:
-                    course["capacity"] = course.get("capacity", 0) + 1
-                    print(f"✅ Capacity of course '{course['title']}' increased to {course['capacity']}.")
-                    break
-            write_json("data/courses/thesis_courses.json", courses)
-
             print(f"🎯 Final Grade: {final_grade:.2f} ({final_letter_grade})")
             print("✅ Thesis closed.")
 
-            defended_theses = read_json("data/theses/defended_theses.json")
-            defended_theses.append(selected_defense.copy())
-            write_json("data/theses/defended_theses.json", defended_theses)
+            append_to_archive(selected_defense.copy(), uow)
 
             print("✅ Thesis information added to archive.")
         else:
@@ -587,23 +591,52 @@ def grade_defense_sessions(professor):
                 defense_requests[i] = selected_defense
                 break
 
-        write_json("data/requests/defense_requests.json", defense_requests)
-        print("✅ Grade saved successfully.")
+        uow.mark_changed("data/requests/defense_requests.json")
+
+        # Grading frees this judge's place without touching the judge's record (see capacity_ledger)
+        if uow.commit():
+            print("✅ Changes saved successfully.")
+        else:
+            print("❌ Error saving changes!")
 
     except (ValueError, IndexError):
         print("❌ Invalid selection!")
 
-    professors = read_json("data/users/professors.json")
-    for judge in professors:
-        if judge["user_id"] == professor.user_id:
-            judge["judge_capacity"] = judge.get("judge_capacity", 0) + 1
-            print(f"✅ Your judging capacity increased to {judge['judge_capacity']}.")
-            break
+    input("\nPress Enter to return...")
 
-    write_json("data/users/professors.json", professors)
+def view_archive_reports(professor):
+    """گزارش‌های آماری آرشیو پایان‌نامه‌ها (از آمار نگه‌داری‌شده، بدون خواندن کل آرشیو)"""
+    print("\n📊 Archive Reports")
+    print("=" * 50)
+    print("1. By supervisor")
+    print("2. By judge")
+    print("3. By semester")
+    print("4. By course")
+    print("5. My theses by semester")
+    print("6. 💾 Export all reports to CSV")
+
+    choice = input("\nPlease select an option: ").strip()
+    dimensions = {"1": "supervisor", "2": "judge", "3": "semester", "4": "course"}
+
+    if choice in dimensions:
+        print_report(dimensions[choice])
+    elif choice == "5":
+        print_report("supervisor_semester", f"{professor.user_id} | ")
+    elif choice == "6":
+        path = input("CSV file path: ").strip()
+        if not path.endswith(".csv"):
+            print("❌ The file name must end with .csv!")
+        else:
+            try:
+                print(f"✅ {reports.export_csv(path)} rows written to {path}")
+            except OSError as e:
+                print(f"❌ Error writing file: {e}")
+    else:
+        print("❌ Invalid option!")
 
     input("\nPress Enter to return...")
 
+
 def search_theses():
     """Search in thesis database"""
     print("\n🔍 Thesis Database Search")
@@ -616,16 +649,18 @@ def search_theses():
     print("4. Author (Student) Name")
     print("5. Defense Year")
     print("6. Judges")
+    print("7. Full Text (Title, Abstract, Keywords)")
 
     try:
-        choice = input("\n🎯 Select search type (1-6): ").strip()
+        choice = input("\n🎯 Select search type (1-7): ").strip()
         search_types = {
             "1": "title",
             "2": "professor",
             "3": "keywords",
             "4": "author",
             "5": "year",
-            "6": "judges"
+            "6": "judges",
+            "7": "fulltext"
         }
 
         if choice not in search_types:
@@ -640,10 +675,15 @@ def search_theses():
             input("\nPress Enter to return...")
             return
 
-        from src.utils.helpers import search_theses, open_file
-        results = search_theses(search_query, search_types[choice])
-
-        print(f"\n✅ Number of results found: {len(results)}")
+        from src.utils.helpers import search_theses, full_text_search, open_file
+        if search_types[choice] == "fulltext":
+            page = input("📄 Page number (default 1): ").strip()
+            page = int(page) if page.isdigit() and int(page) > 0 else 1
+            results, total = full_text_search(search_query, page)
+            print(f"\n✅ Number of results found: {total} (page {page}, ranked by relevance)")
+        else:
+            results = search_theses(search_query, search_types[choice])
+            print(f"\n✅ Number of results found: {len(results)}")
         print("=" * 60)
 
         if not results:
@@ -1,16 +1,31 @@
 from src.utils.helpers import display_menu
-from src.utils.file_io import read_json, write_json
+from src.utils.file_io import read_json, append_json, read_models
+from src.models.course import ThesisCourse
+from src.models.request import EnrollmentRequest
+from src.models.thesis import Thesis
+from src.utils.unit_of_work import UnitOfWork
+from src.utils.sessions import sessions
 from src.utils.auth import find_user_by_id
 from datetime import datetime, date
 from dateutil.relativedelta import relativedelta
-import shutil
 import os
 from src.utils.file_io import get_full_path
+from src.utils.sequences import next_id
+from src.utils.capacity import capacity_ledger, capacity_lock
+from src.utils.request_index import request_index, normalize_status, ENROLLMENT_REQUESTS_FILE, DEFENSE_REQUESTS_FILE
+from src.utils.blob_store import link_blob
+from src.utils.uploads import detect_kind, ingest, print_progress, extension, UploadError, PDF_KINDS, IMAGE_KINDS
 
 
-def show_student_menu(student):
-    """Display main student menu"""
+def show_student_menu(token):
+    """Display main student menu; every choice is made as the principal of the session token"""
     while True:
+        student = sessions.authenticate(token)
+        if student is None:
+            print("⚠️ Your session has ended (expired or password changed). Please log in again.")
+            input("Press Enter to continue...")
+            break
+
         menu_title = f"Student Menu - {student.name}"
         options = [
             "Request Thesis Course",
@@ -48,7 +63,8 @@ def request_thesis_course(student):
     print("\n📝 Thesis Course Request")
     print("=" * 50)
 
-    courses = read_json("data/courses/thesis_courses.json")
+    uow = UnitOfWork()
+    courses = uow.load("data/courses/thesis_courses.json")
 
     if not courses:
         print("❌ No courses available in the system.")
@@ -62,18 +78,19 @@ def request_thesis_course(student):
         input("\nPress Enter to go back...")
         return
 
-    available_courses = [c for c in courses if c["capacity"] > 0]
+    available_courses = [c for c in courses if capacity_ledger.course_remaining(c) > 0
+                         and capacity_ledger.supervision_remaining(c["professor_id"]) > 0]
 
     if not available_courses:
         print("❌ No courses with available capacity.")
         input("\nPress Enter to go back...")
         return
 
-    requests = read_json("data/requests/enrollment_requests.json")
+    requests = uow.load("data/requests/enrollment_requests.json")
 
-    existing_thesis_request = next((r for r in requests
-                                    if r["student_id"] == student.user_id
-                                    and any(c["course_id"] == r["course_id"] for c in thesis_courses)), None)
+    thesis_course_ids = {c["course_id"] for c in thesis_courses}
+    existing_thesis_request = next((r for r in request_index.find(ENROLLMENT_REQUESTS_FILE, student_id=student.user_id)
+                                    if r["course_id"] in thesis_course_ids), None)
 
     if existing_thesis_request:
         print("❌ You have already requested a thesis course!")
@@ -90,7 +107,7 @@ def request_thesis_course(student):
         print(f"   📚 Title: {course['title']}")
         print(f"   👨‍🏫 Professor: {professor_name}")
         print(f"   📅 Year/Semester: {course['year']} / {course['semester']}")
-        print(f"   👥 Capacity: {course['capacity']}")
+        print(f"   👥 Capacity: {capacity_ledger.course_remaining(course)}")
         print(f"   🕒 Sessions: {course['sessions_count']}")
         print(f"   📘 Units: {course['units']}")
         print(f"   📂 Resources: {course['resources']}")
@@ -123,6 +140,7 @@ def request_thesis_course(student):
 
     from datetime import date
     new_request = {
+        "request_id": next_id("request"),
         "student_id": student.user_id,
         "course_id": selected_course["course_id"],
         "professor_id": selected_course["professor_id"],
@@ -133,21 +151,19 @@ def request_thesis_course(student):
     }
 
     requests.append(new_request)
+    uow.mark_changed(ENROLLMENT_REQUESTS_FILE)
 
-    for course in courses:
-        if course["course_id"] == selected_course["course_id"]:
-            if course["capacity"] > 0:
-                course["capacity"] -= 1
-                print(f"✅ Course capacity reduced to {course['capacity']}.")
-            else:
-                print("❌ Error: Course capacity already full!")
-                input("\nPress Enter to go back...")
-                return
-            break
+    # The request itself takes the place (see capacity_ledger); the place is checked again while
+    # no other session can submit a request, so two students never take the last place together
+    with capacity_lock():
+        full = capacity_ledger.course_remaining(selected_course) <= 0 or \
+            capacity_ledger.supervision_remaining(selected_course["professor_id"]) <= 0
+        committed = not full and uow.commit()
 
-    if write_json("data/requests/enrollment_requests.json", requests):
-        if write_json("data/courses/thesis_courses.json", courses):
-            print("\n✅ Your request has been successfully submitted and sent to the professor.")
+    if full:
+        print("❌ Error: Course capacity already full!")
+    elif committed:
+        print("\n✅ Your request has been successfully submitted and sent to the professor.")
 
         print(f"\n📋 Request Information:")
         print(f"   📚 Course: {selected_course['title']}")
@@ -165,13 +181,9 @@ def request_defense(student):
     print("\n🎓 Submit Defense Request")
     print("=" * 50)
 
-    # Read thesis enrollment requests
-    enrollment_requests = read_json("data/requests/enrollment_requests.json")
-
     # Find student's approved enrollment request
-    approved_request = next((r for r in enrollment_requests
-                             if r["student_id"] == student.user_id
-                             and r["status"] == "Approved"), None)
+    approved_request = next((r for r in request_index.find(ENROLLMENT_REQUESTS_FILE, student_id=student.user_id)
+                             if normalize_status(r["status"]) == "Approved"), None)
 
     if not approved_request:
         print("❌ You cannot submit a defense request due to course status.")
@@ -180,10 +192,8 @@ def request_defense(student):
         return
 
     # Check if student already has a defense request that hasn't been rejected
-    defense_requests = read_json("data/requests/defense_requests.json")
-    existing_defense_request = next((r for r in defense_requests
-                                     if r["student_id"] == student.user_id
-                                     and r["status"] != "Rejected"), None)
+    existing_defense_request = next((r for r in request_index.find(DEFENSE_REQUESTS_FILE, student_id=student.user_id)
+                                     if normalize_status(r["status"]) != "Rejected"), None)
 
     if existing_defense_request:
         print("❌ You have already submitted a defense request!")
@@ -254,82 +264,60 @@ def request_defense(student):
             print("ℹ️ Enter the path to the last page image")
             last_page_path = input("Last Page Image Path: ").strip()
 
-            # Check images
-            image_paths = [first_page_path, last_page_path]
-            for img_path in image_paths:
-                if not os.path.exists(img_path):
-                    print(f"❌ Image file not found: {img_path}")
-                    input("\nPress Enter to go back...")
-                    return
-                if not img_path.lower().endswith(('.jpg', '.jpeg', '.png')):
-                    print(f"❌ Invalid image format: {img_path}")
-                    print("ℹ️ Only JPG, JPEG, PNG are allowed!")
-                    input("\nPress Enter to go back...")
-                    return
-
-            # Check PDF file
-            if not os.path.exists(pdf_path):
-                print("❌ PDF file not found! Please check the path.")
-                input("\nPress Enter to go back...")
-                return
-            if not pdf_path.lower().endswith('.pdf'):
-                print("❌ Only PDF files are allowed!")
+            # Check every file by its first bytes and size before anything is copied
+            try:
+                pdf_kind = detect_kind(pdf_path, PDF_KINDS)
+                image_kinds = [detect_kind(first_page_path, IMAGE_KINDS), detect_kind(last_page_path, IMAGE_KINDS)]
+            except UploadError as e:
+                print(f"❌ {e}")
+                print("ℹ️ Only PDF theses and JPG, JPEG, PNG page images are allowed!")
                 input("\nPress Enter to go back...")
                 return
 
-            # Generate filenames
+            # Files are stored once per content in the blob store; each submission gets its own
+            # names (hard links carrying a short hash), so a resubmission never overwrites an earlier one
             base_filename = f"{student.user_id}.{approved_request['course_id']}"
-            pdf_filename = f"{base_filename}.pdf"
-            first_page_filename = f"{base_filename}.page1.jpg"
-            last_page_filename = f"{base_filename}.page2.jpg"
-
-            documents_dir = get_full_path("documents")
-            theses_dir = os.path.join(documents_dir, "theses")
-            images_dir = os.path.join(documents_dir, "images")
-
-            os.makedirs(theses_dir, exist_ok=True)
-            os.makedirs(images_dir, exist_ok=True)
-
-            pdf_destination = os.path.join(theses_dir, pdf_filename)
-            first_page_destination = os.path.join(images_dir, first_page_filename)
-            last_page_destination = os.path.join(images_dir, last_page_filename)
 
             try:
-                shutil.copy2(pdf_path, pdf_destination)
-                shutil.copy2(first_page_path, first_page_destination)
-                shutil.copy2(last_page_path, last_page_destination)
+                file_hash = ingest(pdf_path, pdf_kind, print_progress("PDF"))
+                image_hashes = [ingest(first_page_path, image_kinds[0], print_progress("First Page")),
+                                ingest(last_page_path, image_kinds[1], print_progress("Last Page"))]
 
-                print("✅ All files uploaded successfully:")
-                print(f"   📄 PDF: {pdf_filename}")
-                print(f"   📸 First Page: {first_page_filename}")
-                print(f"   📸 Last Page: {last_page_filename}")
+                relative_pdf_path = link_blob(
+                    file_hash, f"documents/theses/{base_filename}.{file_hash[:12]}{extension(pdf_kind)}")
+                relative_image_path = [
+                    link_blob(image_hash, f"documents/images/{base_filename}.page{page}.{image_hash[:12]}"
+                                          f"{extension(image_kind)}")
+                    for page, image_hash, image_kind in zip((1, 2), image_hashes, image_kinds)]
 
-                relative_pdf_path = f"documents/theses/{pdf_filename}"
-                relative_image_path = [f"documents/images/{base_filename}.page1.jpg",
-                                       f"documents/images/{base_filename}.page2.jpg"]
+                print("✅ All files uploaded successfully:")
+                print(f"   📄 PDF: {os.path.basename(relative_pdf_path)}")
+                print(f"   📸 First Page: {os.path.basename(relative_image_path[0])}")
+                print(f"   📸 Last Page: {os.path.basename(relative_image_path[1])}")
 
-            except Exception as e:
+            except (UploadError, OSError) as e:
                 print(f"❌ File upload error: {e}")
                 input("\nPress Enter to go back...")
                 return
 
             # Create defense request
-            defense_requests = read_json("data/requests/defense_requests.json")
             new_defense_request = {
+                "request_id": next_id("defense"),
                 "student_id": student.user_id,
                 "professor_id": approved_request["professor_id"],
+                "course_id": approved_request["course_id"],
                 "title": title,
                 "abstract": abstract,
                 "keywords": keywords,
                 "status": "Pending Professor Approval",
                 "submission_date": today.strftime("%Y-%m-%d"),
                 "file_path": relative_pdf_path,
-                "image_path": relative_image_path
+                "image_path": relative_image_path,
+                "file_hash": file_hash,
+                "image_hashes": image_hashes
             }
 
-            defense_requests.append(new_defense_request)
-
-            if write_json("data/requests/defense_requests.json", defense_requests):
+            if append_json("data/requests/defense_requests.json", new_defense_request):
                 print("\n✅ Your defense request has been successfully submitted.")
             else:
                 print("❌ Error submitting defense request!")
@@ -350,15 +338,10 @@ def view_request_status(student):
     # print("\n📊 Your latest requests status")
     # print("=" * 50)
 
-    # Read enrollment requests
-    requests = read_json("data/requests/enrollment_requests.json")
-
-    # Search from the end to find the latest request
-    latest_request = None
-    for i in range(len(requests) - 1, -1, -1):
-        if requests[i]["student_id"] == student.user_id:
-            latest_request = requests[i]
-            break
+    # The latest request is the last one of the student's requests
+    student_requests = EnrollmentRequest.from_dicts(
+        request_index.find(ENROLLMENT_REQUESTS_FILE, student_id=student.user_id))
+    latest_request = student_requests[-1] if student_requests else None
 
     if not latest_request:
         print("❌ No request has been submitted.")
@@ -366,75 +349,64 @@ def view_request_status(student):
         input("\nPress Enter to go back...")
         return
 
-    # Read courses info
-    courses = read_json("data/courses/thesis_courses.json")
-    courses_dict = {c["course_id"]: c for c in courses} if courses else {}
-
-    # Read professors info
-    professors = read_json("data/users/professors.json")
-    professors_dict = {p["user_id"]: p for p in professors} if professors else {}
+    # Read course and professor info
+    course_info = next(iter(read_models("data/courses/thesis_courses.json", ThesisCourse,
+                                        lambda c: c["course_id"] == latest_request.course_id)), None)
+    professor_info = find_user_by_id(latest_request.professor_id, "professor") or {}
 
     # Display latest request info
-    course_info = courses_dict.get(latest_request["course_id"], {})
-    professor_info = professors_dict.get(latest_request["professor_id"], {})
-
-    course_title = course_info.get("title", "Unknown")
+    course_title = course_info.title if course_info else "Unknown"
     professor_name = professor_info.get("name", "Unknown")
 
     print()
     print("🔹 Thesis course request info: ")
     print(f"👨‍🏫 Professor: {professor_name}")
-    print(f"📅 Request date: {latest_request.get('created_at', 'Unknown')}")
-    print(f"📊 Status: {latest_request['status']}")
+    print(f"📅 Request date: {latest_request.created_at or 'Unknown'}")
+    print(f"📊 Status: {latest_request.status}")
     print("-" * 50)
 
     # Guidance messages based on status
     # print("\n💡 Guidance:")
     # print("-" * 40)
 
-    if latest_request["status"] == "رد شده":
+    if normalize_status(latest_request.status) == "Rejected":
         print("\n💡 Guidance:")
         print("-" * 40)
         print("❌ This request has been rejected.")
         print("ℹ️  To submit again, go to 'Thesis Course Enrollment'.")
 
-    elif latest_request["status"] == "در انتظار تأیید استاد":
+    elif normalize_status(latest_request.status) == "Pending Professor Approval":
         print("\n💡 Guidance:")
         print("-" * 40)
         print("⏳ This request is under review.")
         print("ℹ️  Please wait for professor approval.")
 
-    elif latest_request["status"] == "تایید شده":
+    elif normalize_status(latest_request.status) == "Approved":
         # print("✅ This request has been approved.")
 
         # Check defense request status
-        defense_requests = read_json("data/requests/defense_requests.json")
-        latest_defense_request = None
-
-        for i in range(len(defense_requests) - 1, -1, -1):
-            if defense_requests[i]["student_id"] == student.user_id:
-                latest_defense_request = defense_requests[i]
-                break
+        defense_requests = Thesis.from_dicts(request_index.find(DEFENSE_REQUESTS_FILE, student_id=student.user_id))
+        latest_defense_request = defense_requests[-1] if defense_requests else None
 
         if latest_defense_request:
-            print(f"🎓 Defense request status: {latest_defense_request['status']}")
+            print(f"🎓 Defense request status: {latest_defense_request.status}")
 
-            if latest_defense_request["status"] == "در انتظار تأیید استاد":
+            if normalize_status(latest_defense_request.status) == "Pending Professor Approval":
                 print("⏳ Your defense request is under review by your advisor.")
-                print(f"📅 Defense request submission date: {latest_defense_request.get('submission_date', 'Unknown')}")
-            elif latest_defense_request["status"] == "تایید شده":
+                print(f"📅 Defense request submission date: {latest_defense_request.submission_date or 'Unknown'}")
+            elif normalize_status(latest_defense_request.status) == "Approved":
                 print("✅ Your defense request has been approved.")
                 print("ℹ️  You can start preparing for your defense session.")
-                print(f"📅 Defense approval date: {latest_defense_request.get('approved_date', 'Unknown')}")
-            elif latest_defense_request["status"] == "رد شده":
+                print(f"📅 Defense approval date: {latest_defense_request.approved_date or 'Unknown'}")
+            elif normalize_status(latest_defense_request.status) == "Rejected":
                 print("❌ Your defense request has been rejected.")
                 print("ℹ️  You can submit a new defense request.")
-                print(f"📅 Defense rejection date: {latest_defense_request.get('rejected_date', 'Unknown')}")
+                print(f"📅 Defense rejection date: {latest_defense_request.rejected_date or 'Unknown'}")
 
         else:
-            if latest_request.get("approved_date") != "-":
+            if latest_request.approved_date != "-":
                 try:
-                    approval_date = datetime.strptime(latest_request["approved_date"], "%Y-%m-%d").date()
+                    approval_date = datetime.strptime(latest_request.approved_date, "%Y-%m-%d").date()
                     today = date.today()
                     three_months_later = approval_date + relativedelta(months=3)
 
@@ -466,16 +438,18 @@ def search_theses():
     print("4. Author (student) name")
     print("5. Defense year")
     print("6. Judges' names")
+    print("7. Full text (title, abstract, keywords)")
 
     try:
-        choice = input("\n🎯 Select search type (1-6): ").strip()
+        choice = input("\n🎯 Select search type (1-7): ").strip()
         search_types = {
             "1": "title",
             "2": "professor",
             "3": "keywords",
             "4": "author",
             "5": "year",
-            "6": "judges"
+            "6": "judges",
+            "7": "fulltext"
         }
 
         if choice not in search_types:
@@ -491,11 +465,19 @@ def search_theses():
             return
 
         # Perform search
-        from src.utils.helpers import search_theses, open_file
-        results = search_theses(search_query, search_types[choice])
+        from src.utils.helpers import search_theses, full_text_search, open_file
+        if search_types[choice] == "fulltext":
+            page = input("📄 Page number (default 1): ").strip()
+            page = int(page) if page.isdigit() and int(page) > 0 else 1
+            results, total = full_text_search(search_query, page)
+
+            # Display results
+            print(f"\n✅ Number of results found: {total} (page {page}, ranked by relevance)")
+        else:
+            results = search_theses(search_query, search_types[choice])
 
-        # Display results
-        print(f"\n✅ Number of results found: {len(results)}")
+            # Display results
+            print(f"\n✅ Number of results found: {len(results)}")
         print("=" * 60)
 
         if not results:
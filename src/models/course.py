@@ -1,7 +1,14 @@
-class ThesisCourse:
+from src.models.record import Record
+
+
+class ThesisCourse(Record):
     """
     کلاس درس پایان‌نامه
     """
+    FIELDS = ("course_id", "title", "professor_id", "year", "semester", "capacity", "resources",
+              "sessions_count", "units", "version")
+    __slots__ = FIELDS
+
     def __init__(self, course_id: str, title: str, professor_id: str, year: int, semester: str, capacity: int, resources: str, sessions_count: int, units: int):
         self.course_id = course_id  # پوئیک
         self.title = title
@@ -12,32 +19,5 @@ class ThesisCourse:
         self.resources = resources  # منابع درس
         self.sessions_count = sessions_count
         self.units = units
-
-    def to_dict(self) -> dict:
-        """تبدیل شیء درس به دیکشنری برای ذخیره در JSON"""
-        return {
-            "course_id": self.course_id,
-            "title": self.title,
-            "professor_id": self.professor_id,
-            "year": self.year,
-            "semester": self.semester,
-            "capacity": self.capacity,
-            "resources": self.resources,
-            "sessions_count": self.sessions_count,
-            "units": self.units
-        }
-
-    @classmethod
-    def from_dict(cls, data: dict):
-        """ساخت یک شیء ThesisCourse از یک دیکشنری"""
-        return cls(
-            data["course_id"],
-            data["title"],
-            data["professor_id"],
-            data["year"],
-            data["semester"],
-            data["capacity"],
-            data["resources"],
-            data["sessions_count"],
-            data["units"]
-        )
\ No newline at end of file
+        self.version = None  # شماره نسخه رکورد؛ با هر تغییر ذخیره‌شده یکی زیاد می‌شود
+        self.extra = None
@@ -0,0 +1,79 @@
+import gc
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+# Generated field-filling function of each Record class, see _compile_builder
+_builders: Dict[type, Callable[[Any, Callable], None]] = {}
+
+
+class Record:
+    """
+    پایه‌ی مدل‌هایی که در فایل‌های JSON ذخیره می‌شوند.
+    هر فیلد یک slot است (بدون __dict__)، پس هر شیء حافظه‌ی بسیار کمتری از دیکشنری معادلش می‌گیرد.
+    فیلدهایی که در FIELDS نیستند (مثل version) در extra نگه داشته می‌شوند تا to_dict چیزی را از دست ندهد.
+    فقط برای خواندن استفاده می‌شوند (file_io.read_models، صفحه‌ی وضعیت درخواست دانشجو)؛
+    بقیه‌ی منوها و UnitOfWork همچنان با دیکشنری کار می‌کنند.
+    """
+    __slots__ = ("extra",)
+
+    # Stored fields, in the order they are written; absent fields get their DEFAULTS value (or None)
+    FIELDS: Tuple[str, ...] = ()
+    DEFAULTS: Dict[str, Any] = {}
+
+    def to_dict(self) -> dict:
+        """تبدیل شیء به دیکشنری برای ذخیره در JSON (فیلدهای None نوشته نمی‌شوند)"""
+        data = {}
+        for field in self.FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                data[field] = value
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """ساخت یک شیء از یک دیکشنری"""
+        return cls.from_dicts([data])[0]
+
+    @classmethod
+    def from_dicts(cls, records: Iterable[dict]) -> List["Record"]:
+        """
+        ساخت دسته‌ای اشیاء از دیکشنری‌ها، بدون صدا زدن __init__ برای هر رکورد.
+        records می‌تواند یک iterator باشد (مثلاً iter_records) تا دیکشنری‌ها یکجا در حافظه نمانند.
+        """
+        build = _builders.get(cls)
+        if build is None:
+            build = _builders[cls] = _compile_builder(cls)
+
+        known = frozenset(cls.FIELDS)
+        new = object.__new__
+        result = []
+        append = result.append
+        # Nothing built here can form a cycle, so the garbage collector would only slow the batch down
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            for data in records:
+                obj = new(cls)
+                build(obj, data.get)
+                obj.extra = None if known.issuperset(data) else {k: v for k, v in data.items() if k not in known}
+                append(obj)
+        finally:
+            if collecting:
+                gc.enable()
+        return result
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+def _compile_builder(cls: type) -> Callable[[Any, Callable], None]:
+    """
+    Generate a function that fills every field of an object from a record's get method,
+    one plain attribute store per field; much faster than looping over FIELDS with setattr.
+    """
+    lines = ["def build(obj, get):"]
+    lines += [f"    obj.{field} = get({field!r}, defaults[{field!r}])" for field in cls.FIELDS] or ["    pass"]
+    namespace = {"defaults": {field: cls.DEFAULTS.get(field) for field in cls.FIELDS}}
+    exec("\n".join(lines), namespace)
+    return namespace["build"]
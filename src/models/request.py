@@ -1,7 +1,8 @@
 from datetime import datetime
+from src.models.record import Record
 
 
-class EnrollmentRequest:
+class EnrollmentRequest(Record):
     """
     کلاس درخواست اخذ پایان‌نامه
     """
@@ -9,6 +10,11 @@ class EnrollmentRequest:
     STATUS_APPROVED = "تأیید شده"
     STATUS_REJECTED = "رد شده"
 
+    FIELDS = ("request_id", "student_id", "course_id", "professor_id", "status", "created_at",
+              "approved_date", "rejected_date", "version")
+    DEFAULTS = {"approved_date": "-", "rejected_date": "-"}
+    __slots__ = FIELDS
+
     def __init__(self, request_id: str, student_id: str, course_id: str, professor_id: str, status: str = STATUS_PENDING):
         self.request_id = request_id
         self.student_id = student_id
@@ -16,27 +22,7 @@ class EnrollmentRequest:
         self.professor_id = professor_id
         self.status = status
         self.created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")  # تاریخ ایجاد
-
-    def to_dict(self) -> dict:
-        """تبدیل شیء درخواست به دیکشنری برای ذخیره در JSON"""
-        return {
-            "request_id": self.request_id,
-            "student_id": self.student_id,
-            "course_id": self.course_id,
-            "professor_id": self.professor_id,
-            "status": self.status,
-            "created_at": self.created_at
-        }
-
-    @classmethod
-    def from_dict(cls, data: dict):
-        """ساخت یک شیء EnrollmentRequest از یک دیکشنری"""
-        request = cls(
-            data["request_id"],
-            data["student_id"],
-            data["course_id"],
-            data["professor_id"],
-            data["status"]
-        )
-        request.created_at = data["created_at"]
-        return request
\ No newline at end of file
+        self.approved_date = "-"
+        self.rejected_date = "-"
+        self.version = None  # شماره نسخه رکورد؛ با هر تغییر ذخیره‌شده یکی زیاد می‌شود
+        self.extra = None
@@ -6,6 +6,8 @@ class User(ABC):
     """
     کلاس انتزاعی پایه برای همه کاربران سیستم
     """
+    __slots__ = ("user_id", "national_id", "name", "_password")
+
     def __init__(self, user_id: str, national_id: str, name: str, password: str):
         self.user_id = user_id  # کد دانشجویی یا کد استادی
         self.national_id = national_id
@@ -31,6 +33,8 @@ class Student(User):
     """
     کلاس دانشجو
     """
+    __slots__ = ()
+
     def get_role(self) -> str:
         return "student"
 
@@ -38,6 +42,8 @@ class external_judge(User):
     """
     کلاس داور خارجی
     """
+    __slots__ = ()
+
     def get_role(self) -> str:
         return "external_judge"
 
@@ -46,22 +52,20 @@ class Professor(User):
     """
     کلاس استاد
     """
-    def __init__(self, user_id: str, national_id: str, name: str, password: str):
-        super().__init__(user_id, national_id, name, password)
-        self._supervision_capacity = 5  # ظرفیت راهنمایی: ۵ دانشجو
-        self._judgment_capacity = 10    # ظرفیت داوری: ۱۰ دانشجو
+    # ظرفیت پیش‌فرض راهنمایی (۵ دانشجو) و داوری (۱۰ دفاع) در src/utils/capacity.py تعریف شده است
+    __slots__ = ()
 
     def get_role(self) -> str:
         return "professor"
 
     def has_supervision_capacity(self) -> bool:
-        """آیا استاد ظرفیت خالی برای راهنمایی دارد؟"""
-        # TODO: باید تعداد دانشجویان تحت راهنمایی این استاد از فایل JSON شمارش شود
-        # فعلاً به صورت ساده:
-        return self._supervision_capacity > 0
+        """آیا استاد ظرفیت خالی برای راهنمایی دارد؟ (بار فعلی از دفتر ظرفیت خوانده می‌شود)"""
+        from src.utils.capacity import capacity_ledger
+        return capacity_ledger.supervision_remaining(self.user_id) > 0
 
     def has_judgment_capacity(self) -> bool:
-        """آیا استاد ظرفیت خالی برای داوری دارد؟"""
-        # TODO: باید تعداد داوری‌های فعال این استاد از فایل JSON شمارش شود
-        # فعلاً به صورت ساده:
-        return self._judgment_capacity > 0
\ No newline at end of file
+        """آیا استاد ظرفیت خالی برای داوری دارد؟ (بار فعلی از دفتر ظرفیت خوانده می‌شود)"""
+        from src.utils.capacity import capacity_ledger
+        from src.utils.user_index import user_index
+        professor = user_index.get("professor", self.user_id) or {"user_id": self.user_id}
+        return capacity_ledger.judgment_remaining(professor) > 0
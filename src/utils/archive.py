@@ -0,0 +1,33 @@
+from typing import Any, Dict, Optional
+from src.utils.file_io import append_json
+from src.utils.sequences import next_id
+from src.utils.search_index import search_index, DEFENDED_THESES_FILE
+from src.utils.reports import reports
+from src.utils.unit_of_work import UnitOfWork
+
+
+def append_to_archive(thesis: Dict[str, Any], uow: Optional[UnitOfWork] = None) -> bool:
+    """
+    Add a closed thesis to the defended-theses archive, index it for full-text search and
+    count it in the archive reports.
+    With a unit of work the thesis is saved (and indexed) when the unit commits.
+    Returns: True if successful, False if error
+    """
+    if not thesis.get("thesis_id"):
+        thesis["thesis_id"] = next_id("thesis")
+
+    if uow is not None:
+        defended_theses = uow.load(DEFENDED_THESES_FILE)
+        defended_theses.append(thesis)
+        uow.mark_changed(DEFENDED_THESES_FILE)
+        # Other sessions may append first, so the final position is only known after commit
+        uow.on_commit(search_index.sync)
+        uow.on_commit(reports.sync)
+        return True
+
+    if not append_json(DEFENDED_THESES_FILE, thesis):
+        return False
+
+    search_index.sync()
+    reports.sync()
+    return True
@@ -1,14 +1,113 @@
 import hashlib
-from typing import Optional, Dict, Any
+import hmac
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Dict, Any, List
 from src.models.user import Student, Professor, User, external_judge
-from src.utils.file_io import read_json, write_json
+from src.utils.file_io import read_json, update_record
+from src.utils.user_index import user_index, USER_FILES
+from src.utils.sessions import sessions
+from src.utils.rate_limit import login_retry_after, record_login
+
+USER_CLASSES = {
+    "student": Student,
+    "professor": Professor,
+    "external_judge": external_judge
+}
+
+# Password hashes are stored as "algorithm$parameters$salt$hash" (salt and hash in hex).
+# Old hashes without '$' are unsalted SHA-256; they still verify and are replaced on the next login,
+# as is any hash made with other parameters than the current ones.
+# The cost is tuned with benchmarks/bench_password_hash.py to keep login latency within budget.
+PASSWORD_ALGORITHM = os.environ.get("THESIS_PASSWORD_ALGORITHM", "scrypt")  # "scrypt" or "pbkdf2_sha256"
+SCRYPT_N = int(os.environ.get("THESIS_SCRYPT_N", 2 ** 14))
+SCRYPT_R = int(os.environ.get("THESIS_SCRYPT_R", 8))
+SCRYPT_P = int(os.environ.get("THESIS_SCRYPT_P", 1))
+PBKDF2_ITERATIONS = int(os.environ.get("THESIS_PBKDF2_ITERATIONS", 200_000))
+
+SALT_SIZE = 16
+HASH_SIZE = 32
+
+
+def _parameters(algorithm: str) -> str:
+    """Current cost parameters of an algorithm, as written in its hashes"""
+    if algorithm == "scrypt":
+        return f"n={SCRYPT_N},r={SCRYPT_R},p={SCRYPT_P}"
+    return f"i={PBKDF2_ITERATIONS}"
+
+
+def _derive(algorithm: str, parameters: str, password: str, salt: bytes) -> bytes:
+    """
+    Run the key derivation function named in a stored hash.
+    Raises ValueError for an unknown algorithm or malformed parameters.
+    """
+    values = dict(item.split("=", 1) for item in parameters.split(","))
+    secret = password.encode('utf-8')
+    if algorithm == "scrypt":
+        n, r, p = int(values["n"]), int(values["r"]), int(values["p"])
+        # hashlib refuses to use more than 32 MiB by default; allow what these parameters need
+        return hashlib.scrypt(secret, salt=salt, n=n, r=r, p=p, dklen=HASH_SIZE,
+                              maxmem=128 * r * (n + p + 2) + 1024 * 1024)
+    if algorithm == "pbkdf2_sha256":
+        return hashlib.pbkdf2_hmac("sha256", secret, salt, int(values["i"]), HASH_SIZE)
+    raise ValueError(f"unknown password hash algorithm {algorithm}")
 
 
 def hash_password(password: str) -> str:
     """
-    Hash the password using SHA-256
+    Hash the password with a random salt and the configured key derivation function
+    """
+    salt = os.urandom(SALT_SIZE)
+    parameters = _parameters(PASSWORD_ALGORITHM)
+    derived = _derive(PASSWORD_ALGORITHM, parameters, password, salt)
+    return f"{PASSWORD_ALGORITHM}${parameters}${salt.hex()}${derived.hex()}"
+
+
+def hash_passwords(passwords: List[str], workers: Optional[int] = None) -> List[str]:
+    """
+    Hash many passwords on all CPU cores, for bulk imports.
+    Returns: the hashes, in the order of passwords
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(passwords) < 2:
+        return [hash_password(password) for password in passwords]
+    with ProcessPoolExecutor(min(workers, len(passwords))) as pool:
+        return list(pool.map(hash_password, passwords, chunksize=max(1, len(passwords) // (4 * workers))))
+
+
+def verify_password(password: str, stored_hash: str) -> bool:
+    """Check a password against a stored hash of any supported format, in constant time"""
+    if "$" not in stored_hash:
+        legacy = hashlib.sha256(password.encode('utf-8')).hexdigest()
+        return hmac.compare_digest(legacy, stored_hash)
+    try:
+        algorithm, parameters, salt, expected = stored_hash.split("$")
+        derived = _derive(algorithm, parameters, password, bytes.fromhex(salt))
+    except (ValueError, KeyError):
+        return False
+    return hmac.compare_digest(derived.hex(), expected)
+
+
+def needs_rehash(stored_hash: str) -> bool:
+    """Whether a stored hash is a legacy hash or was made with other than the current algorithm and cost"""
+    prefix = f"{PASSWORD_ALGORITHM}${_parameters(PASSWORD_ALGORITHM)}$"
+    return not stored_hash.startswith(prefix)
+
+
+def _store_password(user_id: str, role: str, hashed_password: str) -> Optional[Dict[str, Any]]:
+    """
+    Save a new password hash for a user
+    Returns: the saved user data, or None if it could not be saved
     """
-    return hashlib.sha256(password.encode('utf-8')).hexdigest()
+    def set_password(record):
+        record["password"] = hashed_password
+
+    try:
+        user_data, _ = update_record(USER_FILES[role], "user_id", user_id, set_password)
+    except OSError:
+        return None
+    # user_index follows the change through file_io's change feed
+    return user_data
 
 
 def change_password(user: User, old_password: str, new_password: str, confirm_password: str) -> bool:
@@ -18,22 +117,13 @@ def change_password(user: User, old_password: str, new_password: str, confirm_pa
     """
     try:
         role = user.get_role()
-        file_path = f"data/users/{role}s.json"
-
-        users_data = read_json(file_path)
-
-        if not users_data:
-            print("❌ Error reading users data!")
-            return False
-
-        user_data = next((u for u in users_data if u["user_id"] == user.user_id), None)
+        user_data = user_index.get(role, user.user_id)
 
         if not user_data:
             print("❌ User not found!")
             return False
 
-        hashed_old_password = hash_password(old_password)
-        if user_data["password"] != hashed_old_password:
+        if not verify_password(old_password, user_data["password"]):
             print("❌ Current password is incorrect!")
             return False
 
@@ -42,11 +132,11 @@ def change_password(user: User, old_password: str, new_password: str, confirm_pa
             return False
 
         hashed_new_password = hash_password(new_password)
+        user_data = _store_password(user.user_id, role, hashed_new_password)
 
-        user_data["password"] = hashed_new_password
-        user._password = hashed_new_password
-
-        if write_json(file_path, users_data):
+        if user_data:
+            user._password = hashed_new_password
+            sessions.invalidate_user(role, user.user_id)
             print("✅ Password changed successfully.")
             return True
         else:
@@ -58,46 +148,37 @@ def change_password(user: User, old_password: str, new_password: str, confirm_pa
         return False
 
 
-def verify_user(user_id: str, password: str, role: str) -> Optional[User]:
+def verify_user(user_id: str, password: str, role: str, client: Optional[str] = None) -> Optional[User]:
     """
-    Verify user credentials and return a User object if successful
+    Verify user credentials and return a User object if successful.
+    Too many recent failures for the user ID, or for the client if the caller can identify one
+    (e.g. a network address), refuse the attempt before any lookup or hashing (see rate_limit).
     """
     try:
-        if role == "student":
-            file_path = "data/users/students.json"
-        elif role == "professor":
-            file_path = "data/users/professors.json"
-        else:
-            file_path = "data/users/external_judges.json"
-
-        users_data = read_json(file_path)
-
-        user_data = next((u for u in users_data if u["user_id"] == user_id), None)
-
-        if user_data:
-            hashed_input_password = hash_password(password)
-            if user_data["password"] == hashed_input_password:
-                if role == "student":
-                    return Student(
-                        user_data["user_id"],
-                        user_data["national_id"],
-                        user_data["name"],
-                        user_data["password"]
-                    )
-                elif role == "professor":
-                    return Professor(
-                        user_data["user_id"],
-                        user_data["national_id"],
-                        user_data["name"],
-                        user_data["password"]
-                    )
-                else:
-                    return external_judge(
-                        user_data["user_id"],
-                        user_data["national_id"],
-                        user_data["name"],
-                        user_data["password"]
-                    )
+        retry_after = login_retry_after(user_id, client)
+        if retry_after:
+            print(f"⚠️ Too many failed login attempts. Try again in {int(retry_after) + 1} seconds.")
+            return None
+
+        if role not in USER_CLASSES:
+            role = "external_judge"
+
+        user_data = user_index.get(role, user_id)
+        valid = bool(user_data) and verify_password(password, user_data["password"])
+        record_login(user_id, client, valid)
+
+        if valid:
+            if needs_rehash(user_data["password"]):
+                # Upgrade the stored hash now that the plain password is known; login works either way
+                saved = _store_password(user_id, role, hash_password(password))
+                if saved:
+                    user_data = saved
+            return USER_CLASSES[role](
+                user_data["user_id"],
+                user_data["national_id"],
+                user_data["name"],
+                user_data["password"]
+            )
         return None
     except Exception as e:
         print(f"Error verifying user: {e}")
@@ -110,9 +191,7 @@ def find_user_by_id(user_id: str, role: str) -> Optional[Dict[str, Any]]:
     Returns: user data dictionary or None
     """
     try:
-        file_path = "data/users/students.json" if role == "student" else "data/users/professors.json"
-        users_data = read_json(file_path)
-        return next((u for u in users_data if u["user_id"] == user_id), None)
+        return user_index.get(role, user_id)
     except Exception as e:
         print(f"Error finding user: {e}")
         return None
@@ -0,0 +1,195 @@
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+from typing import Callable, Iterator, Optional
+from src.utils.file_io import get_full_path, _fsync_directory
+
+try:
+    import fcntl
+except ImportError:  # Windows: no reflinks, blobs are always copied
+    fcntl = None
+
+# Documents are stored once per content, as documents/blobs/ab/cd/abcd...; records keep the SHA-256
+BLOBS_DIR = "documents/blobs"
+CHUNK_SIZE = 1024 * 1024
+FICLONE = 0x40049409  # Linux ioctl sharing the extents of a file (btrfs, XFS); others copy
+
+
+def blob_path(digest: str) -> str:
+    """Relative path of a blob, e.g. documents/blobs/ab/cd/abcd..."""
+    return f"{BLOBS_DIR}/{digest[:2]}/{digest[2:4]}/{digest}"
+
+
+def has_blob(digest: str) -> bool:
+    return os.path.exists(get_full_path(blob_path(digest)))
+
+
+def _incoming_file() -> str:
+    """Temporary file inside the store, so a finished blob is moved into place with a rename"""
+    directory = os.path.join(get_full_path(BLOBS_DIR), ".incoming")
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory)
+    os.close(fd)
+    return temp_path
+
+
+def _clone(source, target) -> bool:
+    """Share the source's extents with the target instead of copying them, where the filesystem can"""
+    if fcntl is None:
+        return False
+    try:
+        fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+        return True
+    except OSError:
+        return False
+
+
+class BlobTooLarge(Exception):
+    """A file is larger than the size limit it is stored with"""
+
+
+def _copy_chunks(source, target, max_size: Optional[int] = None,
+                 progress: Optional[Callable[[int], None]] = None) -> "hashlib._Hash":
+    """
+    Hash a file in fixed-size chunks (and write them to target, if given) through one reused buffer.
+    progress is called with the number of bytes done after each chunk.
+    """
+    digest = hashlib.sha256()
+    buffer = bytearray(CHUNK_SIZE)
+    view = memoryview(buffer)
+    done = 0
+    while True:
+        read = source.readinto(buffer)
+        if not read:
+            return digest
+        done += read
+        if max_size is not None and done > max_size:
+            raise BlobTooLarge(f"larger than {max_size} bytes")
+        digest.update(view[:read])
+        if target is not None:
+            target.write(view[:read])
+        if progress is not None:
+            progress(done)
+
+
+def _store(temp_path: str, digest: str) -> str:
+    """Move a finished temporary file into place, or drop it if the store already has this content"""
+    full_path = get_full_path(blob_path(digest))
+    if os.path.exists(full_path):
+        os.remove(temp_path)
+        return digest
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    os.chmod(temp_path, 0o444)  # blobs are shared by every name linked to them, never edited in place
+    os.replace(temp_path, full_path)
+    _fsync_directory(os.path.dirname(full_path))
+    return digest
+
+
+def put_file(source_path: str, max_size: Optional[int] = None,
+             progress: Optional[Callable[[int], None]] = None) -> str:
+    """
+    Add a file to the store and return its SHA-256.
+    The file is hashed while it is copied in fixed-size chunks (or hashed from a reflink clone,
+    which costs no data writes); content the store already has is not kept twice.
+    Raises BlobTooLarge, leaving nothing behind, if the file has more than max_size bytes.
+    """
+    temp_path = _incoming_file()
+    try:
+        with open(source_path, 'rb') as source, open(temp_path, 'r+b') as target:
+            if max_size is not None and os.fstat(source.fileno()).st_size > max_size:
+                raise BlobTooLarge(f"larger than {max_size} bytes")
+            if _clone(source, target):
+                # Hash the private clone, so a later change to the source cannot slip in
+                digest = _copy_chunks(target, None, max_size, progress)
+            else:
+                digest = _copy_chunks(source, target, max_size, progress)
+            target.flush()
+            os.fsync(target.fileno())
+        return _store(temp_path, digest.hexdigest())
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def put_bytes(data: bytes) -> str:
+    """Add content held in memory to the store and return its SHA-256"""
+    temp_path = _incoming_file()
+    try:
+        with open(temp_path, 'wb') as target:
+            target.write(data)
+            target.flush()
+            os.fsync(target.fileno())
+        return _store(temp_path, hashlib.sha256(data).hexdigest())
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def link_blob(digest: str, relative_path: str) -> str:
+    """
+    Give a blob a readable name (e.g. documents/theses/student_1.course_1.<hash>.pdf) as a hard link,
+    so the name costs no disk space; falls back to a copy (sendfile where available, as no hashing
+    is needed here) where hard links are not possible.
+    Returns: relative_path
+    """
+    source = get_full_path(blob_path(digest))
+    target = get_full_path(relative_path)
+    if os.path.exists(target) and os.path.samefile(source, target):
+        return relative_path
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    temp_path = f"{target}.{os.getpid()}.tmp"
+    try:
+        os.link(source, temp_path)
+    except OSError:
+        shutil.copyfile(source, temp_path)
+    os.replace(temp_path, target)
+    return relative_path
+
+
+def open_blob(digest: str):
+    """Open a blob for reading (binary)"""
+    return open(get_full_path(blob_path(digest)), 'rb')
+
+
+def iter_blobs() -> Iterator[str]:
+    """SHA-256 of every blob in the store"""
+    root = get_full_path(BLOBS_DIR)
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories[:] = [d for d in subdirectories if d != ".incoming"]
+        for name in files:
+            if len(name) == 64:
+                yield name
+
+
+def verify(digest: Optional[str] = None) -> bool:
+    """
+    Re-hash one blob, or every blob, and report any whose content no longer matches its name.
+    Returns: True if all checked blobs are intact
+    """
+    ok = True
+    for name in [digest] if digest else iter_blobs():
+        try:
+            with open_blob(name) as file:
+                intact = _copy_chunks(file, None).hexdigest() == name
+        except OSError as e:
+            print(f"❌ Cannot read blob {name}: {e}")
+            ok = False
+            continue
+        if not intact:
+            print(f"❌ Blob {name} is damaged")
+            ok = False
+    return ok
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3) or sys.argv[1] != "verify":
+        print("Usage: python -m src.utils.blob_store verify [sha256]")
+        sys.exit(1)
+    if verify(sys.argv[2] if len(sys.argv) == 3 else None):
+        print("✅ All blobs intact")
+    else:
+        sys.exit(1)
@@ -0,0 +1,284 @@
+import csv
+import os
+import sys
+import time
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from src.utils import codec
+from src.utils.auth import hash_passwords
+from src.utils.file_io import append_records, iter_records
+from src.utils.helpers import validate_email, validate_phone, validate_national_id, is_valid_date
+from src.utils.sequences import next_ids, _id_number
+from src.utils.user_index import user_index
+
+# Records validated, hashed and written together; one write of the collection per batch
+BATCH_SIZE = 5000
+
+# What can be imported: collection, id field, prefix of generated ids (a sequence name),
+# required fields, field types, and the columns written on export
+KINDS: Dict[str, Dict[str, Any]] = {
+    "students": {
+        "file": "data/users/students.json", "id": "user_id", "prefix": "student", "role": "student",
+        "required": ["national_id", "name"],
+        "columns": ["user_id", "national_id", "name", "email", "phone", "password_hash"]
+    },
+    "professors": {
+        "file": "data/users/professors.json", "id": "user_id", "prefix": "prof", "role": "professor",
+        "required": ["national_id", "name"], "int": ["judge_capacity"], "defaults": {"judge_capacity": 10},
+        "columns": ["user_id", "national_id", "name", "email", "phone", "judge_capacity", "password_hash"]
+    },
+    "external_judges": {
+        "file": "data/users/external_judges.json", "id": "user_id", "prefix": "ex", "role": "external_judge",
+        "required": ["national_id", "name"], "int": ["judge_capacity"], "defaults": {"judge_capacity": 10},
+        "columns": ["user_id", "national_id", "name", "email", "phone", "judge_capacity", "password_hash"]
+    },
+    "courses": {
+        "file": "data/courses/thesis_courses.json", "id": "course_id", "prefix": "course",
+        "required": ["title", "professor_id", "year", "semester", "capacity"],
+        "int": ["year", "capacity", "sessions_count", "units"],
+        "columns": ["course_id", "title", "professor_id", "year", "semester", "capacity", "resources",
+                    "sessions_count", "units"]
+    },
+    "theses": {
+        "file": "data/theses/defended_theses.json", "id": "thesis_id", "prefix": "thesis",
+        "required": ["title", "student_id", "professor_id", "defense_date"],
+        "float": ["internal_grade", "external_grade", "final_grade", "score"], "list": ["keywords"],
+        "columns": ["thesis_id", "title", "abstract", "keywords", "student_id", "professor_id", "defense_date",
+                    "internal_judge_id", "external_judge_id", "internal_grade", "external_grade", "final_grade",
+                    "final_letter_grade", "result"]
+    }
+}
+
+# Separator of list values (keywords) inside a CSV cell
+LIST_SEPARATOR = ";"
+
+# Rejected records reported one by one; the rest are only counted
+MAX_REPORTED_ERRORS = 20
+
+
+def _read_rows(path: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Stream (line number, row) from a CSV file with a header line, or from a JSON Lines file"""
+    if path.endswith(".csv"):
+        with open(path, newline='', encoding='utf-8-sig') as file:
+            reader = csv.DictReader(file)
+            for row in reader:
+                yield reader.line_num, row
+    else:
+        with open(path, 'rb') as file:
+            for line_number, line in enumerate(file, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_number, codec.loads(line)
+                except ValueError:
+                    yield line_number, None  # rejected by _convert like any other bad row
+
+
+def _batches(iterable: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _convert(kind: Dict[str, Any], row: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Turn a CSV/JSONL row into a record: empty cells are dropped and typed fields converted.
+    Raises ValueError or TypeError if a value has the wrong type.
+    """
+    if not isinstance(row, dict):
+        raise TypeError("not a JSON object")
+    record = dict(kind.get("defaults", {}))
+    for field, value in row.items():
+        if field is None or value is None or value == "":
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+        if field in kind.get("int", ()):
+            value = int(value)
+        elif field in kind.get("float", ()):
+            value = float(value)
+        elif field in kind.get("list", ()) and isinstance(value, str):
+            value = [item.strip() for item in value.split(LIST_SEPARATOR) if item.strip()]
+        record[field] = value
+    return record
+
+
+def _validate(kind: Dict[str, Any], record: Dict[str, Any], seen: Dict[str, Set[str]]) -> Optional[str]:
+    """Return why a record cannot be imported, or None if it is valid"""
+    missing = [field for field in kind["required"] if field not in record]
+    if missing:
+        return f"missing {', '.join(missing)}"
+    if "role" in kind:
+        if "password" not in record and "password_hash" not in record:
+            return "missing password"
+        if not validate_national_id(str(record["national_id"])):
+            return f"invalid national ID {record['national_id']}"
+        if record["national_id"] in seen["national_id"]:
+            return f"duplicate national ID {record['national_id']}"
+    if "email" in record and not validate_email(record["email"]):
+        return f"invalid email {record['email']}"
+    if "phone" in record and not validate_phone(record["phone"]):
+        return f"invalid phone {record['phone']}"
+    if "defense_date" in record and not is_valid_date(record["defense_date"]):
+        return f"invalid date {record['defense_date']}"
+    if "professor_id" in record and record["professor_id"] not in seen["professor_id"]:
+        return f"unknown professor {record['professor_id']}"
+    if kind["id"] in record and record[kind["id"]] in seen["id"]:
+        return f"duplicate ID {record[kind['id']]}"
+    return None
+
+
+def _existing_keys(kind: Dict[str, Any]) -> Dict[str, Set[str]]:
+    """IDs (and national IDs) already stored, to reject duplicates before anything is written"""
+    seen = {"id": set(), "national_id": set()}
+    for record in iter_records(kind["file"]):
+        seen["id"].add(record.get(kind["id"]))
+        if record.get("national_id"):
+            seen["national_id"].add(record["national_id"])
+    seen["professor_id"] = {record["user_id"] for record in user_index.all_users("professor")}
+    return seen
+
+
+def import_records(kind_name: str, path: str, batch_size: int = BATCH_SIZE,
+                   workers: Optional[int] = None) -> Tuple[int, int]:
+    """
+    Import a CSV or JSON Lines file into a collection, streaming it in batches.
+    Each batch is validated, gets its missing IDs from one sequence reservation, has its plain
+    passwords hashed on all cores (auth.hash_passwords), and is appended with a single write.
+    Returns: (records imported, records rejected)
+    """
+    kind = KINDS[kind_name]
+    seen = _existing_keys(kind)
+    imported = rejected = 0
+    highest = 0  # largest number among the explicit ids imported so far
+
+    for batch in _batches(_read_rows(path), batch_size):
+        records = []
+        for line_number, row in batch:
+            try:
+                record = _convert(kind, row)
+                error = _validate(kind, record, seen)
+            except (TypeError, ValueError) as e:
+                error = f"invalid value ({e})"
+            if error is not None:
+                rejected += 1
+                if rejected <= MAX_REPORTED_ERRORS:
+                    print(f"⚠️  {os.path.basename(path)}:{line_number}: {error}, skipped")
+                continue
+            if kind["id"] in record:
+                seen["id"].add(record[kind["id"]])
+                if str(record[kind["id"]]).startswith(f"{kind['prefix']}_"):
+                    highest = max(highest, _id_number(record[kind["id"]]))
+            if "national_id" in record:
+                seen["national_id"].add(record["national_id"])
+            records.append(record)
+        if not records:
+            continue
+
+        missing_ids = [position for position, record in enumerate(records) if kind["id"] not in record]
+        if missing_ids:
+            # Number generated ids above the explicit ones imported, and never reuse a taken one
+            new_ids = []
+            while len(new_ids) < len(missing_ids):
+                new_ids += [new_id for new_id in next_ids(kind["prefix"], len(missing_ids) - len(new_ids), highest)
+                            if new_id not in seen["id"]]
+            for position, new_id in zip(missing_ids, new_ids):
+                seen["id"].add(new_id)
+                records[position] = {kind["id"]: new_id, **records[position]}
+
+        if "role" in kind:
+            plain = [record for record in records if "password_hash" not in record]
+            hashes = hash_passwords([record["password"] for record in plain], workers)
+            for record, hashed in zip(plain, hashes):
+                record["password"] = hashed
+            for record in records:
+                if "password_hash" in record:
+                    record["password"] = record.pop("password_hash")
+                record["role"] = kind["role"]
+
+        if not append_records(kind["file"], records):
+            print(f"❌ Batch ending at {os.path.basename(path)}:{batch[-1][0]} was not saved; import stopped")
+            break
+        imported += len(records)
+        print(f"✅ {imported} records imported...")
+
+    if rejected > MAX_REPORTED_ERRORS:
+        print(f"⚠️  {rejected - MAX_REPORTED_ERRORS} more rejected records not shown")
+    if kind_name == "theses" and imported:
+        from src.utils.search_index import search_index
+        search_index.sync()
+    return imported, rejected
+
+
+def export_records(kind_name: str, path: str) -> int:
+    """
+    Stream a collection to a CSV or JSON Lines file (chosen by extension).
+    Passwords are exported as their stored hashes, in the password_hash column.
+    Returns: the number of records written
+    """
+    kind = KINDS[kind_name]
+    count = 0
+    if path.endswith(".csv"):
+        with open(path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.DictWriter(file, fieldnames=kind["columns"], extrasaction='ignore')
+            writer.writeheader()
+            for record in iter_records(kind["file"]):
+                row = dict(record, password_hash=record.get("password"))
+                for field in kind.get("list", ()):
+                    if isinstance(row.get(field), list):
+                        row[field] = LIST_SEPARATOR.join(row[field])
+                writer.writerow(row)
+                count += 1
+    else:
+        with open(path, 'wb') as file:
+            for record in iter_records(kind["file"]):
+                row = {field: value for field, value in record.items() if field not in ("password", "version")}
+                if "password" in record:
+                    row["password_hash"] = record["password"]
+                file.write(codec.dumps(row) + b"\n")
+                count += 1
+    return count
+
+
+def main(argv: List[str]) -> int:
+    """Command line entry point (see bulk.py)"""
+    usage = (f"Usage: python bulk.py import|export {'|'.join(KINDS)} FILE.csv|FILE.jsonl "
+             f"[--batch-size N] [--workers N]")
+    options = {"--batch-size": BATCH_SIZE, "--workers": None}
+    args = []
+    iterator = iter(argv)
+    try:
+        for arg in iterator:
+            if arg in options:
+                options[arg] = int(next(iterator))
+            else:
+                args.append(arg)
+    except (StopIteration, ValueError):
+        print(usage)
+        return 1
+    if len(args) != 3 or args[0] not in ("import", "export") or args[1] not in KINDS \
+            or not args[2].endswith((".csv", ".jsonl")):
+        print(usage)
+        return 1
+
+    command, kind_name, path = args
+    start = time.perf_counter()
+    try:
+        if command == "import":
+            imported, rejected = import_records(kind_name, path, options["--batch-size"], options["--workers"])
+            print(f"✅ {imported} {kind_name} imported, {rejected} rejected "
+                  f"in {time.perf_counter() - start:.1f}s")
+            return 0 if imported or not rejected else 1
+        count = export_records(kind_name, path)
+        print(f"✅ {count} {kind_name} exported to {path} in {time.perf_counter() - start:.1f}s")
+        return 0
+    except (OSError, ValueError) as e:
+        print(f"❌ {command.capitalize()} failed: {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,281 @@
+import sys
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Set, Tuple
+from src.utils.file_io import (load_collection, get_collection_version, add_change_listener, get_full_path,
+                               ChangeList)
+from src.utils.user_index import user_index, USER_FILES
+from src.utils.locking import file_lock, file_locks
+from src.utils.unit_of_work import UnitOfWork
+
+ENROLLMENT_REQUESTS_FILE = "data/requests/enrollment_requests.json"
+DEFENSE_REQUESTS_FILE = "data/requests/defense_requests.json"
+COURSES_FILE = "data/courses/thesis_courses.json"
+# Applied data migrations, one {"migration": name} record each
+SCHEMA_FILE = "data/schema.json"
+CAPACITY_MIGRATION = "capacity_totals"
+
+# Statuses are written in English by the menus; older records may carry the Persian ones
+PENDING_STATUSES = {"Pending Professor Approval", "در انتظار تأیید استاد"}
+APPROVED_STATUSES = {"Approved", "تایید شده", "تأیید شده"}
+CLOSED_STATUS = "Closed"
+
+# Limits used when a record does not set its own: supervision_capacity on a professor,
+# judge_capacity on a professor or external judge. A course's limit is its capacity field.
+SUPERVISION_CAPACITY = 5
+JUDGMENT_CAPACITY = 10
+
+
+def _enrollment_key(request: Optional[Dict[str, Any]]) -> Optional[Tuple[str, str, str]]:
+    """(student, course, professor) of an enrollment request that holds a place, else None"""
+    if request is None or request.get("status") not in PENDING_STATUSES | APPROVED_STATUSES:
+        return None
+    return request.get("student_id"), request.get("course_id"), request.get("professor_id")
+
+
+def _pending_judges(request: Optional[Dict[str, Any]]) -> List[str]:
+    """Judges of an approved defense who have not graded it yet"""
+    if request is None or request.get("status") not in APPROVED_STATUSES:
+        return []
+    judges = []
+    if request.get("internal_judge_id") and "internal_grade" not in request:
+        judges.append(request["internal_judge_id"])
+    if request.get("external_judge_id") and "external_grade" not in request:
+        judges.append(request["external_judge_id"])
+    return judges
+
+
+def _closed_student(request: Optional[Dict[str, Any]]) -> Optional[str]:
+    return request.get("student_id") if request is not None and request.get("status") == CLOSED_STATUS else None
+
+
+class CapacityLedger:
+    """
+    Live load of every course, supervisor and judge, derived from the request collections:
+    - a course and its professor hold a place for each pending or approved enrollment request,
+      until the student's thesis is closed;
+    - a judge holds a place for each approved defense they have not graded yet.
+    The counters are built in one pass and then kept up to date from the changes this process
+    writes (see file_io.add_change_listener), so every capacity check is a dict lookup.
+    """
+
+    def __init__(self, listen: bool = True):
+        self._versions: Dict[str, int] = {}
+        self._course_load: Counter = Counter()
+        self._supervision_load: Counter = Counter()
+        self._judgment_load: Counter = Counter()
+        # Enrollment requests holding a place: position -> (student, course, professor)
+        self._enrollments: Dict[int, Tuple[str, str, str]] = {}
+        self._enrollments_by_student: Dict[str, Set[int]] = {}
+        self._closed_defenses: Counter = Counter()  # student -> number of closed defense requests
+        if listen:
+            add_change_listener(self._on_change)
+
+    def _ensure(self) -> None:
+        """Rebuild the counters if a request collection changed behind our back"""
+        versions = {file_path: get_collection_version(file_path)
+                    for file_path in (ENROLLMENT_REQUESTS_FILE, DEFENSE_REQUESTS_FILE)}
+        if versions != self._versions:
+            self._rebuild()
+            self._versions = versions
+
+    def _rebuild(self) -> None:
+        self._course_load = Counter()
+        self._supervision_load = Counter()
+        self._judgment_load = Counter()
+        self._enrollments = {}
+        self._enrollments_by_student = {}
+        self._closed_defenses = Counter()
+        for request in load_collection(DEFENSE_REQUESTS_FILE):
+            self._update_defense(None, request)
+        for position, request in enumerate(load_collection(ENROLLMENT_REQUESTS_FILE)):
+            self._update_enrollment(position, None, request)
+
+    def _count_enrollment(self, key: Tuple[str, str, str], delta: int) -> None:
+        _, course_id, professor_id = key
+        self._course_load[course_id] += delta
+        self._supervision_load[professor_id] += delta
+
+    def _update_enrollment(self, position: int, before: Optional[Dict[str, Any]],
+                           after: Optional[Dict[str, Any]]) -> None:
+        old_key, new_key = self._enrollments.get(position), _enrollment_key(after)
+        if old_key == new_key:
+            return
+        if old_key is not None:
+            del self._enrollments[position]
+            self._enrollments_by_student[old_key[0]].discard(position)
+            if not self._closed_defenses[old_key[0]]:
+                self._count_enrollment(old_key, -1)
+        if new_key is not None:
+            self._enrollments[position] = new_key
+            self._enrollments_by_student.setdefault(new_key[0], set()).add(position)
+            if not self._closed_defenses[new_key[0]]:
+                self._count_enrollment(new_key, 1)
+
+    def _update_defense(self, before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]) -> None:
+        for judge_id in _pending_judges(before):
+            self._judgment_load[judge_id] -= 1
+        for judge_id in _pending_judges(after):
+            self._judgment_load[judge_id] += 1
+
+        old_closed, new_closed = _closed_student(before), _closed_student(after)
+        if old_closed == new_closed:
+            return
+        if old_closed is not None:
+            self._closed_defenses[old_closed] -= 1
+            if not self._closed_defenses[old_closed]:
+                self._release_student(old_closed, 1)
+        if new_closed is not None:
+            self._closed_defenses[new_closed] += 1
+            if self._closed_defenses[new_closed] == 1:
+                self._release_student(new_closed, -1)
+
+    def _release_student(self, student_id: str, delta: int) -> None:
+        """A closed thesis gives back the places of the student's enrollment requests (delta -1)"""
+        for position in self._enrollments_by_student.get(student_id, ()):
+            self._count_enrollment(self._enrollments[position], delta)
+
+    def _on_change(self, file_path: str, old_version: int, new_version: int, changes: ChangeList) -> None:
+        """Apply records written by this process, if the counters describe the version they changed"""
+        if file_path not in self._versions:
+            return
+        if self._versions[file_path] != old_version:
+            self._versions = {}  # out of step: rebuilt on next use
+            return
+        for position, before, after in changes:
+            if file_path == ENROLLMENT_REQUESTS_FILE:
+                self._update_enrollment(position, before, after)
+            else:
+                self._update_defense(before, after)
+        self._versions[file_path] = new_version
+
+    def course_load(self, course_id: str) -> int:
+        """Number of students holding a place in a course"""
+        self._ensure()
+        return self._course_load[course_id]
+
+    def supervision_load(self, professor_id: str) -> int:
+        """Number of students a professor currently supervises (or has pending requests from)"""
+        self._ensure()
+        return self._supervision_load[professor_id]
+
+    def judgment_load(self, judge_id: str) -> int:
+        """Number of approved defenses waiting for this judge's grade"""
+        self._ensure()
+        return self._judgment_load[judge_id]
+
+    def course_remaining(self, course: Dict[str, Any]) -> int:
+        """Free places of a course record"""
+        return course.get("capacity", 0) - self.course_load(course["course_id"])
+
+    def supervision_remaining(self, professor_id: str) -> int:
+        """How many more students a professor can supervise"""
+        professor = user_index.get("professor", professor_id) or {}
+        return professor.get("supervision_capacity", SUPERVISION_CAPACITY) - self.supervision_load(professor_id)
+
+    def judgment_remaining(self, judge: Dict[str, Any]) -> int:
+        """How many more defenses a professor or external judge (given by their record) can judge"""
+        return judge.get("judge_capacity", JUDGMENT_CAPACITY) - self.judgment_load(judge["user_id"])
+
+
+capacity_ledger = CapacityLedger()
+
+
+@contextmanager
+def capacity_lock():
+    """
+    Hold exclusive locks on both request collections while a place is checked and taken.
+    Every session takes them through here, in file_locks' fixed order, so two sessions never wait on
+    each other in a cycle. The ledger is brought up to date first, so the check under the locks is
+    normally just lookups. Callers must not wait for user input while holding it.
+    """
+    capacity_ledger._ensure()
+    with file_locks(get_full_path(file_path) for file_path in (ENROLLMENT_REQUESTS_FILE, DEFENSE_REQUESTS_FILE)):
+        yield
+
+
+def audit() -> bool:
+    """
+    Recompute every load in one pass over the request collections, compare it with the
+    maintained counters and with the limits, and print the result.
+    Returns: True if the counters were right and no limit is exceeded
+    """
+    maintained = (dict(capacity_ledger._course_load), dict(capacity_ledger._supervision_load),
+                  dict(capacity_ledger._judgment_load)) if capacity_ledger._versions else None
+    fresh = CapacityLedger(listen=False)
+    fresh._rebuild()
+    ok = True
+
+    if maintained is not None:
+        for name, old, new in zip(("course", "supervision", "judgment"), maintained,
+                                  (fresh._course_load, fresh._supervision_load, fresh._judgment_load)):
+            for key in set(old) | set(new):
+                if old.get(key, 0) != new.get(key, 0):
+                    print(f"⚠️  {name} load of {key} was {old.get(key, 0)}, recomputed {new.get(key, 0)}")
+                    ok = False
+
+    rows = []
+    for course in load_collection(COURSES_FILE):
+        rows.append(("course", course["course_id"], course.get("capacity", 0),
+                     fresh._course_load[course["course_id"]]))
+    for professor in user_index.all_users("professor"):
+        rows.append(("supervisor", professor["user_id"],
+                     professor.get("supervision_capacity", SUPERVISION_CAPACITY),
+                     fresh._supervision_load[professor["user_id"]]))
+    for role in ("professor", "external_judge"):
+        for judge in user_index.all_users(role):
+            rows.append(("judge", judge["user_id"], judge.get("judge_capacity", JUDGMENT_CAPACITY),
+                         fresh._judgment_load[judge["user_id"]]))
+
+    print(f"{'kind':<11} {'id':<16} {'limit':>6} {'load':>5} {'free':>5}")
+    for kind, key, limit, load in rows:
+        flag = "  ❌ over capacity" if load > limit else ""
+        print(f"{kind:<11} {key:<16} {limit:>6} {load:>5} {limit - load:>5}{flag}")
+        ok = ok and load <= limit
+    return ok
+
+
+def rebase() -> bool:
+    """
+    One-time migration: the capacity and judge_capacity fields used to hold the number of free
+    places and were changed by every action; they now hold the total, and the load is derived.
+    Adds the current load to each of them once, so the free places stay as they were; a missing
+    field counts as the default the ledger assumes. The fields and a marker record in SCHEMA_FILE
+    are committed in one unit of work, which keeps them in the same store (the SQLite database
+    holds SCHEMA_FILE too), so the migration never runs twice; main() calls it at startup, where
+    it does nothing once applied.
+    Returns: True if the migration was applied now
+    """
+    with file_lock(get_full_path(SCHEMA_FILE), exclusive=True):
+        uow = UnitOfWork()
+        schema = uow.load(SCHEMA_FILE)
+        if any(record.get("migration") == CAPACITY_MIGRATION for record in schema):
+            return False
+
+        loads = CapacityLedger(listen=False)
+        loads._rebuild()
+
+        def add_load(file_path, field, default, counter, key_field):
+            for record in uow.load(file_path):
+                record[field] = record.get(field, default) + counter[record[key_field]]
+            uow.mark_changed(file_path)
+
+        add_load(COURSES_FILE, "capacity", 0, loads._course_load, "course_id")
+        for role in ("professor", "external_judge"):
+            add_load(USER_FILES[role], "judge_capacity", JUDGMENT_CAPACITY, loads._judgment_load, "user_id")
+        schema.append({"migration": CAPACITY_MIGRATION})
+        uow.mark_changed(SCHEMA_FILE)
+        if not uow.commit():
+            print("❌ Error converting capacity fields!")
+            return False
+    print("✅ Capacity fields now hold total capacities")
+    return True
+
+
+if __name__ == "__main__":
+    commands = {"audit": lambda: sys.exit(0 if audit() else 1),
+                "rebase": lambda: rebase() or print("ℹ️ Capacity fields already hold total capacities")}
+    if len(sys.argv) != 2 or sys.argv[1] not in commands:
+        print("Usage: python -m src.utils.capacity audit|rebase")
+        sys.exit(1)
+    commands[sys.argv[1]]()
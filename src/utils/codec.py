@@ -0,0 +1,77 @@
+import gc
+import json
+from typing import Any, Optional, Union
+
+# orjson or msgspec are used when installed (both are optional); the standard library otherwise
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+if orjson is not None:
+    BACKEND = "orjson"
+elif msgspec is not None:
+    BACKEND = "msgspec"
+else:
+    BACKEND = "json"
+
+# Parsing a large collection creates many objects at once; the cyclic garbage collector would
+# run repeatedly over them for nothing (parsed JSON has no cycles), so it is paused meanwhile
+GC_PAUSE_THRESHOLD = 1024 * 1024
+
+if msgspec is not None:
+    _msgspec_encoder = msgspec.json.Encoder()
+    _msgspec_decoder = msgspec.json.Decoder()
+
+
+def dumps(data: Any, indent: Optional[int] = None) -> bytes:
+    """
+    Serialize data to UTF-8 JSON; non-ASCII text is written as is.
+    indent=None gives compact output without any whitespace.
+    """
+    if indent is None:
+        try:
+            if orjson is not None:
+                return orjson.dumps(data)
+            if msgspec is not None:
+                return _msgspec_encoder.encode(data)
+        except (TypeError, ValueError, OverflowError):
+            pass  # e.g. integers beyond 64 bits: the standard library handles them
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode('utf-8')
+
+    if indent == 2 and orjson is not None:
+        try:
+            return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+        except (TypeError, ValueError, OverflowError):
+            pass
+    return json.dumps(data, ensure_ascii=False, indent=indent).encode('utf-8')
+
+
+def loads(content: Union[bytes, str]) -> Any:
+    """
+    Parse JSON text or UTF-8 bytes.
+    Raises json.JSONDecodeError on invalid input, whichever backend is used.
+    """
+    if len(content) < GC_PAUSE_THRESHOLD or not gc.isenabled():
+        return _loads(content)
+    gc.disable()
+    try:
+        return _loads(content)
+    finally:
+        gc.enable()
+
+
+def _loads(content: Union[bytes, str]) -> Any:
+    if orjson is not None:
+        return orjson.loads(content)  # orjson.JSONDecodeError is a json.JSONDecodeError
+    if msgspec is not None:
+        try:
+            return _msgspec_decoder.decode(content)
+        except msgspec.DecodeError as e:
+            raise json.JSONDecodeError(str(e), content if isinstance(content, str) else "", 0) from e
+    return json.loads(content)
@@ -0,0 +1,82 @@
+import codecs
+import os
+import sys
+from typing import Dict, Tuple
+
+# Tried in order on files without a BOM; latin-1 accepts any byte sequence, so it comes last
+FALLBACK_ENCODINGS = ['utf-8', 'cp1256', 'latin-1']
+
+# Detected encoding per file: absolute path -> ((inode, mtime_ns, size), encoding)
+_detected: Dict[str, Tuple[Tuple[int, int, int], str]] = {}
+
+
+def detect_encoding(content: bytes) -> str:
+    """Return the encoding of file content: from its BOM if it has one, else the first that decodes it"""
+    if content.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    for encoding in FALLBACK_ENCODINGS:
+        try:
+            content.decode(encoding)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return 'latin-1'
+
+
+def read_text(full_path: str) -> str:
+    """
+    Read a text file with a single binary read and decode it in memory.
+    The detected encoding is remembered per file (by inode and mtime), so an unchanged
+    legacy file is not detected again.
+    """
+    with open(full_path, 'rb') as file:
+        st = os.fstat(file.fileno())
+        content = file.read()
+
+    key = (st.st_ino, st.st_mtime_ns, st.st_size)
+    cached = _detected.get(full_path)
+    if cached is not None and cached[0] == key:
+        encoding = cached[1]
+    else:
+        encoding = detect_encoding(content)
+        _detected[full_path] = (key, encoding)
+    return content.decode(encoding)
+
+
+def normalize_data_files(directory: str) -> int:
+    """
+    Rewrite every JSON/JSON Lines file under directory as UTF-8 without BOM,
+    so later reads never need a fallback encoding.
+    Returns: the number of files rewritten
+    """
+    from src.utils.file_io import _atomic_write
+    from src.utils.locking import file_lock
+
+    rewritten = 0
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if name.startswith(".") or not name.endswith((".json", ".jsonl")):
+                continue
+            full_path = os.path.join(root, name)
+            # Logs are locked through their collection file, like every writer does
+            lock_path = os.path.splitext(full_path)[0] + ".json"
+            with file_lock(lock_path, exclusive=True):
+                with open(full_path, 'rb') as file:
+                    content = file.read()
+                encoding = detect_encoding(content)
+                if encoding == 'utf-8':
+                    continue
+                _atomic_write(full_path, content.decode(encoding).encode('utf-8'))
+            print(f"✅ {os.path.relpath(full_path, directory)}: converted from {encoding}")
+            rewritten += 1
+    return rewritten
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["normalize"]:
+        print("Usage: python -m src.utils.encoding normalize")
+        sys.exit(1)
+    from src.utils.file_io import get_full_path
+
+    count = normalize_data_files(get_full_path("data"))
+    print(f"✅ {count} file(s) rewritten as UTF-8")
@@ -1,93 +1,788 @@
+import copy
 import json
 import os
-from typing import Any, Dict, List
+import shutil
+import stat
+import tempfile
+from datetime import datetime
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple, Union
+from src.utils.locking import file_lock, file_locks, VERSION_FIELD
+from src.utils.sqlite_storage import SqliteStorage
+from src.utils import codec, jsonl_log, line_store
+from src.utils.encoding import read_text
+from src.utils.json_stream import iter_json_array, iter_log
 
 # Find project root path
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# Parsed collections kept in memory, keyed by absolute path.
+# Each entry is (stat signature, version, records); the signature is (mtime_ns, size).
+_collection_cache: Dict[str, Tuple[Tuple[int, int], int, List[Dict[str, Any]]]] = {}
+_cache_stats = {"hits": 0, "misses": 0}
+_version_counter = 0
+
+# "json" keeps one JSON file per collection; "sqlite" stores the core collections in SQLITE_DB_FILE
+# (run `python -m src.utils.sqlite_storage migrate` once to import the JSON files);
+# "jsonl" keeps the request and archive collections as append-only logs next to their JSON files
+# (run `python -m src.utils.jsonl_log to-jsonl` once to convert them).
+STORAGE_BACKEND = os.environ.get("THESIS_STORAGE", "json")
+SQLITE_DB_FILE = "data/thesis.db"
+_sqlite_storage: Optional[SqliteStorage] = None
+
+# Read once at import: os.umask can only be read by setting it, which is not thread-safe
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+# Number of lines in each log as last seen by this process, keyed by the collection's absolute path
+_log_line_counts: Dict[str, int] = {}
+
+# Callbacks told which records a write of this process changed, see add_change_listener
+ChangeList = List[Tuple[int, Optional[Dict[str, Any]], Dict[str, Any]]]
+_change_listeners: List[Callable[[str, int, int, ChangeList], None]] = []
+
+# Indentation of written JSON files. None keeps files compact, which roughly halves their
+# size and write time; set it to 4 to get hand-editable files back.
+JSON_INDENT = None
+
 
 def get_full_path(relative_path: str) -> str:
     """Convert relative path to absolute path relative to project root"""
     return os.path.join(PROJECT_ROOT, relative_path)
 
 
+def get_sqlite_storage() -> SqliteStorage:
+    """Return the shared SQLite storage, opening the database on first use"""
+    global _sqlite_storage
+    if _sqlite_storage is None:
+        _sqlite_storage = SqliteStorage(get_full_path(SQLITE_DB_FILE))
+    return _sqlite_storage
+
+
+def uses_sqlite(file_path: str) -> bool:
+    """Whether a collection is kept in the SQLite database instead of its JSON file"""
+    return STORAGE_BACKEND == "sqlite" and SqliteStorage.handles(file_path)
+
+
+def uses_log(file_path: str) -> bool:
+    """Whether a collection is kept in an append-only JSON Lines log instead of its JSON file"""
+    return STORAGE_BACKEND == "jsonl" and file_path in jsonl_log.LOG_COLLECTIONS
+
+
+def uses_lines(file_path: str) -> bool:
+    """Whether a collection file is written one record per line with an offset index (see line_store)"""
+    return file_path in line_store.LINE_COLLECTIONS and STORAGE_BACKEND not in ("sqlite", "jsonl")
+
+
+def _data_file(file_path: str) -> str:
+    """Absolute path of the file that actually holds a collection"""
+    full_path = get_full_path(file_path)
+    return jsonl_log.log_path(full_path) if uses_log(file_path) else full_path
+
+
+def _file_signature(full_path: str) -> Optional[Tuple[int, int]]:
+    """Return (mtime_ns, size) of a file, or None if it cannot be stat'ed"""
+    try:
+        st = os.stat(full_path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _store_in_cache(full_path: str, records: List[Dict[str, Any]],
+                    signature: Optional[Tuple[int, int]] = None) -> None:
+    """Remember parsed records for a file together with its signature (the current one if not given)"""
+    global _version_counter
+    if signature is None:
+        signature = _file_signature(full_path)
+    if signature is None:
+        _collection_cache.pop(full_path, None)
+        return
+    _version_counter += 1
+    _collection_cache[full_path] = (signature, _version_counter, records)
+
+
+def load_collection(file_path: str) -> List[Dict[str, Any]]:
+    """
+    Return the cached records of a collection, re-parsing only if the file changed.
+    The returned list is shared: callers must treat it as read-only.
+    """
+    full_path = get_full_path(file_path)
+    entry = _collection_cache.get(full_path)
+
+    if uses_sqlite(file_path):
+        storage = get_sqlite_storage()
+        if entry is not None and entry[0] == ("sqlite", storage.collection_version(file_path)):
+            _cache_stats["hits"] += 1
+            return entry[2]
+        _cache_stats["misses"] += 1
+        version, records = storage.read(file_path)
+        _store_in_cache(full_path, records, ("sqlite", version))
+        return records
+
+    data_file = _data_file(file_path)
+    if entry is not None and entry[0] == _file_signature(data_file):
+        _cache_stats["hits"] += 1
+        return entry[2]
+
+    _cache_stats["misses"] += 1
+    # The shared lock keeps writers out, so the signature taken before parsing matches what is parsed
+    with file_lock(full_path, exclusive=False):
+        signature = _file_signature(data_file)
+        if uses_log(file_path):
+            records, _log_line_counts[full_path] = jsonl_log.read_log(data_file)
+        else:
+            records = _read_json_file(file_path)
+        _store_in_cache(full_path, records, signature)
+    return records
+
+
+def get_collection_version(file_path: str) -> int:
+    """
+    Return a number that changes every time the cached records of a file are replaced.
+    Indexes built on top of a collection use it to detect that they are stale.
+    """
+    load_collection(file_path)
+    entry = _collection_cache.get(get_full_path(file_path))
+    return entry[1] if entry else 0
+
+
+def add_change_listener(callback: Callable[[str, int, int, ChangeList], None]) -> None:
+    """
+    Register callback(file_path, old_version, new_version, changes) to be called after records
+    are changed through update_json, update_record, append_json, append_records or a unit of work.
+    changes lists (position, record before or None if appended, record after).
+    The changes turn the collection at old_version into new_version; an index that was built from
+    another version must rebuild instead of applying them. Other writes are not reported.
+    """
+    _change_listeners.append(callback)
+
+
+def notify_changes(file_path: str, old_version: int, changes: ChangeList) -> None:
+    """Tell the change listeners about records that were just written (see add_change_listener)"""
+    if not _change_listeners or not changes:
+        return
+    entry = _collection_cache.get(get_full_path(file_path))
+    new_version = entry[1] if entry else 0
+    for callback in _change_listeners:
+        callback(file_path, old_version, new_version, changes)
+
+
+def get_cache_stats() -> Dict[str, int]:
+    """Return hit/miss counters of the collection cache"""
+    return {
+        "hits": _cache_stats["hits"],
+        "misses": _cache_stats["misses"],
+        "entries": len(_collection_cache)
+    }
+
+
+def clear_cache(file_path: Optional[str] = None) -> None:
+    """Drop one collection (or all of them) from the cache and reset counters when clearing everything"""
+    if file_path is not None:
+        _collection_cache.pop(get_full_path(file_path), None)
+        return
+    _collection_cache.clear()
+    _cache_stats["hits"] = 0
+    _cache_stats["misses"] = 0
+
+
+def copy_record(record: Any) -> Any:
+    """
+    Copy a record deeply enough that changing it, or a list or dict inside it (e.g. keywords,
+    image_path), leaves the original alone; flat fields are shared, as they are immutable
+    """
+    if not isinstance(record, dict):
+        return record
+    copied = dict(record)
+    for key, value in copied.items():
+        if isinstance(value, (list, dict)):
+            copied[key] = copy.deepcopy(value)
+    return copied
+
+
 def read_json(file_path: str) -> List[Dict[str, Any]]:
     """
     Read data from a JSON file and return it as a list of dictionaries.
     If the file does not exist, returns an empty list.
+    Records come from the in-memory cache; each one is copied so callers may modify them freely.
     """
+    records = load_collection(file_path)
+    if not isinstance(records, list):
+        return records
+    return [copy_record(record) for record in records]
+
+
+def iter_records(file_path: str,
+                 predicate: Optional[Callable[[Dict[str, Any]], bool]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the records of a collection (only those matching predicate, if given) one at a time.
+    A cached collection is iterated in memory; otherwise the file is parsed incrementally and
+    nothing is added to the cache, so memory stays bounded however large the collection is,
+    and a caller that stops early (e.g. next(...)) does not read the rest of the file.
+    Each yielded record is the caller's own dict.
+    """
+    full_path = get_full_path(file_path)
+    entry = _collection_cache.get(full_path)
+    if uses_sqlite(file_path):
+        current = entry is not None and entry[0] == ("sqlite", get_sqlite_storage().collection_version(file_path))
+    else:
+        current = entry is not None and entry[0] == _file_signature(_data_file(file_path))
+
+    if current:
+        _cache_stats["hits"] += 1
+        records: Iterator[Dict[str, Any]] = (copy_record(record) for record in entry[2])
+    elif uses_sqlite(file_path):
+        records = get_sqlite_storage().iter_records(file_path)
+    elif uses_log(file_path):
+        records = iter_log(_data_file(file_path))
+    else:
+        records = _iter_json_file(file_path)
+
+    for record in records:
+        if predicate is None or predicate(record):
+            yield record
+
+
+def read_models(file_path: str, model: Any,
+                predicate: Optional[Callable[[Dict[str, Any]], bool]] = None) -> List[Any]:
+    """
+    Return the records of a collection (only those matching predicate, if given) as instances of a
+    src.models Record class. Records are streamed and converted in one batch, so the intermediate
+    dicts of a collection that is not cached are never all held at once.
+    This is an opt-in, read-only reader, used by the student's request status screen: read_json,
+    the unit of work and the other menus keep working on dicts, and to_dict() is not written back.
+    """
+    return model.from_dicts(iter_records(file_path, predicate))
+
+
+def _iter_json_file(file_path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Stream a JSON array file without holding a lock while the caller iterates.
+    Most collection files are only replaced by atomic renames: the file opened on the first next()
+    is then one complete version, read to the end even if it is replaced meanwhile (so possibly
+    stale). Line-format collections (see line_store, e.g. defended_theses.json) are instead appended
+    to in place, over their closing ']' (apply_append), and cut back by repair(): a stream may then
+    run into a torn tail. That is detected as a JSON error (a partial record, or no closing ']'),
+    and the records not yet yielded are read again in full through load_collection, under the shared
+    lock. As these collections are append-only, the records already yielded are a prefix of that
+    version, so none is skipped or repeated.
+    Files that are not plain UTF-8 JSON arrays take the same fallback.
+    """
+    full_path = get_full_path(file_path)
+    yielded = 0
+    try:
+        if os.path.exists(full_path):
+            for record in iter_json_array(full_path):
+                yield record
+                yielded += 1
+            return
+    except ValueError:  # Includes UnicodeDecodeError
+        pass
+    for record in load_collection(file_path)[yielded:]:
+        yield copy_record(record)
+
+
+def _read_json_file(file_path: str) -> List[Dict[str, Any]]:
+    """Parse a JSON file from disk without going through the cache"""
     try:
         full_path = get_full_path(file_path)
 
         if not os.path.exists(full_path):
-            os.makedirs(os.path.dirname(full_path), exist_ok=True)
-            with open(full_path, 'w', encoding='utf-8') as file:
-                json.dump([], file, ensure_ascii=False, indent=4)
+            _atomic_write(full_path, _encode_json([]))
             return []
 
-        encodings = ['utf-8', 'utf-8-sig', 'latin-1', 'cp1256']
+        # One binary read; legacy (non UTF-8) files are detected once and remembered
+        try:
+            return codec.loads(read_text(full_path))
+        except json.JSONDecodeError:
+            pass
 
-        for encoding in encodings:
+        # Readers only hold a shared lock: take the exclusive one and check again, as another
+        # process may have replaced (or already set aside) the file meanwhile
+        with file_lock(full_path, exclusive=True):
             try:
-                with open(full_path, 'r', encoding=encoding) as file:
-                    data = json.load(file)
-                    # print(f"✅ File {file_path} read successfully with encoding {encoding}")
-                    return data
-            except UnicodeDecodeError:
-                continue
-            except json.JSONDecodeError:
-                # If JSON is invalid, overwrite it
-                # print(f"⚠️  File {file_path} is invalid JSON, rewriting...")
-                with open(full_path, 'w', encoding='utf-8') as file:
-                    json.dump([], file, ensure_ascii=False, indent=4)
+                return codec.loads(read_text(full_path))
+            except FileNotFoundError:
+                _atomic_write(full_path, _encode_json([]))
                 return []
-
-        print(f"❌ Could not read file {file_path} with any encoding")
-        return []
+            except json.JSONDecodeError:
+                pass
+            # Never overwrite a damaged file: keep it aside, under a name no other process picks,
+            # so its records can be recovered by hand
+            fd, backup_path = tempfile.mkstemp(
+                prefix=f"{os.path.basename(full_path)}.corrupt-{datetime.now().strftime('%Y%m%d%H%M%S')}-",
+                dir=os.path.dirname(full_path))
+            os.close(fd)
+            os.replace(full_path, backup_path)
+            print(f"⚠️  File {file_path} is invalid JSON, moved to {os.path.basename(backup_path)}")
+            _atomic_write(full_path, _encode_json([]))
+            return []
 
     except Exception as e:
         print(f"❌ Unknown error reading file {file_path}: {e}")
         return []
 
 
-def write_json(file_path: str, data: List[Dict[str, Any]]) -> bool:
+def _encode_json(data: Any) -> bytes:
+    """Serialize data the way every collection file is stored"""
+    return codec.dumps(data, JSON_INDENT)
+
+
+def _encode_collection(file_path: str, data: Any) -> bytes:
+    """Serialize a whole collection in its file's format"""
+    if uses_lines(file_path) and isinstance(data, list):
+        return line_store.encode(data)
+    return _encode_json(data)
+
+
+def _fsync_directory(directory: str) -> None:
+    """Persist a rename by syncing its directory entry (not supported on Windows)"""
+    if os.name != 'posix':
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _file_mode(full_path: str) -> int:
+    """Permissions a replacement of full_path should keep: the file's own, or the umask default"""
+    try:
+        return stat.S_IMODE(os.stat(full_path).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+
+def _write_temp_file(full_path: str, payload: bytes, fsync: bool, suffix: str = ".tmp") -> str:
+    """
+    Write payload to a temporary file next to full_path and return the temporary path.
+    mkstemp creates it owner-only; it gets the target's permissions, which a rename keeps.
+    """
+    directory = os.path.dirname(full_path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(full_path)}.", suffix=suffix)
+    try:
+        if hasattr(os, 'fchmod'):  # not on Windows, where mkstemp's mode is not owner-only anyway
+            os.fchmod(fd, _file_mode(full_path))
+        with os.fdopen(fd, 'wb') as file:
+            file.write(payload)
+            file.flush()
+            if fsync:
+                os.fsync(file.fileno())
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return temp_path
+
+
+def _atomic_write(full_path: str, payload: bytes, fsync: bool = True) -> None:
+    """
+    Replace a file so that readers see either the old or the new content, never a truncated one.
+    The data goes to a sibling temporary file, is fsynced, and is then renamed over the target.
+    """
+    temp_path = _write_temp_file(full_path, payload, fsync)
+    try:
+        os.replace(temp_path, full_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    if fsync:
+        _fsync_directory(os.path.dirname(full_path))
+
+
+def refresh_cache(file_path: str, data: Any) -> None:
+    """Tell the cache that data was just written to file_path by a lower-level write"""
+    if uses_log(file_path):
+        # Lines were appended by install_prepared_files; the count is refreshed on the next read
+        _log_line_counts.pop(get_full_path(file_path), None)
+    _remember_written(get_full_path(file_path), data, _file_signature(_data_file(file_path)))
+
+
+def _remember_written(full_path: str, data: Any, signature: Optional[Tuple[int, int]] = None) -> None:
+    """Refresh the cache after a write"""
+    # Keep a private copy so later changes to `data` by the caller do not leak into the cache
+    if isinstance(data, list):
+        _store_in_cache(full_path, [copy_record(record) for record in data], signature)
+    else:
+        _collection_cache.pop(full_path, None)
+
+
+def write_json(file_path: str, data: List[Dict[str, Any]], fsync: bool = True) -> bool:
     """
-    Write data (list of dictionaries) to a JSON file.
+    Atomically write data (list of dictionaries) to a JSON file.
+    fsync=False skips flushing to disk, for callers that sync later themselves.
     Returns: True if successful, False if error
     """
     try:
         full_path = get_full_path(file_path)
-        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        if uses_sqlite(file_path):
+            entry = _collection_cache.get(full_path)
+            known = (entry[0][1], entry[2]) if entry is not None and entry[0][0] == "sqlite" else None
+            version = get_sqlite_storage().replace(file_path, data, known)
+            _store_in_cache(full_path, [copy_record(record) for record in data], ("sqlite", version))
+            return True
 
-        with open(full_path, 'w', encoding='utf-8') as file:
-            json.dump(data, file, ensure_ascii=False, indent=4)
+        with file_lock(full_path, exclusive=True):
+            if uses_log(file_path):
+                # Only changed and appended records are written, as lines added to the log
+                _append_to_log(file_path, jsonl_log.encode_changes(load_collection(file_path), data), fsync)
+            else:
+                _atomic_write(full_path, _encode_collection(file_path, data), fsync)
+            _remember_written(full_path, data, _file_signature(_data_file(file_path)))
         return True
     except Exception as e:
         print(f"❌ Error writing file {file_path}: {e}")
         return False
 
 
-def get_next_id(existing_data: List[Dict[str, Any]], id_field: str = "id") -> str:
+def _append_to_log(file_path: str, payload: bytes, fsync: bool = True) -> None:
+    """Append encoded lines to a collection's log; the caller holds its exclusive lock"""
+    full_path = get_full_path(file_path)
+    jsonl_log.append_entries(_data_file(file_path), payload, fsync)
+    if full_path in _log_line_counts:
+        _log_line_counts[full_path] += payload.count(b"\n")
+
+
+def append_json(file_path: str, record: Dict[str, Any]) -> bool:
     """
-    Generate a unique ID for a new record.
-    Assumes IDs follow the pattern 'prefix_number' (e.g., 'request_1').
+    Append one record to a collection.
+    With log storage this is a single append to the log, so its cost does not grow with the collection.
+    Returns: True if successful, False if error
     """
-    if not existing_data:
-        return f"{id_field}_1"
+    if uses_lines(file_path) and _append_line(file_path, record):
+        return True
+
+    if not uses_log(file_path):
+        try:
+            update_json(file_path, lambda records: records.append(record))
+            return True
+        except OSError as e:
+            print(f"❌ Error writing file {file_path}: {e}")
+            return False
 
-    last_id = existing_data[-1].get(id_field, f"{id_field}_0")
     try:
-        last_number = int(last_id.split('_')[-1])
-        new_number = last_number + 1
-    except (IndexError, ValueError):
-        new_number = len(existing_data) + 1
+        full_path = get_full_path(file_path)
+        with file_lock(full_path, exclusive=True):
+            records = load_collection(file_path)
+            old_version = get_collection_version(file_path)
+            record = dict(record)
+            record[VERSION_FIELD] = 1
+            _append_to_log(file_path, jsonl_log.encode_entry(len(records), record))
+            # The cached list is current (it was validated under the lock), so extend it instead of re-reading
+            records.append(record)
+            _store_in_cache(full_path, records, _file_signature(_data_file(file_path)))
+            notify_changes(file_path, old_version, [(len(records) - 1, None, record)])
+        return True
+    except Exception as e:
+        print(f"❌ Error writing file {file_path}: {e}")
+        return False
+
+
+def append_records(file_path: str, new_records: List[Dict[str, Any]]) -> bool:
+    """
+    Append a batch of records with a single write: appended lines for log and line-format
+    collections, one rewrite of the file otherwise.
+    Returns: True if successful, False if error
+    """
+    try:
+        with file_lock(get_full_path(file_path), exclusive=True):
+            records = list(load_collection(file_path))
+            old_version = get_collection_version(file_path)
+            first = len(records)
+            for record in new_records:
+                record = dict(record)
+                record[VERSION_FIELD] = 1
+                records.append(record)
+            if not write_json_batch({file_path: records}):
+                return False
+            notify_changes(file_path, old_version,
+                           [(position, None, records[position]) for position in range(first, len(records))])
+            return True
+    except Exception as e:
+        print(f"❌ Error writing file {file_path}: {e}")
+        return False
+
+
+def _append_line(file_path: str, record: Dict[str, Any]) -> bool:
+    """
+    Append a record to a line-format collection by rewriting only its closing line.
+    Returns: False if the file is not in line format yet (the caller then rewrites it whole)
+    """
+    full_path = get_full_path(file_path)
+    with file_lock(full_path, exclusive=True):
+        offsets = line_store.load_index(full_path)
+        if offsets is None:
+            return False
+        entry = _collection_cache.get(full_path)
+        cached = entry[2] if entry is not None and entry[0] == _file_signature(full_path) else None
+
+        record = dict(record)
+        record[VERSION_FIELD] = 1
+        line_store.apply_append(full_path, line_store.encode_append(len(offsets), [record]))
+
+        if cached is not None and len(cached) == len(offsets):
+            old_version = entry[1]
+            cached.append(record)
+            _store_in_cache(full_path, cached)
+            notify_changes(file_path, old_version, [(len(cached) - 1, None, record)])
+        else:
+            _collection_cache.pop(full_path, None)
+    return True
+
+
+def collection_count(file_path: str) -> int:
+    """Number of records in a collection; for line-format files this only reads the offset index"""
+    full_path = get_full_path(file_path)
+    entry = _collection_cache.get(full_path)
+    if uses_lines(file_path) and not (entry is not None and entry[0] == _file_signature(full_path)):
+        with file_lock(full_path, exclusive=False):
+            offsets = line_store.load_index(full_path)
+        if offsets is not None:
+            return len(offsets)
+    return len(load_collection(file_path))
+
+
+def fetch_records(file_path: str, positions: List[int]) -> List[Dict[str, Any]]:
+    """
+    Return copies of the records at the given positions of a collection. For a line-format file
+    that is not cached, only those records' lines are read (through mmap), however large the file.
+    """
+    full_path = get_full_path(file_path)
+    entry = _collection_cache.get(full_path)
+    if uses_lines(file_path) and not (entry is not None and entry[0] == _file_signature(full_path)):
+        with file_lock(full_path, exclusive=False):
+            offsets = line_store.load_index(full_path)
+            if offsets is not None:
+                return line_store.read_records(full_path, offsets, positions)
+    records = load_collection(file_path)
+    return [dict(records[position]) for position in positions]
+
+
+def repair_line_files() -> bool:
+    """
+    Restore line-format collections whose last append was interrupted (run at startup)
+    Returns: True if a file was repaired
+    """
+    repaired = False
+    for file_path in line_store.LINE_COLLECTIONS:
+        if not uses_lines(file_path):
+            continue
+        full_path = get_full_path(file_path)
+        with file_lock(full_path, exclusive=True):
+            if line_store.repair(full_path):
+                _collection_cache.pop(full_path, None)
+                repaired = True
+    return repaired
+
+
+def compact_log(file_path: str, force: bool = False) -> bool:
+    """
+    Rewrite a collection's log with one line per record, dropping superseded versions.
+    Unless force is set, this only happens when the log has grown well beyond its record count.
+    Returns: True if the log was rewritten
+    """
+    full_path = get_full_path(file_path)
+    data_file = _data_file(file_path)
+    with file_lock(full_path, exclusive=True):
+        records, line_count = jsonl_log.read_log(data_file)
+        _log_line_counts[full_path] = line_count
+        if not force and not jsonl_log.needs_compaction(len(records), line_count):
+            return False
+        _atomic_write(data_file, jsonl_log.encode_changes([], records))
+        _log_line_counts[full_path] = len(records)
+        _store_in_cache(full_path, records, _file_signature(data_file))
+    return True
+
+
+def compact_logs() -> None:
+    """Compact every log collection that needs it; run periodically by jsonl_log.start_background_compaction"""
+    for file_path in jsonl_log.LOG_COLLECTIONS:
+        full_path = get_full_path(file_path)
+        line_count = _log_line_counts.get(full_path)
+        if line_count is not None and not jsonl_log.needs_compaction(len(load_collection(file_path)), line_count):
+            continue
+        try:
+            compact_log(file_path)
+        except OSError as e:
+            print(f"⚠️  Could not compact {file_path}: {e}")
+
+
+def prepare_json_files(files: Dict[str, Any]) -> Dict[str, str]:
+    """
+    First phase of a multi-file write: serialize every collection into an fsynced temporary file.
+    For a log collection the temporary file holds the lines to append instead of the whole collection;
+    the caller holds its lock, so the cached records it is compared with are current.
+    Nothing visible changes yet.
+    Returns: mapping of target absolute path -> temporary path
+    """
+    temp_paths = {}
+    try:
+        for file_path, data in files.items():
+            target = _data_file(file_path)
+            if uses_log(file_path):
+                payload = jsonl_log.encode_changes(load_collection(file_path), data)
+            elif uses_lines(file_path) and _is_append(file_path, data):
+                # Only the new records are written; see line_store.apply_append
+                count = len(load_collection(file_path))
+                temp_paths[target] = _write_temp_file(target, line_store.encode_append(count, data[count:]),
+                                                      fsync=True, suffix=line_store.APPEND_SUFFIX)
+                continue
+            else:
+                payload = _encode_collection(file_path, data)
+            temp_paths[target] = _write_temp_file(target, payload, fsync=True)
+    except BaseException:
+        discard_prepared_files(temp_paths)
+        raise
+    return temp_paths
+
+
+def _is_append(file_path: str, data: List[Dict[str, Any]]) -> bool:
+    """Whether data only adds records to the current content of a line-format file"""
+    previous = load_collection(file_path)
+    offsets = line_store.load_index(get_full_path(file_path))
+    if offsets is None or len(offsets) != len(previous) or len(data) < len(previous):
+        return False
+    return all(new is old or new == old for new, old in zip(data, previous))
+
+
+def install_prepared_files(temp_paths: Dict[str, str]) -> None:
+    """
+    Second phase of a multi-file write: rename prepared files over their targets, then sync each directory once.
+    Prepared lines for a log, or records added to a line-format file, are appended instead;
+    applying them again after a crash is harmless (see jsonl_log and line_store).
+    """
+    for full_path, temp_path in temp_paths.items():
+        if not os.path.exists(temp_path):
+            continue
+        if full_path.endswith(jsonl_log.LOG_SUFFIX):
+            with open(temp_path, 'rb') as file:
+                jsonl_log.append_entries(full_path, file.read())
+            os.remove(temp_path)
+        elif temp_path.endswith(line_store.APPEND_SUFFIX):
+            with open(temp_path, 'rb') as file:
+                line_store.apply_append(full_path, file.read())
+            os.remove(temp_path)
+        else:
+            os.replace(temp_path, full_path)
+    for directory in {os.path.dirname(full_path) for full_path in temp_paths}:
+        _fsync_directory(directory)
+
+
+def discard_prepared_files(temp_paths: Dict[str, str]) -> None:
+    """Remove temporary files of a multi-file write that will not be installed"""
+    for temp_path in temp_paths.values():
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def write_json_batch(files: Dict[str, List[Dict[str, Any]]]) -> bool:
+    """
+    Atomically write several JSON files with grouped syncing:
+    all temporary files are written and fsynced first, then renamed, then each directory is synced once.
+    Returns: True if successful, False if error (no target is replaced unless all temporary files were written)
+    """
+    try:
+        database_files = {file_path: data for file_path, data in files.items() if uses_sqlite(file_path)}
+        files = {file_path: data for file_path, data in files.items() if file_path not in database_files}
+
+        if database_files:
+            with get_sqlite_storage().transaction():
+                for file_path, data in database_files.items():
+                    if not write_json(file_path, data):
+                        raise OSError(f"Could not write {file_path}")
+
+        with file_locks(get_full_path(file_path) for file_path in files):
+            install_prepared_files(prepare_json_files(files))
+            for file_path, data in files.items():
+                refresh_cache(file_path, data)
+        return True
+    except Exception as e:
+        print(f"❌ Error writing files {', '.join(files)}: {e}")
+        return False
+
+
+def update_json(file_path: str, mutator: Callable[[List[Dict[str, Any]]], Any]) -> Any:
+    """
+    Read-modify-write a collection while holding its exclusive lock, so no other session can
+    change it in between. mutator receives fresh records, changes them in place and may return a value,
+    which is passed back to the caller. Changed records get their version increased.
+    Raises OSError if the collection could not be saved; exceptions of mutator abort without saving.
+    """
+    if uses_sqlite(file_path):
+        # The database transaction plays the role of the file lock; only changed rows are written
+        with get_sqlite_storage().transaction():
+            return _update_records(file_path, mutator)
+
+    with file_lock(get_full_path(file_path), exclusive=True):
+        return _update_records(file_path, mutator)
+
+
+def _update_records(file_path: str, mutator: Callable[[List[Dict[str, Any]]], Any]) -> Any:
+    records = read_json(file_path)
+    old_version = get_collection_version(file_path)
+    snapshot = [copy_record(record) for record in records]
+    result = mutator(records)
+    changes = []
+    for position, record in enumerate(records):
+        if position >= len(snapshot):
+            record[VERSION_FIELD] = 1
+            changes.append((position, None, record))
+        elif record != snapshot[position]:
+            record[VERSION_FIELD] = snapshot[position].get(VERSION_FIELD, 0) + 1
+            changes.append((position, snapshot[position], record))
+    if not write_json(file_path, records):
+        raise OSError(f"Could not write {file_path}")
+    notify_changes(file_path, old_version, changes)
+    return result
+
+
+def update_record(file_path: str, field: str, value: Any,
+                  mutator: Callable[[Dict[str, Any]], Any]) -> Tuple[Optional[Dict[str, Any]], Any]:
+    """
+    Change the first record whose field equals value. With the SQLite backend the record is found
+    through an index and only its row is rewritten; with JSON files the whole collection is.
+    Returns: (the updated record or None if no record matched, mutator result)
+    Raises OSError if the change could not be saved.
+    """
+    if not uses_sqlite(file_path):
+        def apply(records):
+            for record in records:
+                if record.get(field) == value:
+                    return record, mutator(record)
+            return None, None
+        return update_json(file_path, apply)
+
+    position, record, result, version = get_sqlite_storage().update_record(file_path, field, value, mutator)
+
+    # Patch the cached collection instead of reloading it, if it was current before this change
+    full_path = get_full_path(file_path)
+    entry = _collection_cache.get(full_path)
+    if position is not None and entry is not None and entry[0] == ("sqlite", version - 1):
+        old_version, before = entry[1], entry[2][position]
+        entry[2][position] = copy_record(record)
+        _store_in_cache(full_path, entry[2], ("sqlite", version))
+        notify_changes(file_path, old_version, [(position, before, record)])
+    return record, result
+
+
+def get_next_id(existing_data: List[Dict[str, Any]], id_field: str = "id") -> str:
+    """
+    Generate a unique ID for a new record.
+    IDs follow the pattern 'prefix_number' (e.g., 'id_1') and come from the persistent
+    sequence named after id_field (see src.utils.sequences), so the lookup no longer depends
+    on the size of the collection and concurrent sessions never get the same ID.
+    existing_data only seeds the sequence the first time it is used.
+    """
+    from src.utils.sequences import reserve
 
-    return f"{id_field}_{new_number}"
+    return f"{id_field}_{reserve(id_field, existing_data=existing_data, id_field=id_field)[0]}"
 
 
-def save_uploaded_file(upload_folder: str, file_name: str, file_content: bytes) -> str:
+def save_uploaded_file(upload_folder: str, file_name: str, file_content: Union[bytes, BinaryIO]) -> str:
     """
     Save an uploaded file (like PDF or JPG) to a specified folder.
+    file_content may be an open binary file, which is copied in chunks instead of being held in memory.
     Returns: relative path of the saved file
     """
     try:
@@ -95,7 +790,10 @@ def save_uploaded_file(upload_folder: str, file_name: str, file_content: bytes)
         file_path = os.path.join(upload_folder, file_name)
 
         with open(file_path, 'wb') as file:
-            file.write(file_content)
+            if isinstance(file_content, (bytes, bytearray)):
+                file.write(file_content)
+            else:
+                shutil.copyfileobj(file_content, file, 1024 * 1024)
 
         return file_path
     except Exception as e:
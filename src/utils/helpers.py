@@ -1,6 +1,8 @@
 from datetime import datetime, timedelta
 import re
-from src.utils.file_io import read_json, write_json
+from src.utils.file_io import load_collection, fetch_records
+from src.utils.user_index import user_index
+from src.utils.search_index import search_index
 
 def validate_email(email: str) -> bool:
     """Check if email format is valid"""
@@ -14,6 +16,12 @@ def validate_phone(phone: str) -> bool:
     return re.match(pattern, phone) is not None
 
 
+def validate_national_id(national_id: str) -> bool:
+    """Check if national ID format is valid (10 digits)"""
+    pattern = r'^[0-9]{10}$'
+    return re.match(pattern, national_id) is not None
+
+
 def is_valid_date(date_string: str, date_format: str = "%Y-%m-%d") -> bool:
     """Check if a date string is valid"""
     try:
@@ -69,55 +77,49 @@ def get_semester_year(defense_date: str, date_format: str = "%Y-%m-%d") -> str:
 def search_theses(search_query: str, search_type: str):
     """Search in defended theses"""
     try:
-        theses = read_json("data/theses/defended_theses.json")
+        theses = load_collection("data/theses/defended_theses.json")
 
         if not theses:
             return []
 
         search_query = search_query.strip().lower()
+
+        # Names are resolved to user IDs once per query, so the loop below never touches user files
+        if search_type == "professor":
+            professor_ids = user_index.ids_matching_name("professor", search_query)
+        elif search_type == "author":
+            student_ids = user_index.ids_matching_name("student", search_query)
+        elif search_type == "judges":
+            internal_judge_ids = user_index.ids_matching_name("professor", search_query)
+            external_judge_ids = user_index.ids_matching_name("external_judge", search_query)
+
         results = []
 
         for thesis in theses:
-            if search_type == "title" and search_query in thesis.get("title", "").lower():
-                results.append(thesis)
+            if search_type == "title":
+                matched = search_query in thesis.get("title", "").lower()
 
             elif search_type == "professor":
-                prof_id = thesis.get("professor_id", "")
-                professors = read_json("data/users/professors.json")
-                professor = next((p for p in professors if p["user_id"] == prof_id), {})
-                if search_query in professor.get("name", "").lower():
-                    results.append(thesis)
+                matched = thesis.get("professor_id", "") in professor_ids
 
             elif search_type == "keywords":
-                keywords = thesis.get("keywords", [])
-                if any(search_query in keyword.lower() for keyword in keywords):
-                    results.append(thesis)
+                matched = any(search_query in keyword.lower() for keyword in thesis.get("keywords", []))
 
             elif search_type == "author":
-                student_id = thesis.get("student_id", "")
-                students = read_json("data/users/students.json")
-                student = next((s for s in students if s["user_id"] == student_id), {})
-                if search_query in student.get("name", "").lower():
-                    results.append(thesis)
+                matched = thesis.get("student_id", "") in student_ids
 
             elif search_type == "year":
-                defense_date = thesis.get("defense_date", "")
-                if defense_date.startswith(search_query):
-                    results.append(thesis)
+                matched = thesis.get("defense_date", "").startswith(search_query)
 
             elif search_type == "judges":
-                internal_judge_id = thesis.get("internal_judge_id", "")
-                external_judge_id = thesis.get("external_judge_id", "")
-
-                professors = read_json("data/users/professors.json")
-                external_judges = read_json("data/users/external_judges.json")
+                matched = (thesis.get("internal_judge_id", "") in internal_judge_ids or
+                           thesis.get("external_judge_id", "") in external_judge_ids)
 
-                internal_judge = next((p for p in professors if p["user_id"] == internal_judge_id), {})
-                external_judge = next((j for j in external_judges if j["user_id"] == external_judge_id), {})
+            else:
+                matched = False
 
-                if (search_query in internal_judge.get("name", "").lower() or
-                        search_query in external_judge.get("name", "").lower()):
-                    results.append(thesis)
+            if matched:
+                results.append(dict(thesis))
 
         return results
 
@@ -126,6 +128,20 @@ def search_theses(search_query: str, search_type: str):
         return []
 
 
+def full_text_search(search_query: str, page: int = 1, page_size: int = 10):
+    """
+    Ranked full-text search over title, abstract and keywords of defended theses
+    Returns: (theses on the requested page, total number of matches)
+    """
+    try:
+        total, ranked = search_index.search(search_query, page, page_size)
+        # Only the theses shown on this page are read from the archive
+        return fetch_records("data/theses/defended_theses.json", [doc for doc, score in ranked]), total
+    except Exception as e:
+        print(f"❌ Error during search: {e}")
+        return [], 0
+
+
 def open_file(file_path):
     """Open a file with the system's default program"""
     import os
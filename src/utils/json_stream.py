@@ -0,0 +1,115 @@
+import codecs
+import json
+import os
+from array import array
+from typing import Any, Dict, Iterator
+from src.utils import codec
+
+# Bytes read from disk at a time; a record larger than this is simply assembled from several chunks
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = " \t\r\n"
+
+
+def iter_json_array(full_path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Yield the elements of a JSON array file one at a time, reading it in chunks.
+    Only the current chunk and the element being parsed are held in memory.
+    Raises ValueError if the file is not a JSON array and UnicodeDecodeError if it is not UTF-8.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8-sig')()
+
+    with open(full_path, 'rb') as file:
+        buffer = ""
+        position = 0
+        eof = False
+
+        def fill() -> bool:
+            """Drop the consumed part of the buffer and append the next chunk; False at end of file"""
+            nonlocal buffer, position, eof
+            if eof:
+                return False
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[position:] + text_decoder.decode(chunk, final=eof)
+            position = 0
+            return True
+
+        def skip_whitespace() -> bool:
+            """Advance to the next significant character; False if the file ended first"""
+            nonlocal position
+            while True:
+                while position < len(buffer) and buffer[position] in _WHITESPACE:
+                    position += 1
+                if position < len(buffer):
+                    return True
+                if not fill():
+                    return False
+
+        if not skip_whitespace() or buffer[position] != "[":
+            raise ValueError(f"{full_path} does not contain a JSON array")
+        position += 1
+
+        expect_value = True
+        while True:
+            if not skip_whitespace():
+                raise ValueError(f"{full_path} ends in the middle of the array")
+            char = buffer[position]
+            if char == "]":
+                return
+            if char == ",":
+                if expect_value:
+                    raise ValueError(f"Unexpected ',' in {full_path}")
+                position += 1
+                expect_value = True
+                continue
+            if not expect_value:
+                raise ValueError(f"Missing ',' in {full_path}")
+
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if fill():
+                        continue
+                    raise
+                # A number at the very end of the buffer may continue in the next chunk
+                if end == len(buffer) and fill():
+                    continue
+                break
+            position = end
+            expect_value = False
+            yield value
+
+
+def iter_log(full_log_path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the current records of a JSON Lines log in collection order without folding it in memory.
+    A first pass keeps only the offset of the latest line for each position; the second pass
+    reads just those lines. Lines appended after the call started are not seen.
+    """
+    if not os.path.exists(full_log_path):
+        return
+
+    with open(full_log_path, 'rb') as file:
+        size = os.fstat(file.fileno()).st_size
+        offsets = array('q')
+        offset = 0
+        while offset < size:
+            line = file.readline()
+            if not line or offset + len(line) > size:
+                break
+            try:
+                entry_position = codec.loads(line).get("p")
+            except (UnicodeDecodeError, json.JSONDecodeError):
+                entry_position = None  # A torn line from an interrupted append
+            if entry_position == len(offsets):
+                offsets.append(offset)
+            elif isinstance(entry_position, int) and 0 <= entry_position < len(offsets):
+                offsets[entry_position] = offset
+            offset += len(line)
+
+        for line_offset in offsets:
+            file.seek(line_offset)
+            yield codec.loads(file.readline())["r"]
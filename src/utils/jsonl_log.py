@@ -0,0 +1,162 @@
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from src.utils import codec
+
+LOG_SUFFIX = ".jsonl"
+
+# Collections kept as append-only logs when THESIS_STORAGE=jsonl; the rest stay JSON arrays
+LOG_COLLECTIONS = [
+    "data/requests/enrollment_requests.json",
+    "data/requests/defense_requests.json",
+    "data/theses/defended_theses.json"
+]
+
+# A log is compacted once it holds this many times more lines than records (and at least COMPACT_MIN_LINES)
+COMPACT_RATIO = 2
+COMPACT_MIN_LINES = 200
+COMPACT_INTERVAL = 600  # seconds between background compaction runs
+
+_compaction_thread: Optional[threading.Thread] = None
+
+
+def log_path(full_path: str) -> str:
+    """Return the log file that stores the collection file full_path"""
+    return os.path.splitext(full_path)[0] + LOG_SUFFIX
+
+
+def collection_path(full_log_path: str) -> str:
+    """Return the collection file a log stores (the path its lock is taken on)"""
+    return os.path.splitext(full_log_path)[0] + ".json"
+
+
+def encode_entry(position: int, record: Dict[str, Any]) -> bytes:
+    """One log line: the record at a position of the collection, replacing earlier lines for it"""
+    return codec.dumps({"p": position, "r": record}) + b"\n"
+
+
+def encode_changes(previous: List[Dict[str, Any]], records: List[Dict[str, Any]]) -> bytes:
+    """
+    Return the log lines that turn previous into records: one per changed or appended record.
+    Raises ValueError if records is shorter than previous (logs only grow).
+    """
+    if len(records) < len(previous):
+        raise ValueError("records cannot be removed from a log collection")
+    lines = []
+    for position, record in enumerate(records):
+        if position >= len(previous) or (record is not previous[position] and record != previous[position]):
+            lines.append(encode_entry(position, record))
+    return b"".join(lines)
+
+
+def read_log(full_log_path: str) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Fold a log into the current records: a later line for a position replaces the earlier one.
+    A torn last line left by an interrupted append is ignored.
+    Returns: (records, number of lines in the log)
+    """
+    records: List[Dict[str, Any]] = []
+    if not os.path.exists(full_log_path):
+        return records, 0
+
+    with open(full_log_path, 'rb') as file:
+        content = file.read()
+
+    line_count = 0
+    for line in content.split(b"\n"):
+        if not line.strip():
+            continue
+        try:
+            entry = codec.loads(line)
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            continue
+        position = entry.get("p")
+        if position == len(records):
+            records.append(entry["r"])
+        elif isinstance(position, int) and 0 <= position < len(records):
+            records[position] = entry["r"]
+        line_count += 1
+    return records, line_count
+
+
+def append_entries(full_log_path: str, payload: bytes, fsync: bool = True) -> None:
+    """
+    Add lines to a log with a single O_APPEND write; the caller holds the collection's exclusive lock.
+    If an earlier append was torn, a newline is written first so the new lines stay readable.
+    """
+    if not payload:
+        return
+    os.makedirs(os.path.dirname(full_log_path), exist_ok=True)
+    fd = os.open(full_log_path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        size = os.fstat(fd).st_size
+        if size and os.pread(fd, 1, size - 1) != b"\n":
+            payload = b"\n" + payload
+        os.write(fd, payload)
+        if fsync:
+            os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def needs_compaction(record_count: int, line_count: int) -> bool:
+    """Whether superseded lines make up enough of a log to rewrite it"""
+    return line_count >= COMPACT_MIN_LINES and line_count > record_count * COMPACT_RATIO
+
+
+def start_background_compaction(interval: int = COMPACT_INTERVAL) -> None:
+    """Compact logs that grew too long every `interval` seconds, in a daemon thread"""
+    global _compaction_thread
+    if _compaction_thread is not None:
+        return
+
+    def run():
+        from src.utils.file_io import compact_logs
+        while True:
+            time.sleep(interval)
+            compact_logs()
+
+    _compaction_thread = threading.Thread(target=run, name="log-compaction", daemon=True)
+    _compaction_thread.start()
+
+
+def convert_to_logs() -> None:
+    """Convert the JSON array files of the log collections into logs"""
+    from src.utils import file_io
+
+    for file_path in LOG_COLLECTIONS:
+        full_log_path = log_path(file_io.get_full_path(file_path))
+        if os.path.exists(full_log_path):
+            print(f"⚠️  {os.path.basename(full_log_path)} already exists, skipped")
+            continue
+        records = file_io._read_json_file(file_path)
+        append_entries(full_log_path, encode_changes([], records))
+        print(f"✅ {file_path}: {len(records)} records converted")
+
+
+def convert_to_arrays() -> None:
+    """Write the current content of every log back to its JSON array file"""
+    from src.utils import file_io
+
+    for file_path in LOG_COLLECTIONS:
+        full_path = file_io.get_full_path(file_path)
+        records, _ = read_log(log_path(full_path))
+        file_io._atomic_write(full_path, file_io._encode_json(records))
+        print(f"✅ {file_path}: {len(records)} records written")
+
+
+if __name__ == "__main__":
+    def compact() -> None:
+        from src.utils.file_io import compact_log
+        for file_path in LOG_COLLECTIONS:
+            compact_log(file_path, force=True)
+            print(f"✅ {file_path}: compacted")
+
+    commands = {"to-jsonl": convert_to_logs, "to-json": convert_to_arrays, "compact": compact}
+    if len(sys.argv) != 2 or sys.argv[1] not in commands:
+        print("Usage: python -m src.utils.jsonl_log to-jsonl|to-json|compact")
+        sys.exit(1)
+    commands[sys.argv[1]]()
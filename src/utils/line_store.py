@@ -0,0 +1,200 @@
+import mmap
+import os
+from array import array
+from typing import Any, Dict, Iterable, List, Optional
+from src.utils import codec
+
+# Collections written as a JSON array with one record per line, plus a sidecar offset index
+LINE_COLLECTIONS = ["data/theses/defended_theses.json"]
+
+INDEX_SUFFIX = ".idx"
+APPEND_SUFFIX = ".append"
+
+_HEAD = b"[\n"
+_TAIL = b"]\n"
+
+
+def index_path(full_path: str) -> str:
+    """Return the offset index file kept next to a collection file"""
+    return os.path.splitext(full_path)[0] + INDEX_SUFFIX
+
+
+def _record_lines(records: Iterable[Dict[str, Any]], first: bool) -> bytes:
+    """One line per record; every record after the first of the file is preceded by a comma"""
+    lines = []
+    for record in records:
+        lines.append((b"" if first else b",") + codec.dumps(record) + b"\n")
+        first = False
+    return b"".join(lines)
+
+
+def encode(records: List[Dict[str, Any]]) -> bytes:
+    """
+    Serialize records as a JSON array with one record per line:
+    '[', then '{...}', ',{...}', ... and a closing ']' on its own line.
+    The result is plain JSON, so every other reader keeps working.
+    """
+    return _HEAD + _record_lines(records, True) + _TAIL
+
+
+def _scan(full_path: str) -> Optional[array]:
+    """
+    Find the offset of every record in a line-format file.
+    Returns: the offsets, or None if the file is not in line format (e.g. an older compact file)
+    """
+    offsets = array('q')
+    with open(full_path, 'rb') as file:
+        size = os.fstat(file.fileno()).st_size
+        if size < len(_HEAD) + len(_TAIL):
+            return None
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[:len(_HEAD)] != _HEAD or data[size - len(_TAIL):] != _TAIL:
+                return None
+            position = len(_HEAD)
+            end = size - len(_TAIL)
+            while position < end:
+                line_end = data.find(b"\n", position, end)
+                if line_end < 0:
+                    return None
+                start = position + 1 if data[position:position + 1] == b"," else position
+                if data[start:start + 1] != b"{" or (start > position) != bool(offsets):
+                    return None
+                offsets.append(start)
+                position = line_end + 1
+    return offsets
+
+
+def _save_index(full_path: str, size: int, offsets: array) -> None:
+    """Write the index: the data file size it describes, followed by the record offsets"""
+    path = index_path(full_path)
+    temp_path = path + ".tmp"
+    with open(temp_path, 'wb') as file:
+        array('q', [size]).tofile(file)
+        offsets.tofile(file)
+    os.replace(temp_path, path)
+
+
+def load_index(full_path: str) -> Optional[array]:
+    """
+    Return the record offsets of a line-format file, rebuilding the index with one scan if it
+    does not describe the file's current size (after a full rewrite or an interrupted append).
+    The caller holds at least a shared lock on the collection.
+    Returns: None if the file does not exist or is not in line format
+    """
+    try:
+        size = os.path.getsize(full_path)
+    except OSError:
+        return None
+
+    index = array('q')
+    try:
+        with open(index_path(full_path), 'rb') as file:
+            content = file.read()
+        index.frombytes(content[:len(content) - len(content) % index.itemsize])
+    except OSError:
+        pass
+    if index and index[0] == size:
+        return index[1:]
+
+    offsets = _scan(full_path)
+    if offsets is not None:
+        _save_index(full_path, size, offsets)
+    return offsets
+
+
+def read_records(full_path: str, offsets: array, positions: Iterable[int]) -> List[Dict[str, Any]]:
+    """Parse only the records at the given positions, reading their lines through mmap"""
+    records = []
+    with open(full_path, 'rb') as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for position in positions:
+                start = offsets[position]
+                records.append(codec.loads(data[start:data.find(b"\n", start)]))
+    return records
+
+
+def encode_append(count: int, records: List[Dict[str, Any]]) -> bytes:
+    """Describe an append of records to a collection that holds `count` records (see apply_append)"""
+    return str(count).encode('ascii') + b"\n" + _record_lines(records, count == 0)
+
+
+def apply_append(full_path: str, payload: bytes, fsync: bool = True) -> int:
+    """
+    Append records prepared by encode_append by overwriting the closing ']' line, without
+    rewriting the rest of the file. The caller holds the collection's exclusive lock.
+    Applying the same payload twice (journal replay after a crash) changes nothing,
+    because it is only applied while the collection still has the expected record count.
+    Raises ValueError if the file is not in line format.
+    Returns: the number of records in the collection afterwards
+    """
+    header, lines = payload.split(b"\n", 1)
+    expected = int(header)
+
+    offsets = load_index(full_path)
+    if offsets is None:
+        raise ValueError(f"{full_path} is not in line format")
+    if len(offsets) != expected:
+        return len(offsets)
+
+    size = os.path.getsize(full_path)
+    new_offsets = array('q')
+    position = size - len(_TAIL)
+    for line in lines.splitlines(keepends=True):
+        new_offsets.append(position + (1 if line.startswith(b",") else 0))
+        position += len(line)
+
+    with open(full_path, 'r+b') as file:
+        file.seek(size - len(_TAIL))
+        file.write(lines + _TAIL)
+        file.flush()
+        if fsync:
+            os.fsync(file.fileno())
+
+    # Extend the index in place: new offsets at the end, then the size header that validates them
+    with open(index_path(full_path), 'r+b') as file:
+        file.seek(0, os.SEEK_END)
+        new_offsets.tofile(file)
+        file.seek(0)
+        array('q', [position + len(_TAIL)]).tofile(file)
+    return len(offsets) + len(new_offsets)
+
+
+def repair(full_path: str) -> bool:
+    """
+    Restore a line-format file whose last append was interrupted before it completed.
+    The index still describes the file as it was before that append, so the file is cut back
+    to exactly that state; otherwise only the partly written last line is dropped.
+    The caller holds the collection's exclusive lock.
+    Returns: True if the file was repaired
+    """
+    try:
+        with open(full_path, 'rb') as file:
+            head = file.read(len(_HEAD))
+            file.seek(0, os.SEEK_END)
+            size = file.tell()
+            file.seek(max(size - len(_TAIL), 0))
+            tail = file.read()
+    except OSError:
+        return False
+    if head != _HEAD or tail == _TAIL:
+        return False
+
+    index = array('q')
+    try:
+        with open(index_path(full_path), 'rb') as file:
+            index.frombytes(file.read(index.itemsize))
+    except OSError:
+        pass
+
+    with open(full_path, 'r+b') as file:
+        if index and len(_HEAD) + len(_TAIL) <= index[0] <= size:
+            end = index[0] - len(_TAIL)
+        else:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                end = data.rfind(b"\n") + 1
+        file.truncate(end)
+        file.seek(end)
+        file.write(_TAIL)
+        file.flush()
+        os.fsync(file.fileno())
+    return True
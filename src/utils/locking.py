@@ -0,0 +1,106 @@
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: sessions are not protected from each other
+    fcntl = None
+
+VERSION_FIELD = "version"
+
+# Locks held in this process: (thread id, absolute lock path) -> [file descriptor, depth, exclusive].
+# Each thread opens its own descriptor, so flock also keeps threads of one process apart.
+_held_locks: Dict[Tuple[int, str], List[Any]] = {}
+_held_locks_guard = threading.Lock()
+
+
+class ConcurrencyError(Exception):
+    """A record was changed by another session since it was read"""
+
+
+@contextmanager
+def file_lock(full_path: str, exclusive: bool = True):
+    """
+    Hold a shared or exclusive lock on a file given by its absolute path.
+    The lock is taken on a sibling '.lock' file so that atomic renames of the data file do not lose it.
+    Nested calls for the same file within a thread are allowed; a shared lock is upgraded when needed.
+    """
+    if fcntl is None:
+        yield
+        return
+
+    lock_path = full_path + ".lock"
+    key = (threading.get_ident(), lock_path)
+    with _held_locks_guard:
+        held = _held_locks.get(key)
+
+    if held is not None:
+        upgrade = exclusive and not held[2]
+        if upgrade:
+            fcntl.flock(held[0], fcntl.LOCK_EX)
+            held[2] = True
+        held[1] += 1
+        try:
+            yield
+        finally:
+            held[1] -= 1
+            if upgrade:
+                fcntl.flock(held[0], fcntl.LOCK_SH)
+                held[2] = False
+        return
+
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        with _held_locks_guard:
+            _held_locks[key] = [fd, 1, exclusive]
+        try:
+            yield
+        finally:
+            with _held_locks_guard:
+                del _held_locks[key]
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def file_locks(full_paths: Iterable[str]):
+    """Hold exclusive locks on several files, always taken in the same order to avoid deadlocks"""
+    full_paths = sorted(set(full_paths))
+    if not full_paths:
+        yield
+        return
+    with file_lock(full_paths[0]):
+        with file_locks(full_paths[1:]):
+            yield
+
+
+def merge_changes(fresh: List[Dict[str, Any]], snapshot: List[Dict[str, Any]],
+                  records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Apply the records a session changed onto the current content of a collection.
+    Records are matched by position (collections are append-only). A changed record is only
+    accepted if its version on disk is still the one the session read; its version is then increased.
+    Records appended by the session are added after whatever other sessions appended meanwhile.
+    Raises ConcurrencyError on a conflicting change.
+    """
+    merged = list(fresh)
+    for position, record in enumerate(records):
+        if position < len(snapshot):
+            if record == snapshot[position]:
+                continue
+            if position >= len(fresh) or \
+                    fresh[position].get(VERSION_FIELD, 0) != snapshot[position].get(VERSION_FIELD, 0):
+                raise ConcurrencyError("This record was changed by another session.")
+            record = dict(record)
+            record[VERSION_FIELD] = snapshot[position].get(VERSION_FIELD, 0) + 1
+            merged[position] = record
+        else:
+            record = dict(record)
+            record[VERSION_FIELD] = 1
+            merged.append(record)
+    return merged
@@ -0,0 +1,343 @@
+import hashlib
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from src.utils import codec
+from src.utils.file_io import get_full_path, _atomic_write
+from src.utils.blob_store import CHUNK_SIZE
+from src.utils.uploads import FILE_KINDS
+
+# Pillow is optional: with it, every page image gets a thumbnail and a text rendering;
+# without it, sizes come from the PNG/JPEG headers and only PNG pages are rendered (decoded here)
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Previews are derived data, cached per document content as data/previews/ab/<sha256>.json
+PREVIEWS_DIR = "data/previews"
+PREVIEW_FORMAT = 1  # raise to regenerate every cached preview
+WORKERS = 2
+ASCII_WIDTH = 60
+ASCII_RAMP = "@%#*+=-:. "  # dark to light
+THUMBNAIL_SIZE = (256, 256)
+MAX_DECODE_BYTES = 4 * 1024 * 1024  # larger PNGs are not decoded without Pillow (too slow in Python)
+
+PDF_INFO_FIELDS = (b"Title", b"Author", b"Subject", b"Creator", b"Producer", b"CreationDate")
+
+
+def _file_hash(full_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(full_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _sniff(full_path: str) -> Optional[str]:
+    """Kind of a document by its magic bytes (see uploads.FILE_KINDS)"""
+    with open(full_path, 'rb') as file:
+        header = file.read(16)
+    return next((kind for kind, (magic, _, _) in FILE_KINDS.items() if header.startswith(magic)), None)
+
+
+def _ascii_lines(width: int, height: int, rows: List[bytes]) -> List[str]:
+    """Render 8-bit grayscale rows as text, one character per block of pixels"""
+    columns = min(ASCII_WIDTH, width)
+    lines = max(1, round(height * columns / width / 2))  # terminal cells are about twice as tall as wide
+    rendered = []
+    for line in range(lines):
+        top, bottom = line * height // lines, max(line * height // lines + 1, (line + 1) * height // lines)
+        text = []
+        for column in range(columns):
+            left, right = column * width // columns, max(column * width // columns + 1, (column + 1) * width // columns)
+            total = sum(sum(rows[y][left:right]) for y in range(top, bottom))
+            shade = total // ((bottom - top) * (right - left))
+            text.append(ASCII_RAMP[shade * len(ASCII_RAMP) // 256])
+        rendered.append("".join(text).rstrip())
+    return rendered
+
+
+def _png_chunks(file) -> Iterable[Tuple[bytes, bytes]]:
+    file.seek(8)
+    while True:
+        header = file.read(8)
+        if len(header) < 8:
+            return
+        length, chunk_type = struct.unpack(">I4s", header)
+        data = file.read(length)
+        file.seek(4, os.SEEK_CUR)  # CRC
+        yield chunk_type, data
+        if chunk_type == b"IEND":
+            return
+
+
+def _png_info(full_path: str) -> Tuple[Dict[str, Any], Optional[List[bytes]]]:
+    """Size of a PNG and, if small enough to decode here, its pixels as 8-bit grayscale rows"""
+    channels_by_type = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+    with open(full_path, 'rb') as file:
+        chunks = _png_chunks(file)
+        chunk_type, data = next(chunks)
+        if chunk_type != b"IHDR":
+            raise ValueError("PNG without IHDR")
+        width, height, bit_depth, color_type, _, _, interlace = struct.unpack(">IIBBBBB", data)
+        info = {"width": width, "height": height, "bit_depth": bit_depth, "color_type": color_type}
+        channels = channels_by_type.get(color_type)
+        if bit_depth != 8 or interlace or channels is None or width * height * channels > MAX_DECODE_BYTES:
+            return info, None
+
+        palette, compressed = b"", []
+        for chunk_type, data in chunks:
+            if chunk_type == b"PLTE":
+                palette = data
+            elif chunk_type == b"IDAT":
+                compressed.append(data)
+    raw = zlib.decompress(b"".join(compressed))
+
+    stride = width * channels
+    previous = bytearray(stride)
+    gray_rows = []
+    for y in range(height):
+        start = y * (stride + 1)
+        filter_type, row = raw[start], bytearray(raw[start + 1:start + 1 + stride])
+        if filter_type == 1:
+            for i in range(channels, stride):
+                row[i] = (row[i] + row[i - channels]) & 0xFF
+        elif filter_type == 2:
+            row = bytearray((a + b) & 0xFF for a, b in zip(row, previous))
+        elif filter_type == 3:
+            for i in range(stride):
+                left = row[i - channels] if i >= channels else 0
+                row[i] = (row[i] + ((left + previous[i]) >> 1)) & 0xFF
+        elif filter_type == 4:
+            for i in range(stride):
+                a = row[i - channels] if i >= channels else 0
+                b, c = previous[i], previous[i - channels] if i >= channels else 0
+                p = a + b - c
+                pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+                row[i] = (row[i] + (a if pa <= pb and pa <= pc else b if pb <= pc else c)) & 0xFF
+        previous = row
+
+        if color_type == 0:
+            gray_rows.append(bytes(row))
+        elif color_type == 4:
+            gray_rows.append(bytes(row[0::2]))
+        elif color_type == 3:
+            gray_rows.append(bytes((palette[3 * i] * 3 + palette[3 * i + 1] * 6 + palette[3 * i + 2]) // 10
+                                   for i in row))
+        else:
+            gray_rows.append(bytes((r * 3 + g * 6 + b) // 10
+                                   for r, g, b in zip(row[0::channels], row[1::channels], row[2::channels])))
+    return info, gray_rows
+
+
+def _jpeg_info(full_path: str) -> Dict[str, Any]:
+    """Size of a JPEG from its start-of-frame marker"""
+    with open(full_path, 'rb') as file:
+        file.seek(2)
+        while True:
+            marker = file.read(2)
+            if len(marker) < 2 or marker[0] != 0xFF:
+                raise ValueError("no JPEG frame header")
+            if marker[1] in (0xD8, 0x01) or 0xD0 <= marker[1] <= 0xD7:
+                continue
+            length, = struct.unpack(">H", file.read(2))
+            if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+                precision, height, width, components = struct.unpack(">BHHB", file.read(6))
+                return {"width": width, "height": height, "bit_depth": precision, "components": components}
+            file.seek(length - 2, os.SEEK_CUR)
+
+
+def _pdf_text(value: bytes) -> str:
+    """Decode a PDF literal string (UTF-16 with a byte order mark, or PDFDocEncoding ~ Latin-1)"""
+    value = re.sub(rb"\\([()\\])", rb"\1", value)
+    if value.startswith(b"\xfe\xff"):
+        return value[2:].decode('utf-16-be', errors='replace')
+    return value.decode('latin-1')
+
+
+def _pdf_info(full_path: str) -> Dict[str, Any]:
+    """Version, page count and document information of a PDF, found by scanning the mapped file"""
+    with open(full_path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return {}
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            version = re.match(rb"%PDF-(\d\.\d)", data[:16])
+            info = {"pdf_version": version.group(1).decode() if version else None}
+            # Page objects are counted directly; files keeping them in compressed object streams
+            # only show the /Count of their page tree
+            pages = len(re.findall(rb"/Type\s*/Page(?![a-zA-Z])", data))
+            counts = [int(count) for pair in re.findall(
+                rb"/Type\s*/Pages\b[^>]*?/Count\s+(\d+)|/Count\s+(\d+)[^>]*?/Type\s*/Pages\b", data)
+                for count in pair if count]
+            info["pages"] = max([pages] + counts)
+            for field in PDF_INFO_FIELDS:
+                match = re.search(rb"/" + field + rb"\s*\(((?:\\.|[^\\)])*)\)", data)
+                if match:
+                    info[field.decode().lower()] = _pdf_text(match.group(1))
+    return info
+
+
+def generate_preview(full_path: str, digest: str) -> Dict[str, Any]:
+    """Metadata and a text rendering (page images) or page count (PDF) of a document"""
+    kind = _sniff(full_path)
+    preview = {"format": PREVIEW_FORMAT, "hash": digest, "kind": kind, "size": os.path.getsize(full_path)}
+    try:
+        if kind == "pdf":
+            preview.update(_pdf_info(full_path))
+        elif kind in ("png", "jpeg") and Image is not None:
+            with Image.open(full_path) as image:
+                preview.update(width=image.width, height=image.height)
+                gray = image.convert("L")
+                thumbnail = gray.copy()
+                thumbnail.thumbnail(THUMBNAIL_SIZE)
+                thumbnail_path = f"{PREVIEWS_DIR}/{digest[:2]}/{digest}.thumb.png"
+                os.makedirs(os.path.dirname(get_full_path(thumbnail_path)), exist_ok=True)
+                thumbnail.save(get_full_path(thumbnail_path))
+                preview["thumbnail"] = thumbnail_path
+                # Pillow does the averaging; each text cell then covers one column and two rows
+                columns = min(ASCII_WIDTH, gray.width)
+                rows = max(2, round(gray.height * columns / gray.width))
+                pixels = gray.resize((columns, rows)).tobytes()
+                preview["ascii"] = _ascii_lines(columns, rows,
+                                                [pixels[y * columns:(y + 1) * columns] for y in range(rows)])
+        elif kind == "png":
+            info, rows = _png_info(full_path)
+            preview.update(info)
+            if rows is not None:
+                preview["ascii"] = _ascii_lines(info["width"], info["height"], rows)
+        elif kind == "jpeg":
+            preview.update(_jpeg_info(full_path))
+    except Exception as e:  # any damaged or hostile file (e.g. Pillow's DecompressionBombError)
+        preview["error"] = str(e) or type(e).__name__
+    return preview
+
+
+class PreviewWorker:
+    """
+    Generates previews of defense documents in a background thread pool, so a reviewer's list
+    can be prefetched while they read it. Results are cached in memory and on disk by the SHA-256
+    of the document, so each content is processed once, whichever submission it belongs to.
+    """
+
+    def __init__(self, workers: int = WORKERS):
+        self._workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._cache: Dict[str, Dict[str, Any]] = {}
+        self._pending: Dict[str, Future] = {}  # relative path -> future, while it is being processed
+        self._lock = threading.Lock()
+
+    def _cache_path(self, digest: str) -> str:
+        return get_full_path(f"{PREVIEWS_DIR}/{digest[:2]}/{digest}.json")
+
+    def cached(self, digest: str) -> Optional[Dict[str, Any]]:
+        """The stored preview of a document content, if there is one"""
+        preview = self._cache.get(digest)
+        if preview is None:
+            try:
+                with open(self._cache_path(digest), 'rb') as file:
+                    preview = codec.loads(file.read())
+            except (OSError, ValueError):
+                return None
+            if preview.get("format") != PREVIEW_FORMAT:
+                return None
+            self._cache[digest] = preview
+        return preview
+
+    def _build(self, relative_path: str, digest: Optional[str]) -> Dict[str, Any]:
+        full_path = get_full_path(relative_path)
+        try:
+            digest = digest or _file_hash(full_path)
+            preview = self.cached(digest)
+            if preview is not None:
+                return preview
+            preview = generate_preview(full_path, digest)
+        except Exception as e:
+            # The document went missing or could not be processed: show that, and try again next time
+            return {"format": PREVIEW_FORMAT, "hash": digest, "kind": None, "size": 0,
+                    "error": str(e) or type(e).__name__}
+        self._cache[digest] = preview
+        try:
+            _atomic_write(self._cache_path(digest), codec.dumps(preview), fsync=False)
+        except OSError:
+            pass  # The disk cache only saves work; the preview is kept in memory either way
+        return preview
+
+    def submit(self, relative_path: str, digest: Optional[str] = None) -> Future:
+        """
+        Start building the preview of a document unless it is cached or already queued.
+        digest is the document's SHA-256 if known (records from before the blob store have none).
+        """
+        if digest is not None and self.cached(digest) is not None:
+            done = Future()
+            done.set_result(self._cache[digest])
+            return done
+        with self._lock:
+            future = self._pending.get(relative_path)
+            if future is None:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self._workers, thread_name_prefix="preview")
+                future = self._pending[relative_path] = self._executor.submit(self._build, relative_path, digest)
+                future.add_done_callback(lambda _: self._done(relative_path))
+        return future
+
+    def _done(self, relative_path: str) -> None:
+        with self._lock:
+            self._pending.pop(relative_path, None)
+
+    def _documents(self, request: Dict[str, Any]) -> List[Tuple[str, Optional[str]]]:
+        """(relative path, SHA-256 or None) of the PDF and page images of a defense request"""
+        paths = [request.get("file_path")] + list(request.get("image_path") or [])
+        hashes = [request.get("file_hash")] + list(request.get("image_hashes") or [])
+        hashes += [None] * (len(paths) - len(hashes))
+        return [(path, digest) for path, digest in zip(paths, hashes)
+                if path and os.path.exists(get_full_path(path))]
+
+    def prefetch(self, requests: Iterable[Dict[str, Any]]) -> None:
+        """Queue the documents of defense requests a reviewer is about to look at"""
+        for request in requests:
+            for relative_path, digest in self._documents(request):
+                self.submit(relative_path, digest)
+
+    def previews(self, request: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any]]]:
+        """(relative path, preview) of every document of a defense request, waiting for any still running"""
+        futures = [(relative_path, self.submit(relative_path, digest))
+                   for relative_path, digest in self._documents(request)]
+        return [(relative_path, future.result()) for relative_path, future in futures]
+
+
+preview_worker = PreviewWorker()
+
+
+def print_preview(relative_path: str, preview: Dict[str, Any]) -> None:
+    """Show a preview in the terminal"""
+    print(f"\n📎 {os.path.basename(relative_path)} ({preview.get('kind') or 'unknown type'}, "
+          f"{preview['size'] / 1024:.0f} KB)")
+    if preview.get("error"):
+        print(f"   ⚠️ Could not read the file: {preview['error']}")
+    if preview.get("kind") == "pdf":
+        print(f"   📄 Pages: {preview.get('pages', 'Unknown')}   PDF {preview.get('pdf_version') or '?'}")
+        for field, label in (("title", "Title"), ("author", "Author"), ("subject", "Subject"),
+                             ("creator", "Creator"), ("producer", "Producer"), ("creationdate", "Created")):
+            if preview.get(field):
+                print(f"   {label}: {preview[field]}")
+    elif "width" in preview:
+        print(f"   🖼️ {preview['width']} x {preview['height']} px")
+        if preview.get("thumbnail"):
+            print(f"   Thumbnail: {preview['thumbnail']}")
+        for line in preview.get("ascii", []):
+            print(f"   {line}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python -m src.utils.previews <document path>...")
+        sys.exit(1)
+    for path in sys.argv[1:]:
+        print_preview(path, preview_worker.submit(path).result())
@@ -0,0 +1,122 @@
+import os
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from src.utils import codec
+
+# A user ID may fail MAX_USER_FAILURES logins within WINDOW seconds, a client MAX_CLIENT_FAILURES
+# (one client trying many user IDs); further attempts are refused until the oldest failure leaves the window.
+# Only callers that can tell clients apart (e.g. by network address) pass one: the terminal menu is a
+# single client for every user, which a client limit would lock out all at once.
+WINDOW = 5 * 60
+MAX_USER_FAILURES = 5
+MAX_CLIENT_FAILURES = 20
+MAX_KEYS = 100_000  # tracked user IDs and clients; the least recently failing are forgotten first
+
+# With THESIS_RATE_LIMIT_PERSIST=1, recent failures are saved on exit and loaded at startup
+PERSIST = os.environ.get("THESIS_RATE_LIMIT_PERSIST") == "1"
+RATE_LIMIT_FILE = "data/rate_limits.json"
+
+
+class SlidingWindowLimiter:
+    """
+    Failed-attempt counters over a sliding time window.
+    Each key keeps the times of its last `limit` failures in a fixed-size ring buffer, so checking
+    and recording an attempt are O(1): an attempt is refused while the ring is full and its oldest
+    entry is still inside the window.
+    """
+
+    def __init__(self, window: float = WINDOW, max_keys: int = MAX_KEYS):
+        self._window = window
+        self._max_keys = max_keys
+        # key -> [ring of failure times (0 = unused), index of the oldest entry]
+        self._rings: "OrderedDict[Tuple[str, str], List]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def retry_after(self, key: Tuple[str, str], limit: int, now: Optional[float] = None) -> float:
+        """Seconds until the key may try again, 0 if it may try now"""
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._rings.get(key)
+            if entry is None or len(entry[0]) != limit:
+                return 0.0
+            oldest = entry[0][entry[1]]
+        return max(0.0, oldest + self._window - now) if oldest else 0.0
+
+    def record_failure(self, key: Tuple[str, str], limit: int, now: Optional[float] = None) -> None:
+        """Remember a failed attempt, overwriting the oldest one in the key's ring"""
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._rings.get(key)
+            if entry is None or len(entry[0]) != limit:
+                entry = self._rings[key] = [array('d', bytes(8 * limit)), 0]
+            ring, oldest = entry
+            ring[oldest] = now
+            entry[1] = (oldest + 1) % limit
+            self._rings.move_to_end(key)
+            while len(self._rings) > self._max_keys:
+                self._rings.popitem(last=False)
+
+    def reset(self, key: Tuple[str, str]) -> None:
+        """Forget the failures of a key, e.g. after a successful login"""
+        with self._lock:
+            self._rings.pop(key, None)
+
+    def save(self, full_path: str) -> None:
+        """Write failures still inside the window to a file"""
+        from src.utils.file_io import _atomic_write
+
+        cutoff = time.time() - self._window
+        with self._lock:
+            entries = [[kind, name, [t for t in ring if t > cutoff]]
+                       for (kind, name), (ring, _) in self._rings.items() if max(ring) > cutoff]
+        _atomic_write(full_path, codec.dumps(entries), fsync=False)
+
+    def load(self, full_path: str, limits: Dict[str, int]) -> None:
+        """Restore failures saved by save(); limits gives the ring size of each kind of key"""
+        try:
+            with open(full_path, 'rb') as file:
+                entries = codec.loads(file.read())
+        except (OSError, ValueError):
+            return
+        for kind, name, times in entries:
+            if kind in limits:
+                for failure_time in sorted(times)[-limits[kind]:]:
+                    self.record_failure((kind, name), limits[kind], failure_time)
+
+
+LIMITS = {"user": MAX_USER_FAILURES, "client": MAX_CLIENT_FAILURES}
+
+login_limiter = SlidingWindowLimiter()
+
+
+def login_retry_after(user_id: str, client: Optional[str] = None) -> float:
+    """Seconds before this user ID may be tried again from this client; 0 means the attempt is allowed"""
+    retry_after = login_limiter.retry_after(("user", user_id), LIMITS["user"])
+    if client is not None:
+        retry_after = max(retry_after, login_limiter.retry_after(("client", client), LIMITS["client"]))
+    return retry_after
+
+
+def record_login(user_id: str, client: Optional[str], success: bool) -> None:
+    """Count a failed login against the user ID and the client, if any; a success clears the user ID"""
+    if success:
+        login_limiter.reset(("user", user_id))
+        return
+    login_limiter.record_failure(("user", user_id), LIMITS["user"])
+    if client is not None:
+        login_limiter.record_failure(("client", client), LIMITS["client"])
+
+
+def load_state() -> None:
+    """Load saved failures at startup and save them again at exit, when persistence is enabled"""
+    if not PERSIST:
+        return
+    import atexit
+    from src.utils.file_io import get_full_path
+
+    full_path = get_full_path(RATE_LIMIT_FILE)
+    login_limiter.load(full_path, LIMITS)
+    atexit.register(login_limiter.save, full_path)
@@ -0,0 +1,223 @@
+import csv
+import sys
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from src.utils import codec
+from src.utils.file_io import iter_records, collection_count, fetch_records, get_full_path, _atomic_write
+from src.utils.helpers import get_semester_year
+from src.utils.search_index import DEFENDED_THESES_FILE
+
+REPORTS_FILE = "data/theses/reports.json"
+
+# Incremental catch-up reads at most this many new theses by position; more are streamed instead
+CATCH_UP_LIMIT = 500
+
+# Groups a thesis is counted in: supervisor, each judge, semester, course, and supervisor per semester
+DIMENSIONS = ("supervisor", "judge", "semester", "course", "supervisor_semester")
+LETTERS = ("A", "B", "C", "D")
+CSV_COLUMNS = ["dimension", "group", "theses", "graded", "mean_grade", "median_grade", *LETTERS,
+               "mean_days_to_defense"]
+
+
+def _date(value: Any) -> Optional[datetime]:
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except (TypeError, ValueError):
+        return None
+
+
+def _course_of(thesis: Dict[str, Any]) -> Optional[str]:
+    """Course of an archived thesis; older records only have it on the student's enrollment request"""
+    if thesis.get("course_id"):
+        return thesis["course_id"]
+    from src.utils.request_index import request_index, normalize_status, ENROLLMENT_REQUESTS_FILE
+
+    approved = [request for request in request_index.find(ENROLLMENT_REQUESTS_FILE, student_id=thesis.get("student_id"))
+                if normalize_status(request.get("status")) == "Approved"]
+    return approved[-1].get("course_id") if approved else None
+
+
+def _groups(thesis: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """(dimension, group) pairs a thesis is counted in"""
+    supervisor = thesis.get("professor_id")
+    semester = get_semester_year(thesis["defense_date"]) if _date(thesis.get("defense_date")) else None
+    groups = [("supervisor", supervisor), ("semester", semester), ("course", _course_of(thesis))]
+    groups += [("judge", judge) for judge in {thesis.get("internal_judge_id"), thesis.get("external_judge_id")}]
+    if supervisor and semester:
+        groups.append(("supervisor_semester", f"{supervisor} | {semester}"))
+    return [(dimension, group) for dimension, group in groups if group]
+
+
+def _median(histogram: Dict[str, int], count: int) -> Optional[float]:
+    """Median of grades kept as a histogram (grade -> number of theses)"""
+    if not count:
+        return None
+    ordered = sorted((float(grade), number) for grade, number in histogram.items())
+
+    def grade_at(index: int) -> float:
+        seen = 0
+        for grade, number in ordered:
+            seen += number
+            if index < seen:
+                return grade
+        return ordered[-1][0]
+
+    return (grade_at((count - 1) // 2) + grade_at(count // 2)) / 2
+
+
+class ArchiveReports:
+    """
+    Aggregates over the defended-theses archive, per supervisor, judge, semester and course:
+    number of theses, mean and median final grade, letter-grade distribution and the mean number
+    of days from defense request to defense session.
+    The archive is append-only, so the aggregates (persisted in REPORTS_FILE with the number of
+    theses they cover) are brought up to date by adding just the theses archived since; a report
+    then costs O(groups) however large the archive is. Grades are kept as histograms, which gives
+    exact medians without keeping every grade.
+    """
+
+    def __init__(self):
+        self._loaded = False
+        self._count = 0
+        self._groups: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+    def _reset(self) -> None:
+        self._count = 0
+        self._groups = {dimension: {} for dimension in DIMENSIONS}
+
+    def _load(self) -> None:
+        self._reset()
+        try:
+            with open(get_full_path(REPORTS_FILE), 'rb') as file:
+                saved = codec.loads(file.read())
+            if isinstance(saved, dict) and set(saved.get("groups", {})) == set(DIMENSIONS):
+                self._count, self._groups = saved["count"], saved["groups"]
+        except (OSError, ValueError):
+            pass
+        self._loaded = True
+
+    def _add(self, thesis: Dict[str, Any]) -> None:
+        grade = thesis.get("final_grade")
+        letter = thesis.get("final_letter_grade")
+        submitted, defended = _date(thesis.get("submission_date")), _date(thesis.get("defense_date"))
+        for dimension, group in _groups(thesis):
+            totals = self._groups[dimension].setdefault(group, {
+                "theses": 0, "graded": 0, "grade_sum": 0.0, "grades": {}, "letters": {},
+                "days_sum": 0, "days_count": 0})
+            totals["theses"] += 1
+            if isinstance(grade, (int, float)):
+                totals["graded"] += 1
+                totals["grade_sum"] += grade
+                totals["grades"][str(float(grade))] = totals["grades"].get(str(float(grade)), 0) + 1
+            if letter:
+                totals["letters"][letter] = totals["letters"].get(letter, 0) + 1
+            if submitted and defended:
+                totals["days_sum"] += (defended - submitted).days
+                totals["days_count"] += 1
+        self._count += 1
+
+    def save(self) -> bool:
+        try:
+            _atomic_write(get_full_path(REPORTS_FILE), codec.dumps({"count": self._count, "groups": self._groups}),
+                          fsync=False)
+            return True
+        except OSError as e:
+            print(f"❌ Error saving reports: {e}")
+            return False
+
+    def rebuild(self) -> bool:
+        """Aggregate the whole archive from scratch"""
+        self._reset()
+        self._loaded = True
+        for thesis in iter_records(DEFENDED_THESES_FILE):
+            self._add(thesis)
+        return self.save()
+
+    def sync(self) -> None:
+        """Add whatever was appended to the archive since the last call"""
+        if not self._loaded:
+            self._load()
+        count = collection_count(DEFENDED_THESES_FILE)
+        if count < self._count:
+            # The archive was replaced or truncated: start over
+            self.rebuild()
+        elif count - self._count <= CATCH_UP_LIMIT:
+            if count > self._count:
+                for thesis in fetch_records(DEFENDED_THESES_FILE, list(range(self._count, count))):
+                    self._add(thesis)
+                self.save()
+        else:
+            for position, thesis in enumerate(iter_records(DEFENDED_THESES_FILE)):
+                if position >= self._count:
+                    self._add(thesis)
+            self.save()
+
+    def report(self, dimension: str) -> List[Dict[str, Any]]:
+        """One row per group of a dimension, ordered by group"""
+        self.sync()
+        rows = []
+        for group, totals in sorted(self._groups[dimension].items()):
+            graded = totals["graded"]
+            rows.append({
+                "dimension": dimension,
+                "group": group,
+                "theses": totals["theses"],
+                "graded": graded,
+                "mean_grade": round(totals["grade_sum"] / graded, 2) if graded else None,
+                "median_grade": _median(totals["grades"], graded),
+                **{letter: totals["letters"].get(letter, 0) for letter in LETTERS},
+                "mean_days_to_defense": round(totals["days_sum"] / totals["days_count"], 1)
+                if totals["days_count"] else None
+            })
+        return rows
+
+    def export_csv(self, path: str, dimensions: Tuple[str, ...] = DIMENSIONS) -> int:
+        """
+        Write the reports of the given dimensions to a CSV file
+        Returns: the number of rows written
+        """
+        count = 0
+        with open(path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.DictWriter(file, fieldnames=CSV_COLUMNS)
+            writer.writeheader()
+            for dimension in dimensions:
+                for row in self.report(dimension):
+                    writer.writerow(row)
+                    count += 1
+        return count
+
+
+reports = ArchiveReports()
+
+
+def print_report(dimension: str, group_prefix: str = "") -> None:
+    """Print a dimension's report as a table, keeping only the groups starting with group_prefix"""
+    rows = [row for row in reports.report(dimension) if row["group"].startswith(group_prefix)]
+    if not rows:
+        print("❌ No archived theses to report on.")
+        return
+
+    def show(value):
+        return "-" if value is None else value
+
+    width = max(len("group"), *(len(row["group"]) for row in rows))
+    print(f"{'group':<{width}} {'theses':>6} {'mean':>6} {'median':>6} {'A':>4} {'B':>4} {'C':>4} {'D':>4} {'days':>6}")
+    for row in rows:
+        print(f"{row['group']:<{width}} {row['theses']:>6} {show(row['mean_grade']):>6} "
+              f"{show(row['median_grade']):>6} {row['A']:>4} {row['B']:>4} {row['C']:>4} {row['D']:>4} "
+              f"{show(row['mean_days_to_defense']):>6}")
+
+
+if __name__ == "__main__":
+    usage = f"Usage: python -m src.utils.reports show {'|'.join(DIMENSIONS)} | export FILE.csv | rebuild"
+    args = sys.argv[1:]
+    if args[:1] == ["show"] and len(args) == 2 and args[1] in DIMENSIONS:
+        print_report(args[1])
+    elif args[:1] == ["export"] and len(args) == 2 and args[1].endswith(".csv"):
+        print(f"✅ {reports.export_csv(args[1])} rows written to {args[1]}")
+    elif args == ["rebuild"]:
+        if reports.rebuild():
+            print("✅ Reports rebuilt")
+    else:
+        print(usage)
+        sys.exit(1)
@@ -0,0 +1,124 @@
+from bisect import bisect_left, insort
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from src.utils.file_io import load_collection, get_collection_version, add_change_listener, copy_record, ChangeList
+
+ENROLLMENT_REQUESTS_FILE = "data/requests/enrollment_requests.json"
+DEFENSE_REQUESTS_FILE = "data/requests/defense_requests.json"
+
+# Every spelling a status was stored with -> the one the menus write
+STATUS_ALIASES = {
+    "در انتظار تأیید استاد": "Pending Professor Approval",
+    "تایید شده": "Approved",
+    "تأیید شده": "Approved",
+    "رد شده": "Rejected"
+}
+
+# Indexed field combinations of each collection; a query must give exactly one of them
+INDEXED_KEYS: Dict[str, List[Tuple[str, ...]]] = {
+    ENROLLMENT_REQUESTS_FILE: [("student_id",), ("professor_id", "status")],
+    DEFENSE_REQUESTS_FILE: [("student_id",), ("professor_id", "status"),
+                            ("internal_judge_id", "status"), ("external_judge_id", "status")]
+}
+
+
+def normalize_status(status: Optional[str]) -> Optional[str]:
+    """Return the status as the menus write it, whichever spelling it was stored with"""
+    return STATUS_ALIASES.get(status, status)
+
+
+def _key_getter(fields: Tuple[str, ...]) -> Callable[[Dict[str, Any]], Tuple[Any, ...]]:
+    def key(record: Dict[str, Any]) -> Tuple[Any, ...]:
+        return tuple(normalize_status(record.get(field)) if field == "status" else record.get(field)
+                     for field in fields)
+    return key
+
+
+class RequestIndex:
+    """
+    Multi-key indexes over the request collections: for each indexed field combination,
+    key values -> sorted positions of the matching requests.
+    An index is rebuilt only when its file changed behind our back; the changes this process
+    writes are applied incrementally (see file_io.add_change_listener), so a query costs O(k)
+    in the number of matching requests, however long the request history is.
+    """
+
+    def __init__(self):
+        self._indexes: Dict[str, Dict[Tuple[str, ...], Dict[Tuple[Any, ...], List[int]]]] = {}
+        self._versions: Dict[str, int] = {}
+        self._keys = {file_path: [(fields, _key_getter(fields)) for fields in keys]
+                      for file_path, keys in INDEXED_KEYS.items()}
+        add_change_listener(self._on_change)
+
+    def _ensure(self, file_path: str) -> None:
+        """Build the indexes of a collection if they are missing or stale"""
+        version = get_collection_version(file_path)
+        if self._versions.get(file_path) == version:
+            return
+
+        indexes = {fields: {} for fields, _ in self._keys[file_path]}
+        for position, record in enumerate(load_collection(file_path)):
+            for fields, key in self._keys[file_path]:
+                indexes[fields].setdefault(key(record), []).append(position)
+        self._indexes[file_path] = indexes
+        self._versions[file_path] = version
+
+    def _on_change(self, file_path: str, old_version: int, new_version: int, changes: ChangeList) -> None:
+        """Apply records written by this process, if the index describes the version they changed"""
+        if file_path not in self._versions:
+            return
+        if self._versions[file_path] != old_version:
+            del self._versions[file_path]  # out of step: rebuilt on next use
+            return
+
+        indexes = self._indexes[file_path]
+        for position, before, after in changes:
+            for fields, key in self._keys[file_path]:
+                old_key = key(before) if before is not None else None
+                new_key = key(after)
+                if old_key == new_key:
+                    continue
+                if old_key is not None:
+                    positions = indexes[fields][old_key]
+                    del positions[bisect_left(positions, position)]
+                    if not positions:
+                        del indexes[fields][old_key]
+                insort(indexes[fields].setdefault(new_key, []), position)
+        self._versions[file_path] = new_version
+
+    def positions(self, file_path: str, **criteria: Any) -> List[int]:
+        """
+        Positions (in collection order) of the requests matching all criteria, e.g.
+        positions(DEFENSE_REQUESTS_FILE, external_judge_id="ex_1", status="Approved").
+        Raises KeyError if the criteria are not an indexed field combination.
+        """
+        fields = tuple(sorted(criteria))
+        for indexed_fields, _ in self._keys[file_path]:
+            if tuple(sorted(indexed_fields)) == fields:
+                self._ensure(file_path)
+                values = tuple(normalize_status(criteria[field]) if field == "status" else criteria[field]
+                               for field in indexed_fields)
+                return list(self._indexes[file_path][indexed_fields].get(values, ()))
+        raise KeyError(f"No index on {', '.join(fields)} for {file_path}")
+
+    def select(self, file_path: str, records: List[Dict[str, Any]], version: Optional[int],
+               **criteria: Any) -> List[Dict[str, Any]]:
+        """
+        The requests matching all criteria among records, a copy of the collection at version
+        (e.g. from a unit of work, see UnitOfWork.loaded_version), which callers may then change.
+        If the file was written since that copy was made, its positions may no longer match
+        the index, and the copy is scanned instead.
+        """
+        positions = self.positions(file_path, **criteria)
+        if version is not None and self._versions.get(file_path) == version:
+            return [records[position] for position in positions]
+        values = {field: normalize_status(value) if field == "status" else value for field, value in criteria.items()}
+        key = _key_getter(tuple(values))
+        return [record for record in records if key(record) == tuple(values.values())]
+
+    def find(self, file_path: str, **criteria: Any) -> List[Dict[str, Any]]:
+        """Copies of the requests matching all criteria, in collection order"""
+        records = load_collection(file_path)
+        return [copy_record(records[position]) for position in self.positions(file_path, **criteria)]
+
+
+request_index = RequestIndex()
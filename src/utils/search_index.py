@@ -0,0 +1,226 @@
+import heapq
+import json
+import math
+import os
+import re
+from typing import Any, Dict, List, Tuple
+from src.utils import codec
+from src.utils.file_io import write_json, iter_records, collection_count, fetch_records, get_full_path
+
+DEFENDED_THESES_FILE = "data/theses/defended_theses.json"
+INDEX_FILE = "data/theses/search_index.json"
+INDEX_LOG_FILE = "data/theses/search_index.log"
+
+# How many incremental additions are kept in the log before it is merged into the index file
+COMPACT_AFTER = 500
+
+# BM25 parameters and per-field term weights
+BM25_K1 = 1.2
+BM25_B = 0.75
+FIELD_WEIGHTS = {"title": 2, "keywords": 2, "abstract": 1}
+
+_CHAR_MAP = str.maketrans({
+    "ي": "ی",  # Arabic ya -> Persian ya
+    "ى": "ی",  # Alef maksura -> Persian ya
+    "ك": "ک",  # Arabic kaf -> Persian kaf
+    "ة": "ه",  # Teh marbuta -> heh
+    "\u200c": None,  # ZWNJ: "می‌شود" and "میشود" are the same word
+    "\u200d": None,  # ZWJ
+    "\u0640": None,  # Tatweel
+    **{chr(code): None for code in range(0x064b, 0x0660)},  # Harakat
+    "\u0670": None,  # Superscript alef
+    **{chr(0x06f0 + digit): str(digit) for digit in range(10)},  # Persian digits
+    **{chr(0x0660 + digit): str(digit) for digit in range(10)},  # Arabic-Indic digits
+})
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def normalize_text(text: str) -> str:
+    """Unify Arabic/Persian letter variants, drop ZWNJ and diacritics, and lowercase"""
+    return text.translate(_CHAR_MAP).lower()
+
+
+def tokenize(text: str) -> List[str]:
+    """Split normalized Persian/English text into tokens"""
+    return _TOKEN_PATTERN.findall(normalize_text(text))
+
+
+def _document_terms(thesis: Dict[str, Any]) -> Dict[str, int]:
+    """Return weighted term frequencies of a thesis' title, abstract and keywords"""
+    terms: Dict[str, int] = {}
+    fields = {
+        "title": thesis.get("title", ""),
+        "abstract": thesis.get("abstract", ""),
+        "keywords": " ".join(thesis.get("keywords", []))
+    }
+    for field, text in fields.items():
+        weight = FIELD_WEIGHTS[field]
+        for token in tokenize(text or ""):
+            terms[token] = terms.get(token, 0) + weight
+    return terms
+
+
+class ThesisSearchIndex:
+    """
+    Persistent inverted index over the defended-theses archive with BM25 ranking.
+    Documents are identified by their position in defended_theses.json, which is append-only.
+    New documents are appended to a small log file and periodically merged into the index file.
+    """
+
+    def __init__(self):
+        self._loaded = False
+        # term -> flat [doc, frequency, doc, frequency, ...] list, which keeps the object count low
+        self._postings: Dict[str, List[int]] = {}
+        self._doc_lengths: List[int] = []
+        self._total_length = 0
+        self._log_entries = 0
+
+    def _reset(self) -> None:
+        self._postings = {}
+        self._doc_lengths = []
+        self._total_length = 0
+        self._log_entries = 0
+
+    def _add_terms(self, doc: int, terms: Dict[str, int]) -> None:
+        """Add the terms of one document to the in-memory postings"""
+        length = sum(terms.values())
+        self._doc_lengths.append(length)
+        self._total_length += length
+        for term, frequency in terms.items():
+            postings = self._postings.setdefault(term, [])
+            postings.append(doc)
+            postings.append(frequency)
+
+    def _load(self) -> None:
+        """Load the persisted index and replay the incremental log"""
+        self._reset()
+
+        index_path = get_full_path(INDEX_FILE)
+        if os.path.exists(index_path):
+            # Read directly: the index is private to this module and should not sit in the collection cache too
+            try:
+                with open(index_path, 'rb') as file:
+                    saved = codec.loads(file.read())
+            except (OSError, json.JSONDecodeError):
+                saved = None
+            if isinstance(saved, dict):
+                self._postings = saved.get("postings", {})
+                self._doc_lengths = saved.get("doc_lengths", [])
+                self._total_length = sum(self._doc_lengths)
+
+        log_path = get_full_path(INDEX_LOG_FILE)
+        if os.path.exists(log_path):
+            with open(log_path, 'r', encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        entry = codec.loads(line)
+                    except json.JSONDecodeError:
+                        break  # A torn last line from an interrupted append
+                    if entry["doc"] == len(self._doc_lengths):
+                        self._add_terms(entry["doc"], entry["terms"])
+                        self._log_entries += 1
+
+        self._loaded = True
+
+    def _ensure(self) -> None:
+        """Make sure the index is loaded and covers the whole archive"""
+        if not self._loaded:
+            self._load()
+
+        # Only the archive size and the theses added since the last call are read
+        count = collection_count(DEFENDED_THESES_FILE)
+        if len(self._doc_lengths) > count:
+            # The archive was replaced or truncated: start over
+            self.rebuild()
+        elif count - len(self._doc_lengths) <= COMPACT_AFTER:
+            new_docs = range(len(self._doc_lengths), count)
+            for doc, thesis in zip(new_docs, fetch_records(DEFENDED_THESES_FILE, list(new_docs))):
+                self.add_document(doc, thesis)
+        else:
+            for doc, thesis in enumerate(iter_records(DEFENDED_THESES_FILE)):
+                if doc >= len(self._doc_lengths):
+                    self._add_terms(doc, _document_terms(thesis))
+            self.save()
+
+    def sync(self) -> None:
+        """Index whatever was appended to the archive since the last call"""
+        self._ensure()
+
+    def save(self) -> bool:
+        """Write the whole index to disk and clear the incremental log"""
+        data = {"doc_lengths": self._doc_lengths, "postings": self._postings}
+        if not write_json(INDEX_FILE, data):
+            return False
+
+        log_path = get_full_path(INDEX_LOG_FILE)
+        if os.path.exists(log_path):
+            os.remove(log_path)
+        self._log_entries = 0
+        return True
+
+    def rebuild(self) -> bool:
+        """Index the whole archive from scratch"""
+        self._reset()
+        self._loaded = True
+        # Streamed, so a full rebuild does not need the whole archive in memory
+        for doc, thesis in enumerate(iter_records(DEFENDED_THESES_FILE)):
+            self._add_terms(doc, _document_terms(thesis))
+        return self.save()
+
+    def add_document(self, doc: int, thesis: Dict[str, Any]) -> None:
+        """
+        Index a thesis that was just appended to the archive at position `doc`.
+        The change is persisted by appending one line to the index log.
+        """
+        if not self._loaded:
+            self._load()
+        if doc != len(self._doc_lengths):
+            # Out of step with the archive; the next search will catch up
+            return
+
+        terms = _document_terms(thesis)
+        self._add_terms(doc, terms)
+
+        try:
+            log_path = get_full_path(INDEX_LOG_FILE)
+            os.makedirs(os.path.dirname(log_path), exist_ok=True)
+            with open(log_path, 'ab') as file:
+                file.write(codec.dumps({"doc": doc, "terms": terms}) + b"\n")
+            self._log_entries += 1
+        except OSError as e:
+            print(f"❌ Error updating search index: {e}")
+
+        if self._log_entries >= COMPACT_AFTER:
+            self.save()
+
+    def search(self, query: str, page: int = 1, page_size: int = 10) -> Tuple[int, List[Tuple[int, float]]]:
+        """
+        Rank archived theses against the query with BM25
+        Returns: (total number of matches, [(archive position, score), ...] for the requested page)
+        """
+        self._ensure()
+
+        doc_count = len(self._doc_lengths)
+        if doc_count == 0:
+            return 0, []
+        average_length = self._total_length / doc_count or 1
+
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            matches = len(postings) // 2
+            idf = math.log((doc_count - matches + 0.5) / (matches + 0.5) + 1)
+            for doc, frequency in zip(postings[::2], postings[1::2]):
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self._doc_lengths[doc] / average_length)
+                scores[doc] = scores.get(doc, 0.0) + idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+
+        # Only the documents up to the end of the requested page need to be ordered
+        start = (max(page, 1) - 1) * page_size
+        ranked = heapq.nsmallest(start + page_size, scores.items(), key=lambda item: (-item[1], item[0]))
+        return len(scores), ranked[start:]
+
+
+search_index = ThesisSearchIndex()
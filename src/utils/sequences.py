@@ -0,0 +1,100 @@
+import sys
+from typing import Dict, Iterable, List, Optional, Tuple
+from src.utils import codec
+from src.utils.locking import file_lock
+
+# Last number handed out by each sequence; losing the file is harmless, since every counter
+# is seeded again from the largest id already stored in its collection
+SEQUENCES_FILE = "data/sequences.json"
+
+# Sequences of the collections whose new records get an id: name -> (collection, id field)
+SEQUENCE_COLLECTIONS: Dict[str, Tuple[str, str]] = {
+    "request": ("data/requests/enrollment_requests.json", "request_id"),
+    "defense": ("data/requests/defense_requests.json", "request_id"),
+    "thesis": ("data/theses/defended_theses.json", "thesis_id"),
+    "student": ("data/users/students.json", "user_id"),
+    "prof": ("data/users/professors.json", "user_id"),
+    "ex": ("data/users/external_judges.json", "user_id"),
+    "course": ("data/courses/thesis_courses.json", "course_id")
+}
+
+
+def _id_number(value: object) -> int:
+    """Numeric suffix of an id following the 'prefix_number' pattern, or 0"""
+    try:
+        return int(str(value).rsplit('_', 1)[-1])
+    except ValueError:
+        return 0
+
+
+def _seed(sequence: str, existing_data: Optional[Iterable[dict]], id_field: str) -> int:
+    """Largest number already used by a sequence, found once when its counter is first created"""
+    if existing_data is None:
+        if sequence not in SEQUENCE_COLLECTIONS:
+            return 0
+        from src.utils.file_io import iter_records
+
+        file_path, id_field = SEQUENCE_COLLECTIONS[sequence]
+        existing_data = iter_records(file_path)
+    return max((_id_number(record.get(id_field)) for record in existing_data if record.get(id_field)), default=0)
+
+
+def _read_counters(full_path: str) -> Dict[str, int]:
+    try:
+        with open(full_path, 'rb') as file:
+            counters = codec.loads(file.read())
+    except OSError:
+        return {}
+    except ValueError:
+        print(f"⚠️ {SEQUENCES_FILE} is damaged; counters are seeded again from the collections")
+        return {}
+    return counters if isinstance(counters, dict) else {}
+
+
+def reserve(sequence: str, count: int = 1, existing_data: Optional[Iterable[dict]] = None,
+            id_field: str = "id", after: int = 0) -> range:
+    """
+    Reserve a block of consecutive numbers of a sequence with one locked read and write of
+    the counters file, whatever the block size; parallel importers never receive the same number.
+    existing_data (with id_field) seeds a sequence that has no counter and no known collection yet.
+    after moves the counter past numbers used by ids written explicitly (e.g. imported 'student_8').
+    Returns: the reserved numbers
+    """
+    if count < 1:
+        raise ValueError("count must be at least 1")
+
+    from src.utils.file_io import get_full_path, _atomic_write
+
+    full_path = get_full_path(SEQUENCES_FILE)
+    with file_lock(full_path, exclusive=True):
+        counters = _read_counters(full_path)
+        last = counters.get(sequence)
+        if last is None:
+            last = _seed(sequence, existing_data, id_field)
+        last = max(last, after)
+        counters[sequence] = last + count
+        _atomic_write(full_path, codec.dumps(counters, indent=2))
+    return range(last + 1, last + count + 1)
+
+
+def next_id(sequence: str) -> str:
+    """Allocate one id such as 'request_42' in constant time"""
+    return f"{sequence}_{reserve(sequence)[0]}"
+
+
+def next_ids(sequence: str, count: int, after: int = 0) -> List[str]:
+    """Allocate a block of ids at once, e.g. for a bulk import, numbered above after"""
+    return [f"{sequence}_{number}" for number in reserve(sequence, count, after=after)]
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["show"]:
+        print("Usage: python -m src.utils.sequences show")
+        sys.exit(1)
+    from src.utils.file_io import get_full_path
+
+    counters = _read_counters(get_full_path(SEQUENCES_FILE))
+    if not counters:
+        print("ℹ️ No ids allocated yet")
+    for name, last in sorted(counters.items()):
+        print(f"🔢 {name}: {last}")
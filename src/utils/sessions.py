@@ -0,0 +1,141 @@
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+from src.models.user import User
+from src.utils.user_index import user_index
+
+# Tokens are signed with this key; without THESIS_SESSION_SECRET a random key is made per process,
+# so tokens then stay valid only within the process that issued them
+SESSION_SECRET = os.environ.get("THESIS_SESSION_SECRET", "").encode('utf-8') or os.urandom(32)
+SESSION_TTL = 30 * 60  # seconds a token stays valid after it is issued
+CACHE_SIZE = 1024  # authenticated principals kept in memory, least recently used dropped first
+
+
+def _encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode('ascii')
+
+
+def _decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _password_stamp(password_hash: str) -> str:
+    """Short fingerprint of a stored password hash; tokens carry it, so a password change voids them"""
+    return hashlib.sha256(password_hash.encode('utf-8')).hexdigest()[:16]
+
+
+class SessionManager:
+    """
+    Signed session tokens and an LRU cache of the principals they belong to.
+    A token is "payload.signature" where the payload holds role, user ID, expiry, password stamp and a nonce;
+    checking it costs an HMAC and a dict lookup instead of reading the user file and hashing a password.
+    The role menus resolve their user through authenticate() before every choice, so a session that
+    expired, was revoked or outlived a password change ends there.
+    """
+
+    def __init__(self, secret: bytes = SESSION_SECRET, ttl: int = SESSION_TTL, size: int = CACHE_SIZE):
+        self._secret = secret
+        self._ttl = ttl
+        self._size = size
+        self._cache: "OrderedDict[str, Tuple[float, User]]" = OrderedDict()
+        self._tokens_by_user: Dict[Tuple[str, str], Set[str]] = {}
+        self._revoked: Dict[str, float] = {}  # token -> its expiry, kept until then
+        self._lock = threading.Lock()
+
+    def _sign(self, payload: bytes) -> str:
+        return _encode(hmac.new(self._secret, payload, hashlib.sha256).digest())
+
+    def issue(self, user: User) -> str:
+        """Create a token for a user who just logged in and cache the user as its principal"""
+        expires = int(time.time()) + self._ttl
+        nonce = _encode(os.urandom(9))  # two sessions of one user never share a token
+        stamp = _password_stamp(user._password)
+        payload = f"{user.get_role()}:{user.user_id}:{expires}:{stamp}:{nonce}".encode('utf-8')
+        token = f"{_encode(payload)}.{self._sign(payload)}"
+        self._remember(token, expires, user)
+        return token
+
+    def _remember(self, token: str, expires: float, user: User) -> None:
+        with self._lock:
+            self._cache[token] = (expires, user)
+            self._cache.move_to_end(token)
+            self._tokens_by_user.setdefault((user.get_role(), user.user_id), set()).add(token)
+            while len(self._cache) > self._size:
+                old_token, (_, old_user) = self._cache.popitem(last=False)
+                self._forget(old_token, old_user)
+
+    def _forget(self, token: str, user: User) -> None:
+        """Drop a token from the per-user sets; the caller holds the lock and removed it from the cache"""
+        key = (user.get_role(), user.user_id)
+        tokens = self._tokens_by_user.get(key)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[key]
+
+    def authenticate(self, token: str) -> Optional[User]:
+        """
+        Return the principal of a valid, unexpired token, or None.
+        A token missing from the cache (evicted, or issued by another process sharing the secret)
+        is checked against the user's current record from the user index.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._cache.get(token)
+            if entry is not None:
+                if entry[0] > now:
+                    self._cache.move_to_end(token)
+                    return entry[1]
+                del self._cache[token]
+                self._forget(token, entry[1])
+                return None
+
+        try:
+            encoded_payload, signature = token.split(".")
+            payload = _decode(encoded_payload)
+            if not hmac.compare_digest(signature, self._sign(payload)):
+                return None
+            role, rest = payload.decode('utf-8').split(":", 1)
+            user_id, expires, stamp, _ = rest.rsplit(":", 3)
+            expires = int(expires)
+        except (ValueError, UnicodeDecodeError):
+            return None
+        if expires <= now or token in self._revoked:
+            return None
+
+        from src.utils.auth import USER_CLASSES
+
+        user_data = user_index.get(role, user_id) if role in USER_CLASSES else None
+        if not user_data or not hmac.compare_digest(stamp, _password_stamp(user_data["password"])):
+            return None
+        user = USER_CLASSES[role](user_data["user_id"], user_data["national_id"], user_data["name"],
+                                  user_data["password"])
+        self._remember(token, expires, user)
+        return user
+
+    def revoke(self, token: str) -> None:
+        """End a session (logout): the token is refused by this process from now on"""
+        now = time.time()
+        with self._lock:
+            entry = self._cache.pop(token, None)
+            if entry is not None:
+                self._forget(token, entry[1])
+            self._revoked = {old: expires for old, expires in self._revoked.items() if expires > now}
+            self._revoked[token] = entry[0] if entry is not None else now + self._ttl
+
+    def invalidate_user(self, role: str, user_id: str) -> None:
+        """
+        Drop every cached session of a user, e.g. after a password change.
+        Their tokens carry the old password stamp, so they are also refused when checked again.
+        """
+        with self._lock:
+            for token in self._tokens_by_user.pop((role, user_id), ()):
+                self._cache.pop(token, None)
+
+
+sessions = SessionManager()
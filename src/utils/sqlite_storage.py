@@ -0,0 +1,236 @@
+import os
+import sqlite3
+import sys
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from src.utils import codec
+from src.utils.locking import ConcurrencyError, VERSION_FIELD
+
+# Collection file -> (table, fixed scope columns, indexed columns)
+COLLECTIONS = {
+    "data/users/students.json": ("users", {"role": "student"}, ["user_id", "national_id"]),
+    "data/users/professors.json": ("users", {"role": "professor"}, ["user_id", "national_id"]),
+    "data/users/external_judges.json": ("users", {"role": "external_judge"}, ["user_id", "national_id"]),
+    "data/courses/thesis_courses.json": ("courses", {}, ["course_id", "professor_id"]),
+    "data/requests/enrollment_requests.json": ("enrollment_requests", {}, ["student_id", "professor_id", "status"]),
+    "data/requests/defense_requests.json": ("defense_requests", {},
+                                            ["student_id", "professor_id", "internal_judge_id",
+                                             "external_judge_id", "status"]),
+    "data/theses/defended_theses.json": ("defended_theses", {}, ["student_id", "professor_id"]),
+    # Applied data migrations, kept with the collections they change so both commit in one transaction
+    "data/schema.json": ("schema_migrations", {}, ["migration"])
+}
+
+
+class SqliteStorage:
+    """
+    Stores each collection as one row per record, in a table with indexed columns for the
+    fields menus filter on. A record keeps its position in the collection, so the list seen
+    through read_json is exactly the one the JSON files would hold.
+    Single-record updates touch one row instead of rewriting a whole file.
+    """
+
+    def __init__(self, db_path: str):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        # isolation_level=None: transactions are started explicitly with BEGIN IMMEDIATE
+        self._connection = sqlite3.connect(db_path, isolation_level=None, timeout=30)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+    def _create_schema(self) -> None:
+        tables: Dict[str, Tuple[List[str], List[str]]] = {}
+        for table, scope, indexed in COLLECTIONS.values():
+            tables[table] = (list(scope), indexed)
+
+        statements = ["CREATE TABLE IF NOT EXISTS collection_versions "
+                      "(collection TEXT PRIMARY KEY, version INTEGER NOT NULL)"]
+        for table, (scope_columns, indexed) in tables.items():
+            columns = [f"{column} TEXT NOT NULL" for column in scope_columns]
+            columns += ["position INTEGER NOT NULL"]
+            columns += [f"{column} TEXT" for column in indexed]
+            columns += ["version INTEGER NOT NULL DEFAULT 0", "data TEXT NOT NULL"]
+            key = ", ".join(scope_columns + ["position"])
+            statements.append(f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(columns)}, PRIMARY KEY ({key}))")
+            for column in indexed:
+                statements.append(f"CREATE INDEX IF NOT EXISTS idx_{table}_{column} "
+                                  f"ON {table} ({', '.join(scope_columns + [column])})")
+        for statement in statements:
+            self._connection.execute(statement)
+
+    @staticmethod
+    def handles(file_path: str) -> bool:
+        """Whether a collection file is stored in the database"""
+        return file_path in COLLECTIONS
+
+    @staticmethod
+    def _scope(file_path: str) -> Tuple[str, str, List[Any]]:
+        """Return (table, WHERE clause for the collection, its parameters)"""
+        table, scope, _ = COLLECTIONS[file_path]
+        clause = " AND ".join(f"{column} = ?" for column in scope) or "1"
+        return table, clause, list(scope.values())
+
+    def collection_version(self, file_path: str) -> int:
+        """Version of a collection; it is increased by every committed change"""
+        row = self._connection.execute(
+            "SELECT version FROM collection_versions WHERE collection = ?", (file_path,)).fetchone()
+        return row[0] if row else 0
+
+    def _bump_version(self, file_path: str) -> int:
+        version = self.collection_version(file_path) + 1
+        self._connection.execute("INSERT OR REPLACE INTO collection_versions (collection, version) VALUES (?, ?)",
+                                 (file_path, version))
+        return version
+
+    def read(self, file_path: str) -> Tuple[int, List[Dict[str, Any]]]:
+        """Return (collection version, records in collection order)"""
+        table, clause, params = self._scope(file_path)
+        with self.transaction(write=False):
+            version = self.collection_version(file_path)
+            rows = self._connection.execute(
+                f"SELECT data FROM {table} WHERE {clause} ORDER BY position", params).fetchall()
+        return version, [codec.loads(row[0]) for row in rows]
+
+    def iter_records(self, file_path: str) -> Iterator[Dict[str, Any]]:
+        """Yield the records of a collection in order, fetching rows from the cursor as they are consumed"""
+        table, clause, params = self._scope(file_path)
+        cursor = self._connection.execute(f"SELECT data FROM {table} WHERE {clause} ORDER BY position", params)
+        for row in cursor:
+            yield codec.loads(row[0])
+
+    def _put(self, file_path: str, position: int, record: Dict[str, Any]) -> None:
+        """Insert or replace the record at a position"""
+        table, scope, indexed = COLLECTIONS[file_path]
+        columns = list(scope) + ["position"] + indexed + ["version", "data"]
+        values = list(scope.values()) + [position]
+        values += [None if record.get(column) is None else str(record.get(column)) for column in indexed]
+        values += [record.get(VERSION_FIELD, 0), codec.dumps(record).decode('utf-8')]
+        self._connection.execute(
+            f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            values)
+
+    def transaction(self, write: bool = True):
+        """Group several operations into one database transaction"""
+        return _Transaction(self._connection, write)
+
+    def replace(self, file_path: str, records: List[Dict[str, Any]],
+                known: Optional[Tuple[int, List[Dict[str, Any]]]] = None) -> int:
+        """
+        Make the stored collection equal to records.
+        known=(version, records) describes what the caller last read; if the collection is still at
+        that version only the differing rows are written.
+        Returns: the new collection version
+        """
+        table, clause, params = self._scope(file_path)
+        with self.transaction():
+            if known is not None and known[0] == self.collection_version(file_path):
+                previous = known[1]
+            else:
+                previous = []
+                self._connection.execute(f"DELETE FROM {table} WHERE {clause}", params)
+
+            for position, record in enumerate(records):
+                if position >= len(previous) or previous[position] != record:
+                    self._put(file_path, position, record)
+            if len(previous) > len(records):
+                self._connection.execute(f"DELETE FROM {table} WHERE {clause} AND position >= ?",
+                                         params + [len(records)])
+            return self._bump_version(file_path)
+
+    def commit_changes(self, changes: Dict[str, Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]) -> Dict[str, int]:
+        """
+        Apply a unit of work in one transaction. changes maps file_path -> (snapshot, records):
+        records changed since the snapshot are written if their stored version is unchanged,
+        and appended records go after the current end of the collection.
+        Raises ConcurrencyError on a conflicting change.
+        Returns: the new version of every changed collection
+        """
+        versions = {}
+        with self.transaction():
+            for file_path, (snapshot, records) in changes.items():
+                table, clause, params = self._scope(file_path)
+                count = self._connection.execute(f"SELECT COUNT(*) FROM {table} WHERE {clause}", params).fetchone()[0]
+                for position, record in enumerate(records):
+                    if position < len(snapshot):
+                        if record == snapshot[position]:
+                            continue
+                        row = self._connection.execute(
+                            f"SELECT version FROM {table} WHERE {clause} AND position = ?",
+                            params + [position]).fetchone()
+                        if row is None or row[0] != snapshot[position].get(VERSION_FIELD, 0):
+                            raise ConcurrencyError("This record was changed by another session.")
+                        record = dict(record)
+                        record[VERSION_FIELD] = snapshot[position].get(VERSION_FIELD, 0) + 1
+                        self._put(file_path, position, record)
+                    else:
+                        record = dict(record)
+                        record[VERSION_FIELD] = 1
+                        self._put(file_path, count, record)
+                        count += 1
+                versions[file_path] = self._bump_version(file_path)
+        return versions
+
+    def update_record(self, file_path: str, field: str, value: Any,
+                      mutator: Callable[[Dict[str, Any]], Any]) -> Tuple[Optional[int], Optional[Dict[str, Any]], Any, int]:
+        """
+        Change the first record whose indexed field equals value, through its index.
+        Returns: (position, updated record, mutator result, collection version);
+        position is None if nothing matched
+        """
+        table, clause, params = self._scope(file_path)
+        with self.transaction():
+            row = self._connection.execute(
+                f"SELECT position, data FROM {table} WHERE {clause} AND {field} = ? ORDER BY position LIMIT 1",
+                params + [value]).fetchone()
+            if row is None:
+                return None, None, None, self.collection_version(file_path)
+            position, record = row[0], codec.loads(row[1])
+            original = dict(record)
+            result = mutator(record)
+            version = self.collection_version(file_path)
+            if record != original:
+                record[VERSION_FIELD] = original.get(VERSION_FIELD, 0) + 1
+                self._put(file_path, position, record)
+                version = self._bump_version(file_path)
+            return position, record, result, version
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT, or ROLLBACK on error. Read transactions use a plain BEGIN."""
+
+    def __init__(self, connection: sqlite3.Connection, write: bool):
+        self._connection = connection
+        self._write = write
+        self._nested = False
+
+    def __enter__(self):
+        self._nested = self._connection.in_transaction
+        if not self._nested:
+            self._connection.execute("BEGIN IMMEDIATE" if self._write else "BEGIN")
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._nested:
+            return False
+        if exc_type is None:
+            self._connection.execute("COMMIT")
+        else:
+            self._connection.execute("ROLLBACK")
+        return False
+
+
+def migrate_json_to_sqlite() -> None:
+    """Import every JSON collection file into the SQLite database"""
+    from src.utils import file_io
+
+    storage = file_io.get_sqlite_storage()
+    for file_path in COLLECTIONS:
+        records = file_io._read_json_file(file_path)
+        storage.replace(file_path, records)
+        print(f"✅ {file_path}: {len(records)} records imported")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["migrate"]:
+        print("Usage: python -m src.utils.sqlite_storage migrate")
+        sys.exit(1)
+    migrate_json_to_sqlite()
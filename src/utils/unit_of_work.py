@@ -0,0 +1,204 @@
+import glob
+import json
+import os
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Set
+from src.utils.file_io import (read_json, get_full_path, prepare_json_files, install_prepared_files,
+                               discard_prepared_files, refresh_cache, clear_cache, uses_sqlite,
+                               get_sqlite_storage, repair_line_files, get_collection_version,
+                               notify_changes, copy_record)
+from src.utils.locking import file_locks, merge_changes, ConcurrencyError
+from src.utils.jsonl_log import collection_path, LOG_SUFFIX
+
+# Each commit writes its own journal, so sessions committing at the same time do not clash
+JOURNAL_DIR = "data"
+JOURNAL_PATTERN = ".journal-*.json"
+
+
+class UnitOfWork:
+    """
+    Load each collection an action touches once, change the records in memory,
+    and save all changed collections together.
+
+    commit() first writes every changed collection to a temporary file, then records the
+    pending renames in a small write-ahead journal, and only then renames the files into place
+    (collections stored as logs get their new lines appended instead).
+    If the process dies during the renames, recover_journal() finishes them on the next start,
+    so an action is never left half-applied.
+
+    Other sessions may use the same files meanwhile: at commit time the changed files are locked,
+    re-read, and only the records this unit changed or appended are merged in. If another session
+    changed one of those records first, the commit is refused instead of overwriting its update.
+    """
+
+    def __init__(self):
+        self._collections: Dict[str, List[Dict[str, Any]]] = {}
+        self._snapshots: Dict[str, List[Dict[str, Any]]] = {}
+        self._versions: Dict[str, Optional[int]] = {}
+        self._changed: Set[str] = set()
+        self._after_commit: List[Callable[[], None]] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        return False
+
+    def load(self, file_path: str) -> List[Dict[str, Any]]:
+        """Return the records of a collection; every call within this unit returns the same list"""
+        if file_path not in self._collections:
+            version = get_collection_version(file_path)
+            records = read_json(file_path)
+            self._collections[file_path] = records
+            self._snapshots[file_path] = [copy_record(record) for record in records]
+            # Unknown if the file was replaced while it was being read
+            self._versions[file_path] = version if get_collection_version(file_path) == version else None
+        return self._collections[file_path]
+
+    def loaded_version(self, file_path: str) -> Optional[int]:
+        """
+        Collection version (see file_io.get_collection_version) the loaded records are a copy of,
+        or None if it is not known; indexes must describe this version to be used on them
+        """
+        return self._versions.get(file_path)
+
+    def mark_changed(self, file_path: str) -> None:
+        """Schedule a loaded collection to be saved on commit"""
+        if file_path not in self._collections:
+            raise KeyError(f"{file_path} was not loaded in this unit of work")
+        self._changed.add(file_path)
+
+    def on_commit(self, callback: Callable[[], None]) -> None:
+        """Run callback once the changes are safely on disk (e.g. to update in-memory indexes)"""
+        self._after_commit.append(callback)
+
+    def commit(self) -> bool:
+        """
+        Save all changed collections at once
+        Returns: True if successful, False if error or conflict (in which case no file was changed)
+        """
+        if not self._changed:
+            return True
+
+        database_files = [file_path for file_path in self._changed if uses_sqlite(file_path)]
+        if database_files:
+            # Collections kept in SQLite are committed in one database transaction instead of the journal
+            try:
+                get_sqlite_storage().commit_changes({
+                    file_path: (self._snapshots[file_path], self._collections[file_path])
+                    for file_path in database_files
+                })
+            except ConcurrencyError:
+                print("⚠️ This information was changed in another session meanwhile. Please try again.")
+                return False
+            except Exception as e:
+                print(f"❌ Error saving changes: {e}")
+                return False
+            for file_path in database_files:
+                # Reloaded on next use, so they include what other sessions appended meanwhile
+                self._changed.discard(file_path)
+                del self._collections[file_path]
+                del self._snapshots[file_path]
+                self._versions.pop(file_path, None)
+            if not self._changed:
+                return self._run_after_commit()
+
+        journal_path = os.path.join(get_full_path(JOURNAL_DIR), JOURNAL_PATTERN.replace("*", uuid.uuid4().hex))
+        with file_locks(get_full_path(file_path) for file_path in self._changed):
+            temp_paths = {}
+            fresh_collections = {}
+            old_versions = {}
+            try:
+                files = {}
+                for file_path in self._changed:
+                    fresh_collections[file_path] = fresh = read_json(file_path)
+                    old_versions[file_path] = get_collection_version(file_path)
+                    files[file_path] = merge_changes(fresh, self._snapshots[file_path], self._collections[file_path])
+                temp_paths = prepare_json_files(files)
+                _write_journal(journal_path, temp_paths)
+            except ConcurrencyError:
+                discard_prepared_files(temp_paths)
+                print("⚠️ This information was changed in another session meanwhile. Please try again.")
+                return False
+            except Exception as e:
+                discard_prepared_files(temp_paths)
+                print(f"❌ Error saving changes: {e}")
+                return False
+
+            try:
+                install_prepared_files(temp_paths)
+                os.remove(journal_path)
+            except Exception as e:
+                print(f"❌ Error saving changes, they will be completed on next start: {e}")
+                return False
+
+            for file_path, data in files.items():
+                refresh_cache(file_path, data)
+                # merge_changes keeps the untouched records of the fresh list, so changes are found by identity
+                fresh = fresh_collections[file_path]
+                notify_changes(file_path, old_versions[file_path], [
+                    (position, fresh[position] if position < len(fresh) else None, record)
+                    for position, record in enumerate(data)
+                    if position >= len(fresh) or record is not fresh[position]
+                ])
+                self._versions[file_path] = get_collection_version(file_path)
+
+        for file_path, data in files.items():
+            self._collections[file_path] = data
+            self._snapshots[file_path] = [copy_record(record) for record in data]
+        self._changed.clear()
+        return self._run_after_commit()
+
+    def _run_after_commit(self) -> bool:
+        for callback in self._after_commit:
+            callback()
+        self._after_commit.clear()
+        return True
+
+
+def _write_journal(journal_path: str, temp_paths: Dict[str, str]) -> None:
+    """Durably record which temporary files must be renamed over which targets"""
+    entries = [[os.path.relpath(temp_path, os.path.dirname(journal_path)),
+                os.path.relpath(full_path, os.path.dirname(journal_path))]
+               for full_path, temp_path in temp_paths.items()]
+    with open(journal_path, 'w', encoding='utf-8') as file:
+        json.dump(entries, file)
+        file.flush()
+        os.fsync(file.fileno())
+
+
+def recover_journal() -> bool:
+    """
+    Finish commits that were interrupted while renaming files into place.
+    Returns: True if an interrupted commit was found and completed
+    """
+    # An interrupted in-place append is undone first, so the journal can apply it again completely
+    recovered = repair_line_files()
+    for journal_path in glob.glob(os.path.join(get_full_path(JOURNAL_DIR), JOURNAL_PATTERN)):
+        try:
+            with open(journal_path, 'r', encoding='utf-8') as file:
+                entries = json.load(file)
+        except (OSError, json.JSONDecodeError):
+            # The journal itself was not completely written, so no rename had started
+            if os.path.exists(journal_path):
+                os.remove(journal_path)
+            continue
+
+        base = os.path.dirname(journal_path)
+        temp_paths = {os.path.join(base, target): os.path.join(base, temp) for temp, target in entries}
+
+        # A session that is still committing holds these locks and removes its journal when done
+        with file_locks(collection_path(target) if target.endswith(LOG_SUFFIX) else target
+                        for target in temp_paths):
+            if not os.path.exists(journal_path):
+                continue
+            install_prepared_files(temp_paths)
+            os.remove(journal_path)
+        recovered = True
+
+    if recovered:
+        clear_cache()
+        print("⚠️  An interrupted save was found and completed.")
+    return recovered
@@ -0,0 +1,74 @@
+import os
+import sys
+from typing import Callable, Dict, Optional, Sequence, Tuple
+from src.utils.blob_store import put_file, BlobTooLarge
+
+# Size limits in MB, overridable per deployment
+MAX_PDF_SIZE = int(os.environ.get("THESIS_MAX_PDF_MB", 50)) * 1024 * 1024
+MAX_IMAGE_SIZE = int(os.environ.get("THESIS_MAX_IMAGE_MB", 10)) * 1024 * 1024
+
+# Kind -> (leading bytes every such file starts with, stored extension, size limit)
+FILE_KINDS: Dict[str, Tuple[bytes, str, int]] = {
+    "pdf": (b"%PDF-", ".pdf", MAX_PDF_SIZE),
+    "jpeg": (b"\xff\xd8\xff", ".jpg", MAX_IMAGE_SIZE),
+    "png": (b"\x89PNG\r\n\x1a\n", ".png", MAX_IMAGE_SIZE),
+}
+PDF_KINDS = ("pdf",)
+IMAGE_KINDS = ("jpeg", "png")
+
+
+class UploadError(Exception):
+    """An uploaded file is missing, of the wrong type or too large"""
+
+
+def detect_kind(source_path: str, kinds: Sequence[str]) -> str:
+    """
+    Check an upload before anything is copied: it must exist, start with the magic bytes of one
+    of the allowed kinds and fit that kind's size limit. Only the first bytes are read.
+    Returns: the detected kind
+    """
+    try:
+        with open(source_path, 'rb') as file:
+            header = file.read(max(len(FILE_KINDS[kind][0]) for kind in kinds))
+            size = os.fstat(file.fileno()).st_size
+    except OSError:
+        raise UploadError(f"File not found: {source_path}")
+
+    kind = next((kind for kind in kinds if header.startswith(FILE_KINDS[kind][0])), None)
+    if kind is None:
+        raise UploadError(f"{source_path} is not a {'/'.join(name.upper() for name in kinds)} file")
+    limit = FILE_KINDS[kind][2]
+    if size > limit:
+        raise UploadError(f"{source_path} is {size / 1024 / 1024:.1f} MB, the limit is {limit // 1024 // 1024} MB")
+    return kind
+
+
+def print_progress(label: str) -> Callable[[int, int], None]:
+    """Progress callback drawing a one-line bar for an upload"""
+    def show(done: int, total: int) -> None:
+        percent = done * 100 // total if total else 100
+        print(f"\r   ⏳ {label}: [{'#' * (percent // 5):<20}] {percent:3d}%", end="" if done < total else "\n")
+        sys.stdout.flush()
+    return show
+
+
+def ingest(source_path: str, kind: str, progress: Optional[Callable[[int, int], None]] = None) -> str:
+    """
+    Stream a checked upload (see detect_kind) into the blob store in fixed-size chunks, hashing while
+    copying and stopping as soon as the kind's size limit is passed, in case the file grew meanwhile.
+    progress is called with (bytes done, total bytes).
+    Returns: SHA-256 of the stored file
+    """
+    limit = FILE_KINDS[kind][2]
+    total = os.path.getsize(source_path)
+    try:
+        return put_file(source_path, limit, (lambda done: progress(min(done, total), total)) if progress else None)
+    except BlobTooLarge:
+        raise UploadError(f"{source_path} is larger than the {limit // 1024 // 1024} MB limit")
+    except OSError as e:
+        raise UploadError(f"Cannot read {source_path}: {e}")
+
+
+def extension(kind: str) -> str:
+    """File name extension used for a stored kind"""
+    return FILE_KINDS[kind][1]
@@ -0,0 +1,113 @@
+from typing import Any, Dict, Iterable, List, Optional, Set
+from src.utils.file_io import load_collection, get_collection_version, add_change_listener, copy_record, ChangeList
+
+USER_FILES = {
+    "student": "data/users/students.json",
+    "professor": "data/users/professors.json",
+    "external_judge": "data/users/external_judges.json"
+}
+
+
+class UserIndex:
+    """
+    Hash indexes on user_id and national_id for every user collection.
+    An index is rebuilt only when its file changed behind our back; the changes this process
+    writes are applied incrementally (see file_io.add_change_listener).
+    """
+
+    def __init__(self):
+        self._by_user_id: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._by_national_id: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._by_name: Dict[str, Dict[str, Set[str]]] = {}
+        self._versions: Dict[str, int] = {}
+        self._roles = {file_path: role for role, file_path in USER_FILES.items()}
+        add_change_listener(self._on_change)
+
+    def _ensure(self, role: str) -> None:
+        """Build the indexes of a role if they are missing or stale"""
+        file_path = USER_FILES[role]
+        version = get_collection_version(file_path)
+        if self._versions.get(role) == version:
+            return
+
+        by_user_id = {}
+        by_national_id = {}
+        by_name = {}
+        for record in load_collection(file_path):
+            by_user_id[record["user_id"]] = record
+            if record.get("national_id"):
+                by_national_id[record["national_id"]] = record
+            by_name.setdefault(record.get("name", "").lower(), set()).add(record["user_id"])
+
+        self._by_user_id[role] = by_user_id
+        self._by_national_id[role] = by_national_id
+        self._by_name[role] = by_name
+        self._versions[role] = version
+
+    def get(self, role: str, user_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Find a user by ID
+        Returns: a copy of the user data dictionary or None
+        """
+        self._ensure(role)
+        record = self._by_user_id[role].get(user_id)
+        return dict(record) if record else None
+
+    def get_by_national_id(self, role: str, national_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Find a user by national ID
+        Returns: a copy of the user data dictionary or None
+        """
+        self._ensure(role)
+        record = self._by_national_id[role].get(national_id)
+        return dict(record) if record else None
+
+    def ids_matching_name(self, role: str, query: str) -> Set[str]:
+        """Return IDs of users whose (lowercased) name contains the query"""
+        self._ensure(role)
+        query = query.strip().lower()
+        matched = set()
+        for name, ids in self._by_name[role].items():
+            if query in name:
+                matched.update(ids)
+        return matched
+
+    def _on_change(self, file_path: str, old_version: int, new_version: int, changes: ChangeList) -> None:
+        """Apply records written by this process, if the index describes the version they changed"""
+        role = self._roles.get(file_path)
+        if role is None or role not in self._versions:
+            return
+        if self._versions[role] != old_version:
+            del self._versions[role]  # out of step: rebuilt on next use
+            return
+        self._apply(role, [after for _, _, after in changes])
+        self._versions[role] = new_version
+
+    def _apply(self, role: str, records: Iterable[Dict[str, Any]]) -> None:
+        by_user_id = self._by_user_id[role]
+        by_national_id = self._by_national_id[role]
+        by_name = self._by_name[role]
+        for record in records:
+            old = by_user_id.get(record["user_id"])
+            if old:
+                if old.get("national_id") != record.get("national_id"):
+                    by_national_id.pop(old.get("national_id"), None)
+                old_name = old.get("name", "").lower()
+                ids = by_name.get(old_name)
+                if ids is not None:
+                    ids.discard(record["user_id"])
+                    if not ids:
+                        del by_name[old_name]
+            record = copy_record(record)
+            by_user_id[record["user_id"]] = record
+            if record.get("national_id"):
+                by_national_id[record["national_id"]] = record
+            by_name.setdefault(record.get("name", "").lower(), set()).add(record["user_id"])
+
+    def all_users(self, role: str) -> List[Dict[str, Any]]:
+        """Return copies of all users of a role"""
+        self._ensure(role)
+        return [dict(record) for record in self._by_user_id[role].values()]
+
+
+user_index = UserIndex()